@@ -0,0 +1,89 @@
+"""Plotly payload size and build time of the dashboard charts, full vs decimated.
+
+Builds the same six figures as src/dashboard.py (price + indicators, candlestick
++ volume, log-return histogram, drawdown, volatility, RSI) from a synthetic
+minute series, once with every row and once through src/downsample.py, and
+reports the serialized JSON size and the time to build + serialize them.
+
+Usage: python benchmarks/bench_downsample.py [n_points ...] [--max-points N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import plotly.graph_objects as go
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from src.downsample import histogram, lttb, minmax_ohlc  # noqa: E402
+from src.indicators import add_indicators  # noqa: E402
+from synthetic import market_chart_arrays  # noqa: E402
+
+LINES = ['close', 'MA_short', 'MA_long', 'BB_upper', 'BB_lower']
+
+
+def synthetic_frame(n):
+    ts, prices, _, vols = market_chart_arrays(n)
+    idx = pd.to_datetime(ts, unit='ms', utc=True)
+    df = pd.DataFrame({'open': prices, 'high': prices * 1.0005, 'low': prices * 0.9995,
+                       'close': prices, 'volume': vols}, index=idx)
+    return add_indicators(df)
+
+
+def build_figures(df, max_points=None):
+    if max_points is None:
+        series = lambda col: df[col]  # noqa: E731
+        candles = df
+    else:
+        series = lambda col: lttb(df[col], max_points)  # noqa: E731
+        candles = minmax_ohlc(df[['open', 'high', 'low', 'close', 'volume']], max_points)
+
+    def scatter(col, **kwargs):
+        s = series(col)
+        return go.Scatter(x=s.index, y=s.values, **kwargs)
+
+    fig_price = go.Figure([scatter(c, name=c) for c in LINES])
+    fig_candle = go.Figure([
+        go.Candlestick(x=candles.index, open=candles['open'], high=candles['high'],
+                       low=candles['low'], close=candles['close']),
+        go.Bar(x=candles.index, y=candles['volume'], yaxis='y2'),
+    ])
+    if max_points is None:
+        fig_hist = go.Figure([go.Histogram(x=df['log_return'], nbinsx=50)])
+    else:
+        centers, counts, width = histogram(df['log_return'], nbins=50)
+        fig_hist = go.Figure([go.Bar(x=centers, y=counts, width=width)])
+    others = [go.Figure([scatter(c)]) for c in ('drawdown', 'rolling_vol_30d', 'RSI')]
+    return [fig_price, fig_candle, fig_hist] + others
+
+
+def measure(df, max_points, repeat=3):
+    best, size = float('inf'), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        payload = [fig.to_json() for fig in build_figures(df, max_points)]
+        best = min(best, time.perf_counter() - t0)
+        size = sum(len(p) for p in payload)
+    return size, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[10_000, 100_000])
+    parser.add_argument('--max-points', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    print(f"{'points':>10} {'mode':>10} {'payload MB':>11} {'build s':>8}")
+    for n in args.sizes:
+        df = synthetic_frame(n)
+        for label, budget in (('full', None), ('decimated', args.max_points)):
+            size, secs = measure(df, budget, repeat=1 if budget is None and n > 100_000 else 3)
+            print(f'{n:>10} {label:>10} {size / 2**20:>11.2f} {secs:>8.3f}')
+
+
+if __name__ == '__main__':
+    main()
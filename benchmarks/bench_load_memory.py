@@ -0,0 +1,57 @@
+"""Peak memory and time of loading a market_chart JSON: json.load vs the streaming loader.
+
+Usage: python benchmarks/bench_load_memory.py [n_points ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from src.process_data import load_market_chart_json  # noqa: E402
+from synthetic import write_market_chart_json  # noqa: E402
+
+
+def load_with_json(path):
+    """The pre-streaming loader: json.load, then DataFrames built from lists of lists."""
+    with open(path, 'r', encoding='utf-8') as f:
+        j = json.load(f)
+    prices = pd.DataFrame(j.get('prices', []), columns=['timestamp', 'price'])
+    prices.index = pd.to_datetime(prices.pop('timestamp'), unit='ms', utc=True)
+    vols = pd.DataFrame(j.get('total_volumes', []), columns=['timestamp', 'volume'])
+    vols.index = pd.to_datetime(vols.pop('timestamp'), unit='ms', utc=True)
+    return prices.join(vols, how='left').sort_index()
+
+
+def measure(fn, path):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = fn(path)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(df)
+
+
+def main(sizes):
+    print(f"{'points':>10} {'file MB':>8} {'loader':>10} {'seconds':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f'market_chart_{n}.json')
+            write_market_chart_json(path, n)
+            size_mb = os.path.getsize(path) / 2**20
+            for name, fn in (('json.load', load_with_json), ('streaming', load_market_chart_json)):
+                elapsed, peak, rows = measure(fn, path)
+                print(f'{n:>10} {size_mb:>8.1f} {name:>10} {elapsed:>8.2f} {peak / 2**20:>8.1f}')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
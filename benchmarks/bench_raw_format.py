@@ -0,0 +1,43 @@
+"""Disk size and load time of a raw market_chart dump: indent=2 JSON vs compressed .npz.
+
+Usage: python benchmarks/bench_raw_format.py [n_points ...]   (default: one year of minutes)
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from src import raw_io  # noqa: E402
+from src.process_data import load_market_chart_json  # noqa: E402
+from synthetic import write_market_chart_json  # noqa: E402
+
+
+def timed_load(path, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        load_market_chart_json(path)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(sizes):
+    print(f"{'points':>10} {'format':>6} {'MB':>8} {'load s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            json_path = os.path.join(tmp, f'market_chart_{n}.json')
+            write_market_chart_json(json_path, n)
+            npz_path = raw_io.npz_name(json_path)
+            raw_io.write_npz(npz_path, raw_io.read_market_chart(json_path, keys=raw_io.MARKET_CHART_KEYS))
+            for fmt, path in (('json', json_path), ('npz', npz_path)):
+                mb = os.path.getsize(path) / 2**20
+                print(f'{n:>10} {fmt:>6} {mb:>8.1f} {timed_load(path):>8.3f}')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [525_600])
@@ -0,0 +1,63 @@
+"""Start-up cost of the analysis/plot scripts: wall time of fresh interpreters and
+which heavy libraries each command imports.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--file PROCESSED_SERIES]
+
+Every command runs in a new `python` process; the table shows the median wall
+time over --repeat runs. The first run of a script may (re)build its artifact;
+the others are cache hits, which is what the median reflects.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SRC = ROOT / 'src'
+HEAVY = ('numpy', 'pandas', 'pyarrow', 'matplotlib', 'scipy', 'plotly')
+
+PROBE = ("import sys; sys.path.insert(0, {src!r}); import {module}; "
+         "print(','.join(m for m in {heavy!r} if m in sys.modules))")
+
+
+def timed(cmd, repeat):
+    times, out = [], ''
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=str(ROOT), capture_output=True, text=True)
+        times.append(time.perf_counter() - t0)
+        if proc.returncode != 0:
+            raise SystemExit(f'{" ".join(cmd)} failed:\n{proc.stderr}')
+        out = proc.stdout
+    return statistics.median(times), out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--file', help='processed series passed to the scripts (default: their own lookup)')
+    args = parser.parse_args(argv)
+    file_args = ['--file', args.file] if args.file else []
+
+    rows = [('python -c pass', [sys.executable, '-c', 'pass'])]
+    for module in ('generate_analysis', 'generate_plots'):
+        probe = PROBE.format(src=str(SRC), module=module, heavy=HEAVY)
+        rows.append((f'import {module}', [sys.executable, '-c', probe]))
+    rows += [
+        ('generate_analysis --help', [sys.executable, 'src/generate_analysis.py', '--help']),
+        ('generate_analysis --no-markdown',
+         [sys.executable, 'src/generate_analysis.py', '--no-markdown'] + file_args),
+        ('generate_plots', [sys.executable, 'src/generate_plots.py'] + file_args),
+    ]
+
+    print(f"{'command':<34} {'median s':>9}  heavy imports")
+    for label, cmd in rows:
+        secs, out = timed(cmd, args.repeat)
+        heavy = out.strip() if label.startswith('import ') else ''
+        print(f'{label:<34} {secs:>9.3f}  {heavy or "-"}')
+
+
+if __name__ == '__main__':
+    main()
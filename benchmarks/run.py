@@ -0,0 +1,211 @@
+"""Benchmark harness for the fetch -> process -> indicators -> render path.
+
+For each size a synthetic CoinGecko market_chart JSON is written (see
+`synthetic`), then every stage runs on the previous stage's output:
+
+- load:       process_data.load_market_chart_json
+- resample:   process_data.resample_to_ohlc (hourly bars)
+- features:   process_data.add_features on those bars
+- indicators: the dashboard block, add_indicators + compute_signals, on the
+              full-resolution series
+- figures:    the six dashboard figures built and serialized to JSON, decimated
+              to --max-points per trace as the dashboard does
+
+Each stage is timed (best of --repeat, without tracing) and then run once more
+under tracemalloc for its peak Python memory. Results are printed and written
+as JSON; with --baseline, any stage slower or bigger than the baseline by more
+than --threshold (relative) is reported and the exit status is 1.
+
+Usage:
+    python benchmarks/run.py [--sizes 10k 1m 10m] [--repeat 3] [--out FILE]
+                             [--baseline FILE] [--threshold 0.25] [--data-dir DIR]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from src.indicators import add_indicators  # noqa: E402
+from src.process_data import add_features, load_market_chart_json, resample_to_ohlc  # noqa: E402
+from src.signals import compute_signals  # noqa: E402
+from bench_downsample import build_figures  # noqa: E402
+from synthetic import write_market_chart_json  # noqa: E402
+
+DEFAULT_SIZES = ['10k', '1m']
+RESAMPLE_RULE = '1h'
+MAX_POINTS = 2000
+THRESHOLD = 0.25
+# timings this short are mostly noise; they never count as regressions
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 1.0
+
+
+def parse_size(text):
+    """'10k' -> 10_000, '1m' -> 1_000_000, '250000' -> 250_000."""
+    text = text.lower().replace('_', '')
+    scale = {'k': 10**3, 'm': 10**6}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def _label(n):
+    for unit, scale in (('m', 10**6), ('k', 10**3)):
+        if n >= scale and n % scale == 0:
+            return f'{n // scale}{unit}'
+    return str(n)
+
+
+def dashboard_block(df):
+    """What src/dashboard.py does to a price series before drawing (no resample)."""
+    df = df.copy()
+    df['close'] = df['price']
+    df = add_indicators(df)
+    df['Signal'] = compute_signals(df)
+    return df
+
+
+def render_figures(df, max_points=MAX_POINTS):
+    ohlc = df.assign(open=df['close'], high=df['close'], low=df['close'])
+    return sum(len(fig.to_json()) for fig in build_figures(ohlc, max_points))
+
+
+def stages(max_points=MAX_POINTS):
+    """[(name, fn(prev) -> output, which earlier output it takes)]."""
+    return [
+        ('load', load_market_chart_json, 'path'),
+        ('resample', lambda df: resample_to_ohlc(df, RESAMPLE_RULE), 'load'),
+        ('features', add_features, 'resample'),
+        ('indicators', dashboard_block, 'load'),
+        ('figures', lambda df: render_figures(df, max_points), 'indicators'),
+    ]
+
+
+def measure(fn, arg, repeat):
+    """(best seconds, peak traced bytes, output) of fn(arg)."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(arg)
+        best = min(best, time.perf_counter() - t0)
+        del out
+    tracemalloc.start()
+    out = fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, out
+
+
+def run_size(n, data_dir, repeat, max_points=MAX_POINTS):
+    path = Path(data_dir) / f'market_chart_{n}.json'
+    if not path.exists():
+        write_market_chart_json(str(path), n)
+    outputs = {'path': str(path)}
+    results = {}
+    for name, fn, source in stages(max_points):
+        secs, peak, out = measure(fn, outputs[source], repeat)
+        outputs[name] = out
+        results[name] = {'seconds': round(secs, 6), 'peak_mb': round(peak / 2**20, 3)}
+        if isinstance(out, pd.DataFrame):
+            results[name]['rows'] = len(out)
+        else:  # figures: serialized payload size
+            results[name]['payload_mb'] = round(out / 2**20, 3)
+        print(f"{_label(n):>6} {name:>11} {secs:>9.3f} {peak / 2**20:>9.1f} {results[name].get('rows', ''):>10}",
+              flush=True)
+    results['load']['file_mb'] = round(path.stat().st_size / 2**20, 2)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def regressions(results, baseline, threshold=THRESHOLD):
+    """[(size, stage, metric, baseline, current)] where current > baseline * (1 + threshold).
+    Sizes or stages missing from either side are ignored."""
+    out = []
+    for size, stages_ in results.items():
+        for stage, cur in stages_.items():
+            old = baseline.get(size, {}).get(stage)
+            if old is None:
+                continue
+            for metric, floor in (('seconds', MIN_SECONDS), ('peak_mb', MIN_PEAK_MB)):
+                if metric not in old or max(old[metric], cur[metric]) < floor:
+                    continue
+                if cur[metric] > old[metric] * (1 + threshold):
+                    out.append((size, stage, metric, old[metric], cur[metric]))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='points per series, e.g. 10k 1m 10m')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage (best is kept)')
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS, help='points per trace in the figures stage')
+    parser.add_argument('--out', default=str(ROOT / 'benchmarks' / 'results' / 'latest.json'),
+                        help='results JSON (default benchmarks/results/latest.json)')
+    parser.add_argument('--baseline', help='earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed relative slowdown / memory growth vs the baseline (default 0.25)')
+    parser.add_argument('--data-dir', help='keep the synthetic JSON files here (default: a temporary directory)')
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes]
+    print(f"{'size':>6} {'stage':>11} {'seconds':>9} {'peak MB':>9} {'rows':>10}")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        for n in sizes:
+            # 10M points take minutes per stage; fewer repeats keep a full run bearable
+            repeat = 1 if n >= 5_000_000 else args.repeat
+            results[_label(n)] = run_size(n, data_dir, repeat, args.max_points)
+
+    report = {'environment': environment(), 'params': {'rule': RESAMPLE_RULE, 'max_points': args.max_points},
+              'results': results}
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print('Wrote', out)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))['results']
+        found = regressions(results, baseline, args.threshold)
+        for size, stage, metric, old, cur in found:
+            print(f'REGRESSION {size} {stage} {metric}: {old} -> {cur} (+{(cur / old - 1) * 100:.0f}%)')
+        if found:
+            return 1
+        print(f'No regression beyond {args.threshold:.0%} of {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
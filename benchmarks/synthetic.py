@@ -0,0 +1,40 @@
+"""Synthetic CoinGecko-shaped data for benchmarks.
+
+Files are written in chunks with the same `indent=2` layout as
+`fetch_data.save_json`, so even 10M-point files never exist as Python lists.
+"""
+import numpy as np
+
+START_MS = 1_600_000_000_000
+STEP_MS = 60_000  # one point per minute
+
+
+def market_chart_arrays(n, seed=0, start_ms=START_MS, step_ms=STEP_MS):
+    """Returns (timestamps int64, prices, market_caps, volumes) for n points."""
+    rng = np.random.default_rng(seed)
+    ts = start_ms + np.arange(n, dtype=np.int64) * step_ms
+    prices = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    caps = prices * 19_000_000
+    vols = rng.lognormal(23, 0.5, n)
+    return ts, prices, caps, vols
+
+
+def _write_rows(f, ts, vals, chunk):
+    for i in range(0, len(ts), chunk):
+        t, v = ts[i:i + chunk], vals[i:i + chunk]
+        rows = [f'    [\n      {a},\n      {b!r}\n    ]' for a, b in zip(t.tolist(), v.tolist())]
+        if i:
+            f.write(',\n')
+        f.write(',\n'.join(rows))
+
+
+def write_market_chart_json(path, n, seed=0, chunk=100_000):
+    ts, prices, caps, vols = market_chart_arrays(n, seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for k, (key, vals) in enumerate((('prices', prices), ('market_caps', caps), ('total_volumes', vols))):
+            f.write('{\n' if k == 0 else ',\n')
+            f.write(f'  "{key}": [\n')
+            _write_rows(f, ts, vals, chunk)
+            f.write('\n  ]')
+        f.write('\n}')
+    return path
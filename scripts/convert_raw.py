@@ -0,0 +1,72 @@
+"""Convert raw CoinGecko JSON dumps in data/raw to the compact .npz format.
+
+Each `<name>.json` gets a `<name>.npz` next to it (lossless, verified by reading
+both back) and its metadata sidecar is copied to `data/raw/meta/<name>.npz.meta.json`
+with a `converted_from` field. JSON files are kept unless --remove-json is given.
+
+    python scripts/convert_raw.py [--remove-json] [files ...]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'src'))
+import raw_io  # noqa: E402
+
+RAW_DIR = ROOT / 'data' / 'raw'
+META_DIR = RAW_DIR / 'meta'
+
+
+def _read_all(path):
+    if raw_io.sniff_format(str(path)) == 'market_chart':
+        return raw_io.read_market_chart(str(path), keys=raw_io.MARKET_CHART_KEYS)
+    return {'ohlc': raw_io.read_ohlc(str(path))}
+
+
+def convert(json_path, remove_json=False):
+    json_path = Path(json_path)
+    npz_path = json_path.with_suffix('.npz')
+    data = _read_all(json_path)
+    obj = data if 'ohlc' not in data else data['ohlc']
+    raw_io.write_npz(str(npz_path), obj)
+    back = _read_all(npz_path)
+    for key, arr in data.items():
+        if not np.array_equal(arr, back[key], equal_nan=True):
+            npz_path.unlink()
+            raise RuntimeError(f'Round-trip mismatch for {json_path.name} [{key}]')
+
+    meta_src = META_DIR / (json_path.name + '.meta.json')
+    if meta_src.exists():
+        with open(meta_src, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        meta['converted_from'] = json_path.name
+        meta['converted_at'] = int(time.time())
+        with open(META_DIR / (npz_path.name + '.meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+    if remove_json:
+        json_path.unlink()
+        if meta_src.exists():
+            meta_src.unlink()
+    return npz_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help='JSON files to convert (default: data/raw/*.json)')
+    parser.add_argument('--remove-json', action='store_true', help='delete each JSON (and its sidecar) after a verified conversion')
+    args = parser.parse_args()
+    files = args.files or sorted(RAW_DIR.glob('*.json'))
+    for p in files:
+        before = os.path.getsize(p)
+        out = convert(p, remove_json=args.remove_json)
+        print(f'{Path(p).name} -> {out.name} ({before / os.path.getsize(out):.1f}x smaller)')
+
+
+if __name__ == '__main__':
+    main()
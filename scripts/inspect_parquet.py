@@ -1,6 +1,9 @@
 import sys
 from pathlib import Path
-import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+from store import read_processed  # noqa: E402
+
 
 def main():
     pf = Path('data/processed/coingecko_bitcoin_market_chart_last365d_1D.parquet')
@@ -8,7 +11,7 @@ def main():
         print(f'ERROR: file not found: {pf.resolve()}')
         sys.exit(2)
 
-    df = pd.read_parquet(pf)
+    df = read_processed(pf)
     print('File:', pf)
     print('Shape:', df.shape)
     print('\nColumns:', list(df.columns))
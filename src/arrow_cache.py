@@ -0,0 +1,122 @@
+"""Memory-mapped Arrow IPC copies of processed series, shared by every dashboard session.
+
+`open_series(path)` converts a processed series (see `store`) once into an
+uncompressed Arrow IPC file under data/cache/arrow and memory-maps it. The
+mapped pages live in the OS page cache, so every session and every worker
+process reading the same series shares one copy; nothing is pickled per session.
+`MappedSeries.slice` finds a time range with a binary search on the mapped
+timestamps and only materializes those rows as a DataFrame.
+
+Invalidation: the cache file name carries `signature(path)`, a hash of the
+path, size and mtime of every Parquet part of the series. Any rewrite or
+append changes it, so a stale copy is never opened; older copies of the same
+series are deleted when a new one is built.
+"""
+import os
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+try:
+    from . import store
+    from .store import signature
+except ImportError:  # run from inside src/ (streamlit)
+    import store
+    from store import signature
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / 'data' / 'cache' / 'arrow'
+
+
+def _stem(path):
+    return re.sub(r'\.parquet$', '', os.path.basename(os.path.normpath(str(path))))
+
+
+def cache_path(path, sig=None, cache_dir=CACHE_DIR):
+    sig = signature(path) if sig is None else sig
+    return Path(cache_dir) / f'{_stem(path)}-{sig}.arrow'
+
+
+def _remove_stale(path, keep, cache_dir):
+    pattern = re.compile(re.escape(_stem(path)) + r'-[0-9a-f]{16}\.arrow$')
+    for f in Path(cache_dir).iterdir():
+        if f != keep and pattern.match(f.name):
+            try:
+                f.unlink()
+            except OSError:
+                pass  # still mapped by another process (Windows); removed next time
+
+
+def ensure(path, cache_dir=CACHE_DIR):
+    """Path of an up-to-date Arrow IPC copy of the series, building it if needed."""
+    out = cache_path(path, cache_dir=cache_dir)
+    if out.exists():
+        return out
+    os.makedirs(cache_dir, exist_ok=True)
+    df = store.read_processed(str(path))
+    if df.index.name is None:
+        df = df.rename_axis('datetime')
+    # one record batch: the timestamp column maps as a single contiguous buffer
+    table = pa.Table.from_pandas(df).combine_chunks()
+    tmp = out.with_name(f'{out.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    with pa.OSFile(str(tmp), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, out)
+    _remove_stale(path, out, cache_dir)
+    return out
+
+
+class MappedSeries:
+    """A processed series backed by a memory-mapped Arrow IPC file."""
+
+    def __init__(self, arrow_path):
+        self.arrow_path = Path(arrow_path)
+        self.table = pa.ipc.open_file(pa.memory_map(str(arrow_path), 'r')).read_all()
+        meta = self.table.schema.pandas_metadata or {}
+        index_cols = [c for c in meta.get('index_columns', []) if isinstance(c, str)]
+        self.index_name = index_cols[0] if index_cols else None
+        self.timestamps = None
+        if self.index_name is not None and len(self.table):
+            col = self.table.column(self.index_name)
+            # zero-copy view of the mapped buffer (one chunk, no nulls)
+            self.timestamps = col.chunk(0).to_numpy(zero_copy_only=True)
+            self.tz = col.type.tz
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def bounds(self):
+        if self.timestamps is None:
+            return None
+        first, last = pd.Timestamp(self.timestamps[0]), pd.Timestamp(self.timestamps[-1])
+        if self.tz is not None:
+            first, last = first.tz_localize('UTC').tz_convert(self.tz), last.tz_localize('UTC').tz_convert(self.tz)
+        return first, last
+
+    def _position(self, ts):
+        ts = pd.Timestamp(ts)
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert('UTC').tz_localize(None)
+        return int(np.searchsorted(self.timestamps, ts.to_datetime64().astype(self.timestamps.dtype)))
+
+    def slice(self, start=None, end=None, columns=None):
+        """Rows with start <= t < end as a DataFrame (only those rows are copied)."""
+        table = self.table
+        if self.timestamps is not None:
+            lo = 0 if start is None else self._position(start)
+            hi = len(self.table) if end is None else self._position(end)
+            table = table.slice(lo, max(hi - lo, 0))
+        if columns is not None:
+            table = table.select([c for c in table.column_names if c in columns or c == self.index_name])
+        return table.to_pandas(split_blocks=True)
+
+
+def open_series(path, cache_dir=CACHE_DIR):
+    """MappedSeries for the processed series at `path` (built on first use)."""
+    return MappedSeries(ensure(path, cache_dir=cache_dir))
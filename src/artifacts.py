@@ -0,0 +1,152 @@
+"""Content-hash build cache for derived files (processed series, analysis JSON, plots).
+
+Every build step describes itself as an `Artifact`: its kind, its input files,
+its parameters (e.g. resample_rule, window sizes) and the source files of the
+code that produces it. `fresh()` is True when a lineage sidecar recorded by a
+previous `record()` has the same key (a SHA-256 over input contents, parameters
+and code) and every recorded output is still there, untouched. The step can then
+be skipped.
+
+Sidecars follow the data/raw/meta convention: `<name>.meta.json` in
+data/processed/meta (name: the first output's path, '/' replaced by '__'), listing inputs (path, sha256, size, mtime), outputs and
+parameters. Input contents are only rehashed when their size or mtime differ from
+what the sidecar recorded, so checking an unchanged build costs a few stat calls.
+"""
+import hashlib
+import inspect
+import json
+import os
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+META_DIR = os.path.join(ROOT, 'data', 'processed', 'meta')
+CHUNK_SIZE = 1 << 20
+
+
+def _rel(path):
+    path = os.path.abspath(str(path))
+    try:
+        rel = os.path.relpath(path, ROOT)
+    except ValueError:  # other drive on Windows
+        return path
+    return path if rel.startswith('..') else rel.replace(os.sep, '/')
+
+
+def _files(path):
+    """The files making up `path` (every file under a dataset directory, or the file itself).
+    Only the standard library is used, so checking a cache hit never imports pandas/pyarrow."""
+    path = str(path)
+    if os.path.isdir(path):
+        return sorted(os.path.join(d, f) for d, _, files in os.walk(path) for f in files
+                      if not f.startswith('.') and not f.endswith('.tmp'))
+    return [path] if os.path.exists(path) else []
+
+
+def stat_of(path):
+    """[[relative file, size, mtime_ns], ...] for a file or dataset (cheap change detection)."""
+    out = []
+    for f in _files(path):
+        st = os.stat(f)
+        out.append([os.path.relpath(f, str(path)).replace(os.sep, '/'), st.st_size, st.st_mtime_ns])
+    return out
+
+
+def content_hash(path):
+    """SHA-256 of the contents (and relative names) of a file or dataset."""
+    h = hashlib.sha256()
+    for f in _files(path):
+        h.update(os.path.relpath(f, str(path)).replace(os.sep, '/').encode('utf-8') + b'\0')
+        with open(f, 'rb') as fh:
+            for block in iter(lambda: fh.read(CHUNK_SIZE), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def code_hash(*objs):
+    """SHA-256 of the source files defining `objs` (modules, functions or paths)."""
+    h = hashlib.sha256()
+    files = sorted({obj if isinstance(obj, str) else inspect.getsourcefile(obj) for obj in objs})
+    for f in files:
+        with open(f, 'rb') as fh:
+            h.update(os.path.basename(f).encode('utf-8') + b'\0' + fh.read())
+    return h.hexdigest()
+
+
+class Artifact:
+    """One build step: `outputs` derived from `inputs` with `params` by the code in `code`."""
+
+    def __init__(self, kind, outputs, inputs, params=None, code=(), name=None, meta_dir=None):
+        self.kind = kind
+        self.outputs = [str(p) for p in outputs]
+        self.inputs = [str(p) for p in inputs]
+        self.params = params or {}
+        self.code = code_hash(*code) if code else None
+        # the output path relative to the repo, flattened: unique across directories
+        name = name or _rel(os.path.normpath(self.outputs[0])).strip('/').replace('/', '__')
+        self.meta_path = os.path.join(meta_dir or META_DIR, name + '.meta.json')
+        self._hashes = None
+
+    def _load(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _input_hashes(self, meta=None):
+        """Content hash per input, reusing the recorded one when the file is unchanged on disk."""
+        recorded = {i['path']: i for i in (meta or {}).get('inputs', [])}
+        hashes = []
+        for p in self.inputs:
+            prev = recorded.get(_rel(p))
+            if prev is not None and prev.get('stat') == stat_of(p):
+                hashes.append(prev['sha256'])
+            else:
+                hashes.append(content_hash(p))
+        return hashes
+
+    def _key(self, hashes):
+        payload = json.dumps({'kind': self.kind, 'params': self.params, 'code': self.code, 'inputs': hashes},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def recorded_outputs(self):
+        meta = self._load()
+        return [os.path.join(ROOT, o['path']) if not os.path.isabs(o['path']) else o['path']
+                for o in (meta or {}).get('outputs', [])]
+
+    def fresh(self):
+        """True when a matching artifact exists and the work can be skipped."""
+        meta = self._load()
+        if meta is None:
+            return False
+        for out, path in zip(meta.get('outputs', []), self.recorded_outputs()):
+            if not os.path.exists(path) or out.get('stat') != stat_of(path):
+                return False
+        self._hashes = self._input_hashes(meta)
+        if self._key(self._hashes) != meta.get('key'):
+            return False
+        if any(i.get('stat') != stat_of(p) for i, p in zip(meta.get('inputs', []), self.inputs)):
+            self.record()  # same contents, new mtime (e.g. a rewritten raw file): refresh the stats
+        return True
+
+    def record(self, outputs=None):
+        """Writes the lineage sidecar after a successful build."""
+        if outputs is not None:
+            self.outputs = [str(p) for p in outputs]
+        hashes = self._hashes or self._input_hashes(self._load())
+        meta = {
+            'kind': self.kind,
+            'key': self._key(hashes),
+            'params': self.params,
+            'code_sha256': self.code,
+            'inputs': [{'path': _rel(p), 'sha256': h, 'stat': stat_of(p)} for p, h in zip(self.inputs, hashes)],
+            'outputs': [{'path': _rel(p), 'stat': stat_of(p)} for p in self.outputs],
+            'created_at': int(time.time()),
+        }
+        os.makedirs(os.path.dirname(self.meta_path), exist_ok=True)
+        tmp = self.meta_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, self.meta_path)
+        self._hashes = hashes
@@ -0,0 +1,235 @@
+"""Bounded, thread-safe TTL + LRU cache with single-flight loading.
+
+Used by fetch_realtime for API responses. Entries are evicted least-recently-used
+first when either `max_entries` or `max_bytes` is exceeded, and are treated as
+missing once older than the caller's `max_age` (default `ttl`). Concurrent
+misses on the same key run the loader once; the other callers wait for its
+result. An optional on-disk tier (`disk_dir`) keeps DataFrame entries across
+restarts as Parquet files, pruned by age (`ttl`) and then least recently used
+first down to `disk_max_bytes`.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DISK_META_KEY = b"btc_cache"
+
+
+def sizeof(value):
+    """Approximate in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    def __init__(self, max_entries=128, max_bytes=256 * 2**20, ttl=300, disk_dir=None, disk_max_bytes=512 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._data = OrderedDict()  # key -> (stored_at, size, value)
+        self._bytes = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_prune()
+
+    # -- memory tier -------------------------------------------------------
+
+    def _get_locked(self, key, max_age):
+        item = self._data.get(key)
+        if item is None:
+            return False, None
+        stored_at, size, value = item
+        if time.time() - stored_at >= max_age:
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def _put_locked(self, key, value, stored_at):
+        size = sizeof(value)
+        if key in self._data:
+            self._bytes -= self._data.pop(key)[1]
+        if size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        self._data[key] = (stored_at, size, value)
+        self._bytes += size
+        now = time.time()
+        # expired entries go first, then least recently used ones
+        for k in [k for k, (t, _, _) in self._data.items() if now - t >= self.ttl and k != key]:
+            self._bytes -= self._data.pop(k)[1]
+            self.evictions += 1
+        while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, old_size, _) = self._data.popitem(last=False)
+            self._bytes -= old_size
+            self.evictions += 1
+
+    def get(self, key, max_age=None):
+        """Returns (hit, value)."""
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            hit, value = self._get_locked(key, max_age)
+            if hit:
+                self.hits += 1
+                return True, value
+        hit, value, stored_at = self._disk_get(key, max_age)
+        with self._lock:
+            if hit:
+                self.disk_hits += 1
+                self._put_locked(key, value, stored_at)
+            else:
+                self.misses += 1
+        return hit, value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._put_locked(key, value, now)
+        self._disk_set(key, value, now)
+
+    def get_or_load(self, key, loader, max_age=None):
+        """Cached value for key, or loader() run once even under concurrent misses."""
+        hit, value = self.get(key, max_age)
+        if hit:
+            return value
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = loader()
+            self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+            }
+
+    # -- disk tier ---------------------------------------------------------
+    # Only DataFrames go to disk: one Parquet file per key, with the key, the time it
+    # was stored and df.attrs in the schema metadata. The file mtime is the store
+    # time (age pruning) and its atime is bumped on every hit (LRU pruning).
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, digest + ".parquet")
+
+    def _disk_get(self, key, max_age):
+        if not self.disk_dir:
+            return False, None, None
+        path = self._disk_path(key)
+        try:
+            meta = json.loads(pq.read_schema(path).metadata[DISK_META_KEY])
+            if meta["key"] != repr(key) or time.time() - meta["stored_at"] >= max_age:
+                return False, None, None
+            value = pq.read_table(path).to_pandas()
+            st = os.stat(path)
+            os.utime(path, (time.time(), st.st_mtime))
+        except (OSError, pa.ArrowException, ValueError, KeyError, TypeError):
+            return False, None, None
+        value.attrs.update(meta.get("attrs") or {})
+        return True, value, meta["stored_at"]
+
+    def _disk_set(self, key, value, stored_at):
+        if not self.disk_dir or not isinstance(value, pd.DataFrame):
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            table = pa.Table.from_pandas(value)
+            meta = {"key": repr(key), "stored_at": stored_at, "attrs": value.attrs}
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                                   DISK_META_KEY: json.dumps(meta, default=str)})
+            pq.write_table(table, tmp)
+            os.replace(tmp, path)
+        except (OSError, pa.ArrowException, ValueError, TypeError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return  # the disk tier is best effort
+        self._disk_prune()
+
+    def _disk_prune(self):
+        """Removes expired files (and pickles left by older versions), then the least
+        recently used ones until the tier fits in disk_max_bytes."""
+        now = time.time()
+        files = []
+        try:
+            entries = list(os.scandir(self.disk_dir))
+        except OSError:
+            return
+        for e in entries:
+            try:
+                st = e.stat()
+                if e.name.endswith(".pkl") or (e.name.endswith(".parquet") and now - st.st_mtime >= self.ttl):
+                    os.remove(e.path)
+                    self.disk_evictions += 1
+                elif e.name.endswith(".parquet"):
+                    files.append((st.st_atime, st.st_size, e.path))
+            except OSError:
+                continue  # removed by another process meanwhile
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.disk_evictions += 1
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,92 @@
+"""Side-by-side comparison of many processed series.
+
+The close series of every selected file are loaded concurrently (`load_closes`),
+aligned onto one time index with a single outer join (`align`), and every
+cross-series metric is computed on the aligned frame at once, column-wise:
+normalized price (first value = 100), the correlation matrix of log returns
+and drawdown (absolute, or relative to a benchmark column). Returns are taken
+between each series' own consecutive points, before any forward fill, so a
+carried-forward price never shows up as a zero return.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import store
+    from .indicators import drawdown, log_returns
+except ImportError:  # run from inside src/ (streamlit)
+    import store
+    from indicators import drawdown, log_returns
+
+MAX_WORKERS = 8
+
+
+def series_name(path):
+    """Display name of a processed file: its base name without `.parquet`."""
+    name = os.path.basename(os.path.normpath(str(path)))
+    return name[:-len('.parquet')] if name.endswith('.parquet') else name
+
+
+def _close(df):
+    col = 'close' if 'close' in df.columns else 'price'
+    return df[col]
+
+
+def load_closes(paths, loader=None, max_workers=MAX_WORKERS):
+    """{name: close Series} for every path, loaded in a thread pool (Parquet and Arrow
+    reads release the GIL). loader(path) returns a DataFrame; the default reads the
+    whole series with store.read_processed."""
+    loader = loader or (lambda p: store.read_processed(str(p), columns=['close', 'price']))
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as pool:
+        frames = list(pool.map(loader, paths))
+    return {series_name(p): _close(df) for p, df in zip(paths, frames)}
+
+
+def align(closes, fill=True):
+    """One DataFrame (a column per series) on the union of all timestamps.
+    fill=True carries each series forward over timestamps it does not have, but
+    never before its first value."""
+    if not closes:
+        return pd.DataFrame()
+    prices = pd.concat(closes, axis=1, join='outer', sort=True)
+    prices = prices.astype(np.float64)
+    return prices.ffill() if fill else prices
+
+
+def normalized(prices):
+    """Each column rebased to 100 at its first valid value."""
+    first = prices.bfill().iloc[0] if len(prices) else prices.iloc[:0].sum()
+    return prices / first * 100
+
+
+def correlation(prices, min_periods=2):
+    """Pairwise correlation matrix of log returns (pairwise-complete observations).
+    `prices` should be aligned without fill: each column's returns are computed over
+    its own valid points only."""
+    returns = {name: log_returns(col.dropna()) for name, col in prices.items()}
+    return pd.DataFrame(returns, columns=prices.columns).corr(min_periods=min_periods)
+
+
+def relative_drawdown(prices, benchmark=None):
+    """Drawdown of every column from its running peak; with `benchmark` (a column name),
+    of the price ratio to that column, i.e. the underperformance since the best point."""
+    if benchmark is not None:
+        prices = prices.div(prices[benchmark], axis=0)
+    return drawdown(prices)
+
+
+def compare(paths, loader=None, benchmark=None, max_workers=MAX_WORKERS):
+    """Loads and aligns `paths` and returns a dict of aligned frames: prices,
+    normalized, correlation and drawdown (relative to `benchmark` when given)."""
+    raw = align(load_closes(paths, loader=loader, max_workers=max_workers), fill=False)
+    prices = raw.ffill()
+    return {
+        'prices': prices,
+        'normalized': normalized(prices),
+        'correlation': correlation(raw),
+        'drawdown': relative_drawdown(prices, benchmark=benchmark),
+    }
@@ -0,0 +1,144 @@
+"""Index of which time ranges are already on disk, built from data/raw/meta sidecars.
+
+Every fetch writes `<raw file>.meta.json` with the coin, currency, requested
+window and the timestamp of the last point received (`last_point`); a window
+only counts as covered up to that point, since the API may have had nothing
+newer yet. `CoverageIndex` turns those into merged intervals per
+(coin, currency, granularity) so a fetcher can ask for the gaps of a window and
+download only those.
+
+Granularity follows CoinGecko's automatic rules for market_chart endpoints:
+5-minute points for windows up to one day (ending now), hourly up to 90 days,
+daily beyond. Data at a finer granularity also covers a coarser request.
+`plan_window` picks the request for a window from those rules.
+"""
+import json
+import os
+import time
+
+GRANULARITIES = ('5min', 'hourly', 'daily')  # finest first
+GRANULARITY_SECONDS = {'5min': 300, 'hourly': 3600, 'daily': 86400}
+
+DAY = 86400
+
+
+def api_granularity(from_unix, to_unix, now=None):
+    """Granularity CoinGecko returns for a market_chart window [from_unix, to_unix]."""
+    now = time.time() if now is None else now
+    span = to_unix - from_unix
+    if span <= DAY and now - to_unix < DAY:
+        return '5min'
+    if span <= 90 * DAY:
+        return 'hourly'
+    return 'daily'
+
+
+def plan_window(start, end, now=None):
+    """Smallest market_chart window (from, to, granularity) covering [start, end] at the
+    finest spacing CoinGecko will return for it.
+
+    The window is widened by one step on the left, when that keeps the granularity,
+    so the point at or just before `start` is included.
+    """
+    now = time.time() if now is None else now
+    end = min(end, int(now))
+    gran = api_granularity(start, end, now=now)
+    lead = start - GRANULARITY_SECONDS[gran]
+    if api_granularity(lead, end, now=now) == gran:
+        start = lead
+    return start, end, gran
+
+
+def entry_from_meta(meta, raw_name):
+    """(coin, currency, granularity, start, end, raw_name) for a sidecar, or None if it
+    does not describe a market_chart window (e.g. ohlc)."""
+    endpoint = meta.get('endpoint', '')
+    if endpoint.startswith('market_chart_range'):
+        start, end = int(meta['from']), int(meta['to'])
+    elif endpoint == 'market_chart':
+        days = meta.get('days')
+        if days in (None, 'max'):
+            return None
+        end = int(meta['fetched_at'])
+        start = end - int(float(days) * DAY)
+    else:
+        return None
+    gran = meta.get('granularity') or api_granularity(start, end, now=meta.get('fetched_at', end))
+    if 'last_point' in meta:  # older sidecars only have the requested window
+        if meta['last_point'] is None:
+            return None  # no points at all: covers nothing
+        end = min(end, int(meta['last_point']))
+    return (meta.get('coin_id'), meta.get('vs_currency'), gran, start, end, raw_name)
+
+
+def _merge(intervals):
+    out = []
+    for a, b in sorted(intervals):
+        if out and a <= out[-1][1] + 1:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return [tuple(x) for x in out]
+
+
+class CoverageIndex:
+    def __init__(self, entries=()):
+        self.entries = list(entries)
+
+    @classmethod
+    def from_dir(cls, meta_dir, data_dir):
+        """Reads every sidecar whose raw file still exists in data_dir."""
+        entries = []
+        if not os.path.isdir(meta_dir):
+            return cls(entries)
+        for name in sorted(os.listdir(meta_dir)):
+            if not name.endswith('.meta.json'):
+                continue
+            raw_name = name[:-len('.meta.json')]
+            if not os.path.exists(os.path.join(data_dir, raw_name)):
+                continue
+            try:
+                with open(os.path.join(meta_dir, name), 'r', encoding='utf-8') as f:
+                    entry = entry_from_meta(json.load(f), raw_name)
+            except (ValueError, KeyError):
+                continue
+            if entry is not None:
+                entries.append(entry)
+        return cls(entries)
+
+    def _matching(self, coin_id, vs_currency, granularity):
+        ok = GRANULARITIES[:GRANULARITIES.index(granularity) + 1]
+        return [e for e in self.entries if e[0] == coin_id and e[1] == vs_currency and e[2] in ok]
+
+    def covered(self, coin_id, vs_currency, granularity='daily'):
+        """Merged (start, end) unix intervals on disk at `granularity` or finer."""
+        return _merge((e[3], e[4]) for e in self._matching(coin_id, vs_currency, granularity))
+
+    def gaps(self, coin_id, vs_currency, start, end, granularity='daily', now=None):
+        """Sub-ranges of [start, end] not covered yet. Gaps shorter than one
+        granularity step are ignored (there is no point to fetch there), except
+        the trailing gap of a window ending at the live edge (within one step of
+        `now`): new points may have arrived there since the last fetch."""
+        min_gap = GRANULARITY_SECONDS[granularity]
+        now = time.time() if now is None else now
+        out = []
+        cursor = start
+        for a, b in self.covered(coin_id, vs_currency, granularity):
+            if b < cursor:
+                continue
+            if a > end:
+                break
+            if a > cursor:
+                out.append((cursor, min(a - 1, end)))
+            cursor = max(cursor, b + 1)
+            if cursor > end:
+                break
+        if cursor <= end:
+            out.append((cursor, end))
+        live = now - end < min_gap
+        return [(a, b) for a, b in out if b - a >= min_gap or (live and b == end)]
+
+    def files(self, coin_id, vs_currency, start, end, granularity='daily'):
+        """Raw file names whose window overlaps [start, end], oldest window first."""
+        hits = [e for e in self._matching(coin_id, vs_currency, granularity) if e[3] <= end and e[4] >= start]
+        return [e[5] for e in sorted(hits, key=lambda e: (e[3], e[4]))]
@@ -1,12 +1,22 @@
 import streamlit as st
 import os
-import pandas as pd
+import threading
 import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 from pathlib import Path
 from datetime import datetime, timedelta
 from viz import plot_candlestick_plotly
 from fetch_realtime import fetch_realtime_data, fetch_realtime_range
+from indicators import add_indicators
+from signals import compute_signals
+from store import time_bounds
+from arrow_cache import open_series, signature
+from compare import compare, series_name
+from downsample import lttb, minmax_ohlc, histogram
+from process_data import pyramid_level, resample_ohlc, rule_delta
+from live import ApiSource, LiveFeed, ReplaySource
+import instrument
 
 ROOT = Path(__file__).resolve().parents[1]
 PROCESSED_DIR = ROOT / 'data/processed'
@@ -16,7 +26,35 @@ st.title('BTC Visualization Dashboard (CoinGecko)')
 
 # === Sidebar: Data Mode ===
 st.sidebar.header("Data Mode")
-mode = st.sidebar.radio("Select data mode", ["Offline", "Realtime (last N minutes)", "Custom Range"])
+mode = st.sidebar.radio("Select data mode", ["Offline", "Realtime (last N minutes)", "Custom Range", "Live (streaming)"])
+debug = st.sidebar.checkbox("Debug timings", False, help="Per-section timings of this rerun, downloadable as JSON / Chrome trace")
+profiler_kind = st.sidebar.selectbox("Profile this rerun", ["off"] + list(instrument.Profiler.KINDS)) if debug else "off"
+
+# timings of this rerun: everything recorded on the script thread from here on
+run_start, run_thread = instrument.clock(), threading.get_ident()
+lap = instrument.Lap('dashboard')
+profiler = None
+if profiler_kind != "off":
+    if instrument.Profiler.available(profiler_kind):
+        profiler = instrument.Profiler(profiler_kind).start()
+    else:
+        st.sidebar.warning(f"{profiler_kind} is not installed")
+
+
+def halt():
+    # ends the rerun early; stop a profile in progress with it
+    if profiler is not None:
+        profiler.stop()
+    st.stop()
+
+
+def show(fig):
+    # Plotly serialization + hand-off to the frontend, timed apart from building the figure
+    with instrument.timer('dashboard.plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
+
+
+lap('load')
 
 # === Load Data ===
 if mode == "Realtime (last N minutes)":
@@ -25,20 +63,88 @@ if mode == "Realtime (last N minutes)":
         df = fetch_realtime_data("bitcoin", "usd", minutes=minutes, cache_seconds=300)
     except Exception as e:
         st.error(f"Cannot fetch realtime data: {e}")
-        st.stop()
+        halt()
+    fetched = df.attrs.get('fetch')
+    if fetched:
+        st.sidebar.caption(f"Last refresh: {fetched['points_fetched']:,} points ({fetched['bytes_fetched'] / 1024:.1f} KB) "
+                           f"in {fetched['requests']} request(s) for {fetched['points_used']:,} shown")
 elif mode == "Custom Range":
     start_date = st.sidebar.date_input("Start date", datetime.utcnow().date() - timedelta(days=7))
     end_date = st.sidebar.date_input("End date", datetime.utcnow().date())
     if start_date > end_date:
         st.error("Start date must be before End date")
-        st.stop()
+        halt()
     start_dt = datetime.combine(start_date, datetime.min.time())
     end_dt = datetime.combine(end_date, datetime.max.time())
     try:
         df = fetch_realtime_range("bitcoin", "usd", start=start_dt, end=end_dt, cache_seconds=300)
     except Exception as e:
         st.error(f"Cannot fetch custom range data: {e}")
-        st.stop()
+        halt()
+elif mode == "Live (streaming)":
+    RAW_DIR = ROOT / 'data' / 'raw'
+    replays = sorted(f.name for f in RAW_DIR.glob('*market_chart*') if f.suffix in ('.json', '.npz'))
+    source_name = st.sidebar.selectbox("Source", ['CoinGecko API'] + [f'Replay {name}' for name in replays])
+    refresh = st.sidebar.slider("Refresh every (s)", 1, 60, 5)
+    window = st.sidebar.number_input("Points shown", 100, 10000, 1000, step=100)
+
+    @st.cache_resource
+    def live_feed(source_name):
+        # one ingestion thread per source, shared by every session
+        if source_name == 'CoinGecko API':
+            source = ApiSource('bitcoin', 'usd', lookback_minutes=60, interval=30.0)
+        else:
+            source = ReplaySource(RAW_DIR / source_name[len('Replay '):], batch=5, interval=1.0, loop=True)
+        feed = LiveFeed(source)
+        try:
+            feed.step()  # first ticks before the first render
+        except Exception as e:
+            feed.error = e
+        return feed.start()
+
+    feed = live_feed(source_name)
+    LIVE_COLUMNS = [('close', 'Price'), ('MA_short', 'MA7'), ('MA_long', 'MA30'),
+                    ('BB_upper', 'BB Upper'), ('BB_lower', 'BB Lower')]
+
+    def extend_figure(fig, new, window):
+        # append only the new points to the existing traces, keep the last `window`
+        for trace, (col, _) in zip(fig.data, LIVE_COLUMNS):
+            trace.x = np.concatenate([np.asarray(trace.x, dtype='datetime64[ns]'),
+                                      new.index.tz_localize(None).to_numpy()])[-window:]
+            trace.y = np.concatenate([np.asarray(trace.y, dtype=float), new[col].to_numpy(dtype=float)])[-window:]
+
+    @st.fragment(run_every=refresh)
+    def live_panel():
+        # reruns alone every `refresh` seconds: only the rows appended since the last
+        # run are read from the feed, indicators are already up to date
+        key = f'live:{source_name}'
+        state = st.session_state.get(key)
+        if state is None:
+            fig = go.Figure([go.Scatter(x=[], y=[], name=name, mode='lines',
+                                        line=dict(dash='dot', color='red') if col.startswith('BB') else None)
+                             for col, name in LIVE_COLUMNS])
+            fig.update_layout(uirevision='live')
+            state = st.session_state[key] = {'seq': 0, 'fig': fig, 'last': None}
+        new, state['seq'] = feed.since(state['seq'])
+        if not new.empty:
+            extend_figure(state['fig'], new, int(window))
+            state['last'] = new.iloc[-1]
+        if feed.error is not None:
+            st.warning(f"Live source error (retrying): {feed.error}")
+        if state['last'] is None:
+            st.info('Waiting for the first ticks...')
+            return
+        last = state['last']
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric('Price', f"{last['close']:,.2f}", f"{last['pct_change'] * 100:+.3f}%" if pd.notna(last['pct_change']) else None)
+        c2.metric('RSI', f"{last['RSI']:.1f}" if pd.notna(last['RSI']) else '-')
+        c3.metric('Drawdown', f"{last['drawdown'] * 100:.2f}%")
+        c4.metric('Ticks', f"{feed.seq:,}")
+        st.plotly_chart(state['fig'], use_container_width=True)
+
+    st.header('Live Price & Indicators')
+    live_panel()
+    halt()
 else:  # Offline
     files = list(PROCESSED_DIR.glob('*.parquet')) if PROCESSED_DIR.exists() else []
     file_choices = st.sidebar.multiselect(
@@ -48,46 +154,65 @@ else:  # Offline
     )
     if not file_choices:
         st.info('No processed files found.')
-        st.stop()
+        halt()
     file_choice = file_choices[0]
 
-    @st.cache_data
-    def load_parquet(path):
-        df = pd.read_parquet(path)
-        df.index = pd.to_datetime(df.index)
-        return df
+    @st.cache_resource(max_entries=32)
+    def open_mapped(path, sig):
+        # one memory-mapped Arrow copy per series version, shared by all sessions;
+        # sig changes whenever a Parquet part is rewritten or appended
+        return open_series(path)
+
+    def load_parquet(path, start=None, end=None):
+        # start/end are dates; only the rows in range are copied out of the mapping
+        series = open_mapped(str(path), signature(path))
+        return series.slice(start=pd.Timestamp(start) if start else None,
+                            end=pd.Timestamp(end) + pd.Timedelta(days=1) if end else None)
 
-    df = load_parquet(PROCESSED_DIR / file_choice)
-    # Range filter
-    min_date = df.index.min().date()
-    max_date = df.index.max().date()
+    # Range filter over all selected files (bounds come from the Parquet footers, no rows are read)
+    bounds = [b for b in (time_bounds(PROCESSED_DIR / f) for f in file_choices) if b is not None]
+    if not bounds:
+        st.info('Selected file is empty.')
+        halt()
+    min_date = min(b[0] for b in bounds).date()
+    max_date = max(b[1] for b in bounds).date()
     start, end = st.sidebar.slider(
         'Select range',
         min_value=min_date,
         max_value=max_date,
         value=(min_date, max_date)
     )
-    df = df.loc[(df.index.date >= start) & (df.index.date <= end)]
+    df = load_parquet(PROCESSED_DIR / file_choice, start, end)
 
 # === Chart Options ===
 st.sidebar.header('Chart Options')
 ma_short = st.sidebar.number_input('MA short window', 1, 200, 7)
 ma_long = st.sidebar.number_input('MA long window', 1, 400, 30)
-resample_option = st.sidebar.selectbox('Resample interval', ['None','1D','12H','6H','4H','1H'])
+resample_option = st.sidebar.selectbox('Resample interval', ['None','1D','12h','6h','4h','1h'])
 show_close = st.sidebar.checkbox('Show Close', True)
 show_ma_short = st.sidebar.checkbox('Show MA Short', True)
 show_ma_long = st.sidebar.checkbox('Show MA Long', True)
 show_bb_upper = st.sidebar.checkbox('Show BB Upper', True)
 show_bb_lower = st.sidebar.checkbox('Show BB Lower', True)
 show_volume = st.sidebar.checkbox('Show Volume', True)
+max_points = st.sidebar.number_input('Max points per trace', 200, 20000, 2000, step=200)
 
 # === Resample if needed ===
+lap('resample')
 df_work = df.copy()
-if resample_option != 'None' and not df_work.empty:
+level = None
+if mode == 'Offline' and resample_option != 'None':
+    # coarsest precomputed pyramid level (see process_data.process_pyramid) that adds up to the interval
+    level = pyramid_level(PROCESSED_DIR / file_choice, resample_option)
+if level is not None:
+    level_rule, level_path = level
+    df_work = load_parquet(level_path, start, end)
+    df_work = df_work[[c for c in ['open','high','low','close','volume'] if c in df_work.columns]]
+    if rule_delta(level_rule) != rule_delta(resample_option):
+        df_work = resample_ohlc(df_work, resample_option)
+elif resample_option != 'None' and not df_work.empty:
     if set(['open','high','low','close']).issubset(df_work.columns):
-        df_work = df_work.resample(resample_option).agg({
-            'open':'first','high':'max','low':'min','close':'last','volume':'sum'
-        })
+        df_work = resample_ohlc(df_work, resample_option)
     elif 'price' in df_work.columns:
         df_work = df_work['price'].resample(resample_option).agg(['first','max','min','last'])
         df_work.columns = ['open','high','low','close']
@@ -95,103 +220,154 @@ if resample_option != 'None' and not df_work.empty:
 df_work.dropna(inplace=True)
 
 # === Compute indicators ===
+lap('indicators')
 if 'close' not in df_work.columns and 'price' in df_work.columns:
     df_work['close'] = df_work['price']
 
-df_work['MA_short'] = df_work['close'].rolling(ma_short).mean()
-df_work['MA_long'] = df_work['close'].rolling(ma_long).mean()
-df_work['BB_mid'] = df_work['close'].rolling(20).mean()
-df_work['BB_std'] = df_work['close'].rolling(20).std()
-df_work['BB_upper'] = df_work['BB_mid'] + 2*df_work['BB_std']
-df_work['BB_lower'] = df_work['BB_mid'] - 2*df_work['BB_std']
-
-df_work['pct_change'] = df_work['close'].pct_change()
-df_work['log_return'] = np.log(df_work['close']/df_work['close'].shift(1))
-cum = (1 + df_work['pct_change']).cumprod()
-df_work['drawdown'] = cum / cum.cummax() - 1
-df_work['rolling_vol_30d'] = df_work['log_return'].rolling(30).std() * np.sqrt(365)
-
-# RSI 14
-delta = df_work['close'].diff()
-up = delta.clip(lower=0)
-down = -delta.clip(upper=0)
-roll_up = up.rolling(14).mean()
-roll_down = down.rolling(14).mean()
-RS = roll_up / roll_down
-df_work['RSI'] = 100 - (100 / (1 + RS))
+df_work = add_indicators(df_work, ma_short=ma_short, ma_long=ma_long)
 
 # Trading Signals (MA crossover + RSI + Bollinger)
-signals = []
-for i in range(len(df_work)):
-    sig = "Hold"
-    if i>0:
-        if df_work['MA_short'].iloc[i] > df_work['MA_long'].iloc[i] and df_work['MA_short'].iloc[i-1] <= df_work['MA_long'].iloc[i-1]:
-            sig = "Buy"
-        elif df_work['MA_short'].iloc[i] < df_work['MA_long'].iloc[i] and df_work['MA_short'].iloc[i-1] >= df_work['MA_long'].iloc[i-1]:
-            sig = "Sell"
-        if df_work['RSI'].iloc[i] < 30:
-            sig = "Buy"
-        elif df_work['RSI'].iloc[i] > 70:
-            sig = "Sell"
-        if df_work['close'].iloc[i] < df_work['BB_lower'].iloc[i]:
-            sig = "Buy"
-        elif df_work['close'].iloc[i] > df_work['BB_upper'].iloc[i]:
-            sig = "Sell"
-    signals.append(sig)
-df_work['Signal'] = signals
+lap('signals')
+df_work['Signal'] = compute_signals(df_work)
+
+# === Viewport ===
+lap('viewport')
+# Indicators above use the full series; the zoom window only picks what is drawn,
+# and every chart is decimated from full resolution inside that window.
+view = df_work
+if len(df_work) > 1:
+    tz = df_work.index.tz
+    lo = df_work.index.min().tz_localize(None).to_pydatetime()
+    hi = df_work.index.max().tz_localize(None).to_pydatetime()
+    step = max(pd.Timedelta(minutes=1), pd.Series(df_work.index).diff().median())
+    zoom = st.sidebar.slider('Zoom window', min_value=lo, max_value=hi, value=(lo, hi), step=step.to_pytimedelta())
+    view = df_work.loc[pd.Timestamp(zoom[0]).tz_localize(tz):pd.Timestamp(zoom[1]).tz_localize(tz)]
+
+
+def line(col, **kwargs):
+    s = lttb(view[col], max_points)
+    return go.Scatter(x=s.index, y=s.values, **kwargs)
+
 
 # === Price & Indicators plot ===
+lap('chart.price')
 st.header('Price & Technical Indicators')
 fig_price = go.Figure()
 if show_close:
-    fig_price.add_trace(go.Scatter(x=df_work.index, y=df_work['close'], name='Close'))
+    fig_price.add_trace(line('close', name='Close'))
 if show_ma_short:
-    fig_price.add_trace(go.Scatter(x=df_work.index, y=df_work['MA_short'], name=f'MA{ma_short}'))
+    fig_price.add_trace(line('MA_short', name=f'MA{ma_short}'))
 if show_ma_long:
-    fig_price.add_trace(go.Scatter(x=df_work.index, y=df_work['MA_long'], name=f'MA{ma_long}'))
+    fig_price.add_trace(line('MA_long', name=f'MA{ma_long}'))
 if show_bb_upper:
-    fig_price.add_trace(go.Scatter(x=df_work.index, y=df_work['BB_upper'], name='BB Upper', line=dict(dash='dot', color='red')))
+    fig_price.add_trace(line('BB_upper', name='BB Upper', line=dict(dash='dot', color='red')))
 if show_bb_lower:
-    fig_price.add_trace(go.Scatter(x=df_work.index, y=df_work['BB_lower'], name='BB Lower', line=dict(dash='dot', color='red')))
-st.plotly_chart(fig_price, use_container_width=True)
+    fig_price.add_trace(line('BB_lower', name='BB Lower', line=dict(dash='dot', color='red')))
+show(fig_price)
 
 # === Candlestick ===
+lap('chart.candlestick')
 st.header('Candlestick Chart')
-if set(['open','high','low','close']).issubset(df_work.columns):
-    fig_candle = plot_candlestick_plotly(df_work)
-    if show_volume and 'volume' in df_work.columns:
-        fig_candle.add_trace(go.Bar(x=df_work.index, y=df_work['volume'], name='Volume', marker={'color':'lightgrey'}, yaxis='y2'))
+if set(['open','high','low','close']).issubset(view.columns):
+    candles = minmax_ohlc(view[[c for c in ['open','high','low','close','volume'] if c in view.columns]], max_points)
+    fig_candle = plot_candlestick_plotly(candles)
+    if show_volume and 'volume' in candles.columns:
+        fig_candle.add_trace(go.Bar(x=candles.index, y=candles['volume'], name='Volume', marker={'color':'lightgrey'}, yaxis='y2'))
         fig_candle.update_layout(yaxis2=dict(overlaying='y', side='right', showgrid=False, position=0.15))
-    st.plotly_chart(fig_candle, use_container_width=True)
+    show(fig_candle)
 
 # === Log-return Histogram ===
+lap('chart.histogram')
 st.header('Log-Return Histogram')
+centers, counts, width = histogram(view['log_return'], nbins=50)
 fig_hist = go.Figure()
-fig_hist.add_trace(go.Histogram(x=df_work['log_return'], nbinsx=50))
-st.plotly_chart(fig_hist, use_container_width=True)
+fig_hist.add_trace(go.Bar(x=centers, y=counts, width=width, name='log_return'))
+fig_hist.update_layout(bargap=0)
+show(fig_hist)
 
 # === Drawdown ===
+lap('chart.drawdown')
 st.header('Drawdown Chart')
 fig_dd = go.Figure()
-fig_dd.add_trace(go.Scatter(x=df_work.index, y=df_work['drawdown'], fill='tozeroy', name='Drawdown'))
-st.plotly_chart(fig_dd, use_container_width=True)
+fig_dd.add_trace(line('drawdown', fill='tozeroy', name='Drawdown'))
+show(fig_dd)
 
 # === Rolling Volatility ===
+lap('chart.volatility')
 st.header('30-Day Rolling Volatility')
 fig_vol = go.Figure()
-fig_vol.add_trace(go.Scatter(x=df_work.index, y=df_work['rolling_vol_30d'], name='Rolling Volatility'))
-st.plotly_chart(fig_vol, use_container_width=True)
+fig_vol.add_trace(line('rolling_vol_30d', name='Rolling Volatility'))
+show(fig_vol)
 
 # === RSI ===
+lap('chart.rsi')
 st.header('RSI 14')
 fig_rsi = go.Figure()
-fig_rsi.add_trace(go.Scatter(x=df_work.index, y=df_work['RSI'], name='RSI'))
-st.plotly_chart(fig_rsi, use_container_width=True)
+fig_rsi.add_trace(line('RSI', name='RSI'))
+show(fig_rsi)
 
 # === Trading Signals Table ===
+lap('table')
 st.header('Trading Signals (Last 50 rows)')
 st.dataframe(df_work[['close','MA_short','MA_long','RSI','BB_upper','BB_lower','Signal']].tail(50))
 
 # === Statistics Summary ===
+lap('statistics')
 st.header('Statistics Summary')
 st.write(df_work.describe())
+
+# === Comparison (several processed files) ===
+if mode == 'Offline' and len(file_choices) > 1:
+    lap('comparison')
+    st.header(f'Comparison ({len(file_choices)} series)')
+    range_start, range_end = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+    benchmark = series_name(file_choice)
+    # the shared mappings are looked up on the script thread (Streamlit caches are not
+    # called off it); compare then slices them in its thread pool
+    mapped = {PROCESSED_DIR / f: open_mapped(str(PROCESSED_DIR / f), signature(PROCESSED_DIR / f))
+              for f in file_choices}
+    cmp = compare(
+        list(mapped),
+        loader=lambda p: mapped[p].slice(range_start, range_end, columns=['close', 'price']),
+        benchmark=benchmark,
+    )
+    # keep the total number of plotted points bounded however many series are selected
+    budget = max(200, 10 * max_points // len(file_choices))
+
+    fig_norm = go.Figure()
+    for name, col in cmp['normalized'].items():
+        s = lttb(col, budget)
+        fig_norm.add_trace(go.Scatter(x=s.index, y=s.values, name=name))
+    fig_norm.update_layout(title='Normalized price (first value = 100)')
+    show(fig_norm)
+
+    corr = cmp['correlation']
+    fig_corr = go.Figure(go.Heatmap(z=corr.values, x=corr.columns, y=corr.index, zmin=-1, zmax=1, colorscale='RdBu'))
+    fig_corr.update_layout(title='Correlation of log returns')
+    show(fig_corr)
+
+    fig_rdd = go.Figure()
+    for name, col in cmp['drawdown'].drop(columns=[benchmark]).items():
+        s = lttb(col, budget)
+        fig_rdd.add_trace(go.Scatter(x=s.index, y=s.values, name=name))
+    fig_rdd.update_layout(title=f'Drawdown relative to {benchmark}')
+    show(fig_rdd)
+
+# === Debug panel ===
+lap.stop()
+profile_report = profiler.stop() if profiler is not None else None
+if debug:
+    st.header('Debug: timings (this rerun)')
+    report = instrument.summary(since=run_start, thread=run_thread)
+    st.dataframe(pd.DataFrame.from_dict(report['timers'], orient='index').round(2))
+    if report['counters']:
+        st.caption('Counters (whole process)')
+        st.json(report['counters'])
+    c1, c2 = st.columns(2)
+    c1.download_button('Timings (JSON)', instrument.dump_json(since=run_start, thread=run_thread),
+                       file_name='timings.json', mime='application/json')
+    c2.download_button('Chrome trace', instrument.dump_chrome_trace(since=run_start, thread=run_thread),
+                       file_name='trace.json', mime='application/json')
+    if profile_report:
+        with st.expander(f'{profiler_kind} profile'):
+            st.code(profile_report)
@@ -0,0 +1,78 @@
+"""Server-side decimation of series before they are sent to Plotly.
+
+- `lttb`: Largest-Triangle-Three-Buckets for line traces; keeps the visual shape
+  (peaks, troughs) of a series with a fixed number of points.
+- `minmax_ohlc`: merges consecutive candles into equal-count bins (first open,
+  max high, min low, last close, summed volume), so no extreme is lost.
+
+Both return the input unchanged when it already fits the point budget.
+"""
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points LTTB keeps out of (x, y). x must be increasing."""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)  # no bucket in between
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # bucket i (of n_out - 2) covers [edges[i], edges[i + 1]); first/last points are kept
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (the last point for the final bucket)
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = (cx[nhi] - cx[nlo]) / (nhi - nlo)
+        avg_y = (cy[nhi] - cy[nlo]) / (nhi - nlo)
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x) * (ys - y[a]) - (x[a] - xs) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def lttb(series, n_out):
+    """Decimates a time-indexed Series to at most n_out points (NaNs are dropped first)."""
+    s = series.dropna()
+    if len(s) <= n_out:
+        return s
+    x = s.index.asi8 if isinstance(s.index, pd.DatetimeIndex) else s.index.to_numpy()
+    return s.iloc[lttb_indices(x, s.to_numpy(dtype=np.float64), n_out)]
+
+
+def minmax_ohlc(df, n_bins):
+    """Aggregates an OHLC(V) frame into at most n_bins candles of equal row count."""
+    n = len(df)
+    if n <= n_bins:
+        return df
+    starts = np.unique(np.linspace(0, n, n_bins, endpoint=False).astype(np.int64))
+    ends = np.append(starts[1:], n) - 1
+    out = {
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends],
+    }
+    if 'volume' in df.columns:
+        out['volume'] = np.add.reduceat(df['volume'].to_numpy(), starts)
+    return pd.DataFrame(out, index=df.index[starts])
+
+
+def histogram(series, nbins=50):
+    """(bin centers, counts, bin width) of a series, so only nbins values are shipped."""
+    values = series.dropna().to_numpy(dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return np.empty(0), np.empty(0), 0.0
+    counts, edges = np.histogram(values, bins=nbins)
+    return (edges[:-1] + edges[1:]) / 2, counts, edges[1] - edges[0]
@@ -1,31 +1,55 @@
 import time
 import json
 import os
-from pycoingecko import CoinGeckoAPI
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 import calendar
 import requests
+import numpy as np
 import pandas as pd
 
+try:
+    from . import coverage, http_client, instrument, raw_io
+except ImportError:  # run from inside src/ (streamlit, scripts)
+    import coverage, http_client, instrument, raw_io
+
 ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA_DIR = os.path.join(ROOT, "data", "raw")
 METADATA_DIR = os.path.join(ROOT, "data", "raw", "meta")
 
-cg = CoinGeckoAPI()
+# 'json' (readable, the default) or 'npz' (compressed, lossless; see raw_io.write_npz)
+RAW_FORMAT = os.environ.get("BTC_RAW_FORMAT", "json")
 
 def save_json(obj, fname):
     os.makedirs(DATA_DIR, exist_ok=True)
     with open(os.path.join(DATA_DIR, fname), "w", encoding="utf-8") as f:
         json.dump(obj, f, ensure_ascii=False, indent=2)
 
+def save_raw(obj, fname, fmt=None):
+    """Save a raw API response in RAW_FORMAT (or `fmt`). `fname` is the .json name;
+    returns the file name actually written (extension follows the format)."""
+    fmt = fmt or RAW_FORMAT
+    if fmt not in raw_io.RAW_FORMATS:
+        raise ValueError(f"Unknown raw format: {fmt} (expected one of {raw_io.RAW_FORMATS})")
+    if fmt == "npz":
+        os.makedirs(DATA_DIR, exist_ok=True)
+        fname = raw_io.npz_name(fname)
+        raw_io.write_npz(os.path.join(DATA_DIR, fname), obj)
+    else:
+        save_json(obj, fname)
+    return fname
+
 def save_meta(meta, fname):
     os.makedirs(METADATA_DIR, exist_ok=True)
     with open(os.path.join(METADATA_DIR, fname), "w", encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
 
-def fetch_market_chart_range(coin_id="bitcoin", vs_currency="usd", from_dt=None, to_dt=None):
+@instrument.timer("fetch_data.market_chart_range")
+def fetch_market_chart_range(coin_id="bitcoin", vs_currency="usd", from_dt=None, to_dt=None, limiter=None):
     """
     from_dt, to_dt: datetime objects (UTC)
+    limiter: optional http_client.TokenBucket shared between concurrent callers
     Saves raw JSON and metadata. Returns path to saved JSON.
     """
     if from_dt is None or to_dt is None:
@@ -34,14 +58,12 @@ def fetch_market_chart_range(coin_id="bitcoin", vs_currency="usd", from_dt=None,
     to_unix   = int(calendar.timegm(to_dt.timetuple()))
     print(f"Fetch market_chart range {coin_id} {from_unix} -> {to_unix}")
     try:
-        res = cg.get_coin_market_chart_range_by_id(id=coin_id, vs_currency=vs_currency,
-                                                   from_timestamp=from_unix, to_timestamp=to_unix)
-    except requests.exceptions.HTTPError as e:
-        # attempts to unwrap API error message (pycoingecko wraps HTTP errors into ValueError sometimes)
-        msg = str(e)
-        raise RuntimeError("CoinGecko HTTP error: " + msg)
-    except ValueError as e:
-        # pycoingecko raises ValueError with API JSON on some errors
+        res = http_client.get_json(f"/coins/{coin_id}/market_chart/range",
+                                   params={"vs_currency": vs_currency, "from": from_unix, "to": to_unix},
+                                   limiter=limiter)
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError("CoinGecko HTTP error: " + str(e))
+    except http_client.APIError as e:
         msg = str(e)
         if 'exceeds the allowed time range' in msg or '10012' in msg:
             raise RuntimeError(
@@ -50,26 +72,30 @@ def fetch_market_chart_range(coin_id="bitcoin", vs_currency="usd", from_dt=None,
                 'Workarounds: (1) request a range within the last 365 days, (2) use the `fetch_recent_market_chart` helper for last-N-days, '\
                 '(3) upgrade to a paid CoinGecko plan, or (4) use an exchange API (e.g., Binance) for full historical data.'
             )
-        raise
-    fname = f"coingecko_{coin_id}_market_chart_{from_unix}_{to_unix}.json"
-    save_json(res, fname)
+        raise RuntimeError("CoinGecko HTTP error: " + msg)
+    fname = f"coingecko_{coin_id}_{vs_currency}_market_chart_{from_unix}_{to_unix}.json"
+    last_point = _last_point(res.get("prices"))
+    fname = save_raw(res, fname)
     meta = {
         "coin_id": coin_id,
         "vs_currency": vs_currency,
         "endpoint": "market_chart_range",
         "from": from_unix,
         "to": to_unix,
+        "granularity": coverage.api_granularity(from_unix, to_unix),
+        "last_point": last_point,
         "fetched_at": int(time.time())
     }
     save_meta(meta, fname + ".meta.json")
     return os.path.join(DATA_DIR, fname)
 
+@instrument.timer("fetch_data.ohlc")
 def fetch_ohlc(coin_id="bitcoin", vs_currency="usd", days=30):
     """days can be 1,7,14,30,90,180,365,max — returns list of [ts,open,high,low,close]"""
     print(f"Fetch ohlc {coin_id} {days}d")
-    res = cg.get_coin_ohlc_by_id(id=coin_id, vs_currency=vs_currency, days=days)
-    fname = f"coingecko_{coin_id}_ohlc_{days}d.json"
-    save_json(res, fname)
+    res = http_client.get_json(f"/coins/{coin_id}/ohlc", params={"vs_currency": vs_currency, "days": days})
+    fname = f"coingecko_{coin_id}_{vs_currency}_ohlc_{days}d.json"
+    fname = save_raw(res, fname)
     meta = {
         "coin_id": coin_id,
         "vs_currency": vs_currency,
@@ -81,15 +107,27 @@ def fetch_ohlc(coin_id="bitcoin", vs_currency="usd", days=30):
     return os.path.join(DATA_DIR, fname)
 
 
-def fetch_recent_market_chart(coin_id="bitcoin", vs_currency="usd", days=90):
+@instrument.timer("fetch_data.recent_market_chart")
+def fetch_recent_market_chart(coin_id="bitcoin", vs_currency="usd", days=90, incremental=False, limiter=None,
+                              out_fname=None):
     """Convenience helper: fetch market_chart for the last `days` using CoinGecko `market_chart` endpoint.
     This avoids using the range endpoint (which may be restricted for older history).
     days can be 1,7,14,30,90,180,365,max (subject to API limits).
+
+    incremental=True only downloads the parts of the window that data/raw does not
+    already hold (see `fetch_market_chart_incremental`) and rewrites the same
+    last{days}d file from what is on disk. Not available for days='max'.
+    out_fname overrides the default `coingecko_{coin}_{currency}_market_chart_last{days}d.json`.
     """
+    fname = out_fname or f"coingecko_{coin_id}_{vs_currency}_market_chart_last{days}d.json"
+    if incremental and days != 'max':
+        now = int(time.time())
+        return fetch_market_chart_incremental(coin_id, vs_currency, _utc(now - int(float(days) * 86400)), _utc(now),
+                                              limiter=limiter, out_fname=fname, days=days)[-1]
     print(f"Fetch recent market_chart {coin_id} last {days} days")
-    res = cg.get_coin_market_chart_by_id(id=coin_id, vs_currency=vs_currency, days=days)
-    fname = f"coingecko_{coin_id}_market_chart_last{days}d.json"
-    save_json(res, fname)
+    res = http_client.get_json(f"/coins/{coin_id}/market_chart", params={"vs_currency": vs_currency, "days": days},
+                               limiter=limiter)
+    fname = save_raw(res, fname)
     meta = {
         "coin_id": coin_id,
         "vs_currency": vs_currency,
@@ -101,15 +139,149 @@ def fetch_recent_market_chart(coin_id="bitcoin", vs_currency="usd", days=90):
     return os.path.join(DATA_DIR, fname)
 
 
-def fetch_market_chart_range_chunked(coin_id="bitcoin", vs_currency="usd", from_dt=None, to_dt=None, chunk_days=365, pause_sec=1, merge=True):
+def _last_point(prices):
+    """Unix seconds of the newest [ts_ms, value] row, or None when there is none."""
+    if prices is None or len(prices) == 0:
+        return None
+    return int(np.asarray(prices, dtype=np.float64)[:, 0].max() // 1000)
+
+
+def _remove_raw(path):
+    for p in (path, os.path.join(METADATA_DIR, os.path.basename(path) + ".meta.json")):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def _utc(unix):
+    """Unix seconds -> naive UTC datetime (the convention of every fetcher here)."""
+    return datetime.fromtimestamp(unix, timezone.utc).replace(tzinfo=None)
+
+@instrument.timer("fetch_data.market_chart_incremental")
+def fetch_market_chart_incremental(coin_id="bitcoin", vs_currency="usd", from_dt=None, to_dt=None, limiter=None,
+                                   out_fname=None, days=None):
+    """Fetch [from_dt, to_dt] downloading only the time ranges not already in data/raw.
+
+    The coverage index (see `coverage`) is built from the data/raw/meta sidecars;
+    each gap is fetched with the range endpoint (split into <=365-day chunks), then
+    every raw file overlapping the window is merged, clipped to the window and
+    saved as one file (by default `..._{from}_{to}_merged.json`).
+
+    Coverage ends at the last point actually received, and the trailing gap up to
+    now is always asked for, so repeated runs keep picking up new points. Gap
+    requests that return no points are not kept; when no new point arrived at all
+    and the output file already exists, it is left as it is (same content and
+    `fetched_at`).
+
+    Returns the list of newly fetched gap files with the merged file path last.
+    """
+    if from_dt is None or to_dt is None:
+        raise ValueError('from_dt and to_dt are required datetime objects (UTC)')
+    from_unix = int(calendar.timegm(from_dt.timetuple()))
+    to_unix = int(calendar.timegm(to_dt.timetuple()))
+    granularity = coverage.api_granularity(from_unix, to_unix)
+
+    index = coverage.CoverageIndex.from_dir(METADATA_DIR, DATA_DIR)
+    gaps = index.gaps(coin_id, vs_currency, from_unix, to_unix, granularity)
+    print(f"Incremental market_chart {coin_id}: {len(gaps)} gap(s) to fetch in {from_unix} -> {to_unix}")
+    fetched = []
+    for a, b in gaps:
+        for chunk_start, chunk_end in _chunk_bounds(_utc(a), _utc(b), 365):
+            path = fetch_market_chart_range(coin_id, vs_currency, chunk_start, chunk_end, limiter=limiter)
+            if len(raw_io.read_market_chart(path, keys=("prices",))["prices"]) == 0:
+                _remove_raw(path)  # nothing there (yet): it must not count as covered
+            else:
+                fetched.append(path)
+
+    out_name = out_fname or f"coingecko_{coin_id}_{vs_currency}_market_chart_{from_unix}_{to_unix}_merged.json"
+    out_path = os.path.join(DATA_DIR, raw_io.npz_name(out_name) if RAW_FORMAT == "npz" else out_name)
+    if not fetched and os.path.exists(out_path):
+        return [out_path]
+
+    index = coverage.CoverageIndex.from_dir(METADATA_DIR, DATA_DIR)
+    sources = index.files(coin_id, vs_currency, from_unix, to_unix, granularity)
+    keys = raw_io.MARKET_CHART_KEYS
+    chunks = [raw_io.read_market_chart(os.path.join(DATA_DIR, p), keys=keys) for p in sources]
+    merged = {}
+    for k in keys:
+        rows = merge_rows([c[k] for c in chunks])
+        merged[k] = rows[(rows[:, 0] >= from_unix * 1000) & (rows[:, 0] <= to_unix * 1000)]
+    if RAW_FORMAT == 'json':
+        merged = {k: rows_to_lists(v) for k, v in merged.items()}
+
+    last_point = _last_point(merged["prices"])
+    fname = save_raw(merged, out_name)
+    meta = {
+        "coin_id": coin_id,
+        "vs_currency": vs_currency,
+        "granularity": granularity,
+        "sources": sources,
+        "gaps_fetched": len(fetched),
+        "last_point": last_point,
+        "fetched_at": int(time.time())
+    }
+    if days is not None:
+        meta.update({"endpoint": "market_chart", "days": days, "fetched_at": to_unix})
+    else:
+        meta.update({"endpoint": "market_chart_range_merged", "from": from_unix, "to": to_unix})
+    save_meta(meta, fname + ".meta.json")
+    return fetched + [os.path.join(DATA_DIR, fname)]
+
+def merge_rows(parts):
+    """Concatenate [timestamp, value] row arrays, keep the first row per timestamp, sort by time."""
+    rows = np.concatenate(parts) if parts else np.empty((0, 2))
+    _, first = np.unique(rows[:, 0], return_index=True)
+    return rows[first]
+
+def rows_to_lists(rows):
+    """[timestamp, value] array -> JSON-ready list of [int ms, float] pairs."""
+    return [[t, v] for t, v in zip(rows[:, 0].astype(np.int64).tolist(), rows[:, 1].tolist())]
+
+
+def _chunk_bounds(from_dt, to_dt, chunk_days):
+    bounds = []
+    chunk_start = from_dt
+    while chunk_start < to_dt:
+        chunk_end = min(chunk_start + pd.Timedelta(days=chunk_days) - pd.Timedelta(seconds=1), to_dt)
+        bounds.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + pd.Timedelta(seconds=1)
+    return bounds
+
+def _load_checkpoint(path, params):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        ckpt = json.load(f)
+    if ckpt.get("params") != params:
+        return {}
+    # only trust chunks whose files are still on disk
+    return {k: p for k, p in ckpt.get("done", {}).items() if os.path.exists(os.path.join(DATA_DIR, p))}
+
+def _save_checkpoint(path, params, done):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"params": params, "done": done, "updated_at": int(time.time())}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+@instrument.timer("fetch_data.market_chart_range_chunked")
+def fetch_market_chart_range_chunked(coin_id="bitcoin", vs_currency="usd", from_dt=None, to_dt=None, chunk_days=365, pause_sec=1, merge=True,
+                                     max_workers=4, rate_per_min=None, resume=True):
     """Fetch a long historical range by splitting into chunks each at most `chunk_days` long.
 
+    Chunks are fetched concurrently by `max_workers` threads sharing one token-bucket
+    rate limiter; 429/5xx responses are retried with backoff (see http_client).
+    Finished chunks are recorded in a checkpoint file in data/raw/meta, so after a
+    failure the same call resumes from the last good chunks instead of starting over.
+
     Args:
         coin_id, vs_currency: as usual
         from_dt, to_dt: datetime objects (UTC)
         chunk_days: max days per chunk (default 365 to respect public API)
-        pause_sec: pause between requests to be polite
+        pause_sec: minimum spacing between requests; caps the request rate at 1/pause_sec
         merge: if True, merge all 'prices' and 'total_volumes' into a single JSON and save as combined file
+        max_workers: concurrent chunk requests
+        rate_per_min: request budget (default http_client.DEFAULT_RATE_PER_MIN)
+        resume: reuse chunks recorded in the checkpoint of an earlier, interrupted run
 
     Returns:
         list of saved chunk file paths; if merge True also returns merged filepath as last element.
@@ -119,59 +291,69 @@ def fetch_market_chart_range_chunked(coin_id="bitcoin", vs_currency="usd", from_
     if to_dt <= from_dt:
         raise ValueError('to_dt must be after from_dt')
 
-    delta = to_dt - from_dt
-    total_days = delta.days + 1
-    saved = []
-    chunk_start = from_dt
-    while chunk_start < to_dt:
-        chunk_end = min(chunk_start + pd.Timedelta(days=chunk_days) - pd.Timedelta(seconds=1), to_dt)
-        try:
-            path = fetch_market_chart_range(coin_id=coin_id, vs_currency=vs_currency, from_dt=chunk_start, to_dt=chunk_end)
-        except RuntimeError as e:
-            # bubble up but include chunk info
-            raise RuntimeError(f'Chunk fetch failed for {chunk_start} -> {chunk_end}: {e}')
-        saved.append(path)
-        time.sleep(pause_sec)
-        chunk_start = chunk_end + pd.Timedelta(seconds=1)
+    rate = rate_per_min or http_client.DEFAULT_RATE_PER_MIN
+    if pause_sec:
+        rate = min(rate, 60.0 / pause_sec)
+    limiter = http_client.TokenBucket(rate)
+
+    from_unix = int(calendar.timegm(from_dt.timetuple()))
+    to_unix = int(calendar.timegm(to_dt.timetuple()))
+    params = {'coin_id': coin_id, 'vs_currency': vs_currency, 'from': from_unix, 'to': to_unix, 'chunk_days': chunk_days}
+    ckpt_path = os.path.join(METADATA_DIR, f"coingecko_{coin_id}_{vs_currency}_{from_unix}_{to_unix}.checkpoint.json")
+    done = _load_checkpoint(ckpt_path, params) if resume else {}
+    lock = threading.Lock()
+
+    bounds = _chunk_bounds(from_dt, to_dt, chunk_days)
+    keys = [f"{int(calendar.timegm(a.timetuple()))}_{int(calendar.timegm(b.timetuple()))}" for a, b in bounds]
+
+    def fetch_chunk(key, chunk_start, chunk_end):
+        path = fetch_market_chart_range(coin_id=coin_id, vs_currency=vs_currency, from_dt=chunk_start, to_dt=chunk_end, limiter=limiter)
+        with lock:
+            done[key] = os.path.basename(path)
+            _save_checkpoint(ckpt_path, params, done)
+        return path
+
+    todo = [(k, a, b) for k, (a, b) in zip(keys, bounds) if k not in done]
+    if len(todo) < len(keys):
+        print(f"Resuming: {len(keys) - len(todo)}/{len(keys)} chunks already fetched")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_chunk, *job): job for job in todo}
+        for fut in as_completed(futures):
+            key, chunk_start, chunk_end = futures[fut]
+            try:
+                fut.result()
+            except RuntimeError as e:
+                for other in futures:
+                    other.cancel()
+                # bubble up but include chunk info
+                raise RuntimeError(f'Chunk fetch failed for {chunk_start} -> {chunk_end}: {e} '
+                                   f'(progress kept in {ckpt_path}; call again to resume)')
+    saved = [os.path.join(DATA_DIR, done[k]) for k in keys]
 
     if merge:
-        # merge JSONs by concatenating 'prices' and 'total_volumes'
-        merged = {'prices': [], 'market_caps': [], 'total_volumes': []}
-        for p in saved:
-            with open(p, 'r', encoding='utf-8') as f:
-                j = json.load(f)
-            for k in ['prices','market_caps','total_volumes']:
-                if k in j:
-                    merged[k].extend(j[k])
-        # deduplicate by timestamp for prices & volumes
-        def uniq_sorted(arr):
-            seen = set()
-            out = []
-            for ts, val in arr:
-                if ts not in seen:
-                    seen.add(ts)
-                    out.append([ts,val])
-            out.sort(key=lambda x: x[0])
-            return out
-
-        merged['prices'] = uniq_sorted(merged.get('prices', []))
-        merged['market_caps'] = uniq_sorted(merged.get('market_caps', []))
-        merged['total_volumes'] = uniq_sorted(merged.get('total_volumes', []))
-
-        merged_fname = f"coingecko_{coin_id}_market_chart_{int(calendar.timegm(from_dt.timetuple()))}_{int(calendar.timegm(to_dt.timetuple()))}_merged.json"
-        save_json(merged, merged_fname)
+        # merge chunks by concatenating 'prices', 'market_caps' and 'total_volumes'
+        keys = raw_io.MARKET_CHART_KEYS
+        chunks = [raw_io.read_market_chart(p, keys=keys) for p in saved]
+        merged = {k: merge_rows([c[k] for c in chunks]) for k in keys}
+        if RAW_FORMAT == 'json':
+            merged = {k: rows_to_lists(v) for k, v in merged.items()}
+
+        merged_fname = f"coingecko_{coin_id}_{vs_currency}_market_chart_{from_unix}_{to_unix}_merged.json"
+        merged_fname = save_raw(merged, merged_fname)
         meta = {
             'coin_id': coin_id,
             'vs_currency': vs_currency,
             'endpoint': 'market_chart_range_merged',
-            'from': int(calendar.timegm(from_dt.timetuple())),
-            'to': int(calendar.timegm(to_dt.timetuple())),
+            'from': from_unix,
+            'to': to_unix,
             'chunks': len(saved),
             'fetched_at': int(time.time())
         }
         save_meta(meta, merged_fname + '.meta.json')
         saved.append(os.path.join(DATA_DIR, merged_fname))
 
+    if os.path.exists(ckpt_path):
+        os.remove(ckpt_path)
     return saved
 
 if __name__ == '__main__':
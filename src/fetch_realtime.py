@@ -1,64 +1,161 @@
-import requests
-import pandas as pd
-from datetime import datetime, timedelta
+import os
+import threading
 import time
+import numpy as np
+import pandas as pd
 
-_CACHE = {}
-
-def fetch_realtime_data(coin="bitcoin", currency="usd", minutes=60, cache_seconds=300):
-    """Lấy dữ liệu realtime gần đây (last N minutes)."""
-    key = (coin, currency, minutes)
-    now = time.time()
-    if key in _CACHE:
-        ts, df = _CACHE[key]
-        if now - ts < cache_seconds:
-            return df
-
-    days = max(1, minutes // 1440)  # CoinGecko chỉ cho days
-    url = f"https://api.coingecko.com/api/v3/coins/{coin}/market_chart"
-    params = {"vs_currency": currency, "days": days}
+try:
+    from . import http_client, instrument
+    from .cache import TTLCache
+    from .coverage import DAY, GRANULARITY_SECONDS, plan_window
+    from .ringbuffer import RingBuffer
+    from .segments import SegmentStore
+except ImportError:  # run from inside src/ (streamlit)
+    import http_client, instrument
+    from cache import TTLCache
+    from coverage import DAY, GRANULARITY_SECONDS, plan_window
+    from ringbuffer import RingBuffer
+    from segments import SegmentStore
+
+# Cache có giới hạn (số entry + bytes), LRU/TTL, single-flight khi nhiều session cùng miss.
+# Đặt BTC_REALTIME_CACHE_DIR để bật tầng cache trên đĩa (giữ dữ liệu qua các lần khởi động lại),
+# lưu dạng Parquet và giới hạn bởi BTC_REALTIME_CACHE_DISK_MB (xoá file hết hạn rồi LRU).
+_CACHE = TTLCache(
+    max_entries=int(os.environ.get("BTC_REALTIME_CACHE_ENTRIES", "64")),
+    max_bytes=int(os.environ.get("BTC_REALTIME_CACHE_MB", "128")) * 2**20,
+    ttl=3600,
+    disk_dir=os.environ.get("BTC_REALTIME_CACHE_DIR") or None,
+    disk_max_bytes=int(os.environ.get("BTC_REALTIME_CACHE_DISK_MB", "512")) * 2**20,
+)
+# Các đoạn dữ liệu theo thời gian cho mỗi (coin, currency): khoảng mới chỉ tải phần rìa chưa có.
+_SEGMENTS = SegmentStore(max_points=int(os.environ.get("BTC_REALTIME_SEGMENT_POINTS", "500000")))
+# Rìa realtime (điểm 5 phút) của mỗi (coin, currency) nằm trong một ring buffer cấp phát sẵn:
+# mỗi lần làm mới chỉ tải và ghi thêm các điểm mới, bộ nhớ cố định dù dashboard chạy bao lâu.
+_RING_POINTS = int(os.environ.get("BTC_REALTIME_RING_POINTS", "4096"))
+_RINGS = {}
+_RINGS_LOCK = threading.Lock()
+# Tổng số request / bytes / điểm đã tải so với số điểm thực sự trả về cho dashboard.
+_FETCH = {"requests": 0, "bytes_fetched": 0, "points_fetched": 0, "points_used": 0}
+_FETCH_LOCK = threading.Lock()
+
+
+def cache_stats():
+    """Số liệu hit/miss/eviction của cache realtime, của segment store, của các ring buffer
+    và lượng dữ liệu đã tải so với đã dùng."""
+    with _RINGS_LOCK:
+        rings = {f"{c}/{v}": {"points": len(r), "bytes": r.nbytes} for (c, v), (r, _) in _RINGS.items()}
+    with _FETCH_LOCK:
+        fetch = dict(_FETCH)
+    return {"cache": _CACHE.stats(), "segments": _SEGMENTS.stats(), "rings": rings, "fetch": fetch}
+
+
+def _new_tally():
+    return {"requests": 0, "bytes_fetched": 0, "points_fetched": 0, "points_used": 0}
+
+
+@instrument.timer("fetch_realtime.request")
+def _get_range(coin, currency, from_unix, to_unix, tally):
+    """JSON market_chart/range cho [from_unix, to_unix]; cộng request/bytes/điểm vào tally."""
+    params = {"vs_currency": currency, "from": from_unix, "to": to_unix}
+    data = http_client.get_json(f"/coins/{coin}/market_chart/range", params=params, conditional=True)
+    if "prices" not in data:
+        raise ValueError(f"Lỗi API: {data}")
+    tally["requests"] += 1
+    tally["bytes_fetched"] += http_client.last_bytes()
+    tally["points_fetched"] += len(data["prices"])
+    return data
+
+
+def _used(df, tally):
+    """Ghi số liệu của lần tải này vào df.attrs["fetch"] và cộng vào tổng của module."""
+    tally["points_used"] = len(df)
+    df.attrs["fetch"] = tally
+    with _FETCH_LOCK:
+        for k, v in tally.items():
+            _FETCH[k] += v
+    return df
 
-    resp = requests.get(url, params=params)
-    data = resp.json()
 
+def _prices_frame(data):
     if "prices" not in data:
         raise ValueError(f"Lỗi API: {data}")
-
     df = pd.DataFrame(data["prices"], columns=["timestamp", "price"])
     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
     df.set_index("timestamp", inplace=True)
+    return df
 
-    cutoff = datetime.utcnow() - timedelta(minutes=minutes)
-    df = df[df.index >= cutoff]
 
-    _CACHE[key] = (now, df)
-    return df
+def _range_fetcher(coin, currency, tally=None):
+    tally = _new_tally() if tally is None else tally
 
+    def fetch(from_unix, to_unix):
+        return _prices_frame(_get_range(coin, currency, from_unix, to_unix, tally))
+    return fetch
 
-def fetch_realtime_range(coin="bitcoin", currency="usd", start=None, end=None, cache_seconds=300):
-    """Lấy dữ liệu theo khoảng start–end datetime."""
-    if start is None or end is None:
-        raise ValueError("Cần truyền start và end datetime")
 
-    key = (coin, currency, start, end)
-    now = time.time()
-    if key in _CACHE:
-        ts, df = _CACHE[key]
-        if now - ts < cache_seconds:
-            return df
+def _ring(coin, currency):
+    with _RINGS_LOCK:
+        if (coin, currency) not in _RINGS:
+            _RINGS[(coin, currency)] = (RingBuffer(_RING_POINTS, columns=("price",)), threading.Lock())
+        return _RINGS[(coin, currency)]
 
-    url = f"https://api.coingecko.com/api/v3/coins/{coin}/market_chart/range"
-    params = {"vs_currency": currency, "from": int(start.timestamp()), "to": int(end.timestamp())}
 
-    resp = requests.get(url, params=params)
-    data = resp.json()
+def _fetch_into(ring, coin, currency, from_unix, to_unix, tally):
+    """Tải [from_unix, to_unix] và ghi các điểm mới hơn điểm cuối của ring (không dựng DataFrame)."""
+    data = _get_range(coin, currency, from_unix, to_unix, tally)
+    prices = np.asarray(data["prices"], dtype=np.float64).reshape(-1, 2)
+    ts = prices[:, 0].astype(np.int64) * 1_000_000
+    new = ts > ring.last_ts if len(ring) else slice(None)
+    ring.extend(ts[new], price=prices[new, 1])
 
-    if "prices" not in data:
-        raise ValueError(f"Lỗi API: {data}")
 
-    df = pd.DataFrame(data["prices"], columns=["timestamp", "price"])
-    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-    df.set_index("timestamp", inplace=True)
+@instrument.timer("fetch_realtime.data")
+def fetch_realtime_data(coin="bitcoin", currency="usd", minutes=60, cache_seconds=300):
+    """Lấy dữ liệu realtime gần đây (last N minutes).
+
+    Cửa sổ được chọn bởi `coverage.plan_window`: đúng N phút (cộng một bước ở đầu) ở
+    độ chi tiết nhỏ nhất mà API trả về. Lookback tới 1 ngày (điểm 5 phút) được phục vụ
+    từ ring buffer của (coin, currency): lần đầu tải cả cửa sổ, các lần sau chỉ tải phần
+    rìa mới hơn điểm cuối đã có, kể cả khi lookback thay đổi mà ring vẫn phủ được.
+    Lookback dài hơn đi qua segment store như Custom Range.
+
+    df.attrs["fetch"] cho biết lần tải đã gọi bao nhiêu request, bao nhiêu bytes/điểm
+    so với số điểm trả về (tổng dồn trong `cache_stats()["fetch"]`).
+    """
+    def load():
+        tally = _new_tally()
+        now = int(time.time())
+        start = now - minutes * 60
+        if minutes * 60 > DAY:
+            df = _SEGMENTS.get(coin, currency, start, now, _range_fetcher(coin, currency, tally),
+                               live_slack=cache_seconds)
+            return _used(df, tally)
+        ring, lock = _ring(coin, currency)
+        with lock:
+            first = ring.first_ts // 10**9 if len(ring) else None
+            last = ring.last_ts // 10**9 if len(ring) else None
+            # điểm đầu cách start quá một bước: ring không phủ cửa sổ này
+            if first is None or first > start + GRANULARITY_SECONDS["5min"] or now - last > DAY:
+                a, b, _ = plan_window(start, now, now=now)
+                ring.clear()
+                _fetch_into(ring, coin, currency, a, b, tally)
+            elif now - last > cache_seconds:
+                _fetch_into(ring, coin, currency, last + 1, now, tally)
+            return _used(ring.to_frame(start=pd.Timestamp(start, unit="s")), tally)
+
+    return _CACHE.get_or_load((coin, currency, minutes), load, max_age=cache_seconds)
+
+
+@instrument.timer("fetch_realtime.range")
+def fetch_realtime_range(coin="bitcoin", currency="usd", start=None, end=None, cache_seconds=300):
+    """Lấy dữ liệu theo khoảng start–end datetime."""
+    if start is None or end is None:
+        raise ValueError("Cần truyền start và end datetime")
+
+    def load():
+        tally = _new_tally()
+        df = _SEGMENTS.get(coin, currency, int(start.timestamp()), int(end.timestamp()),
+                           _range_fetcher(coin, currency, tally), live_slack=cache_seconds)
+        return _used(df, tally)
 
-    _CACHE[key] = (now, df)
-    return df
\ No newline at end of file
+    return _CACHE.get_or_load((coin, currency, start, end), load, max_age=cache_seconds)
@@ -1,155 +1,205 @@
+"""Summary statistics of a processed series: <stem>_analysis.json and a Markdown report.
+
+    python src/generate_analysis.py [--file PATH | --coin bitcoin] [--no-markdown]
+
+pandas, pyarrow and the indicators are imported inside the functions that need
+them, so importing this module, `--help` and an up-to-date JSON (see `artifacts`)
+only cost the interpreter start-up.
+"""
+import argparse
 import json
 from pathlib import Path
-import pandas as pd
-import numpy as np
-from scipy import stats
+
+try:
+    from . import artifacts
+except ImportError:  # run as a script from src/
+    import artifacts
 
 ROOT = Path(__file__).resolve().parents[1]
 PROCESSED_DIR = ROOT / 'data' / 'processed'
 DOCS_DIR = ROOT / 'docs'
-DOCS_DIR.mkdir(exist_ok=True)
-
-# find bitcoin parquet (prefer filename containing "bitcoin")
-parquets = list(PROCESSED_DIR.glob('*.parquet'))
-btc_file = None
-for p in parquets:
-    if 'bitcoin' in p.name.lower():
-        btc_file = p
-        break
-if btc_file is None:
-    raise SystemExit('No bitcoin parquet found in data/processed. Run processing first.')
-
-print('Loading', btc_file)
-df = pd.read_parquet(btc_file)
-df.index = pd.to_datetime(df.index)
-
-# Ensure close column
-if 'close' not in df.columns:
-    raise SystemExit('Processed file does not contain close prices.')
-
-# Basic stats
-start = df.index.min()
-end = df.index.max()
-count = len(df)
-na_count = df['close'].isna().sum()
-min_price = float(df['close'].min())
-max_price = float(df['close'].max())
-median_price = float(df['close'].median())
-mean_price = float(df['close'].mean())
-std_price = float(df['close'].std())
-
-# returns
-df['pct_change'] = df['close'].pct_change()
-df['log_return'] = np.log(df['close'] / df['close'].shift(1))
-
-returns = df['pct_change'].dropna()
-logr = df['log_return'].dropna()
-
-ret_stats = {
-    'mean_pct': float(returns.mean()) * 100,
-    'median_pct': float(returns.median()) * 100,
-    'std_pct': float(returns.std()) * 100,
-    'skewness': float(returns.skew()),
-    'kurtosis': float(returns.kurt())
-}
-
-log_stats = {
-    'mean_log': float(logr.mean()),
-    'std_log': float(logr.std()),
-    'annualized_vol_30d': float(logr.rolling(window=30).std().mean() * np.sqrt(365))
-}
-
-# max drawdown
-cum = (1 + logr).cumprod()
-rolling_max = cum.cummax()
-drawdown = cum / rolling_max - 1
-max_dd = float(drawdown.min())
-
-# longest drawdown duration (in days)
-dd_end = drawdown.idxmin()
-# find last peak before dd_end
-peak_idx = (cum[:dd_end]).idxmax()
-dd_duration = (dd_end - peak_idx).days
-
-# recent performance
-recent_30d = df['close'].iloc[-30:]
-recent_change_30d = (recent_30d.iloc[-1] / recent_30d.iloc[0] - 1) * 100 if len(recent_30d) >= 2 else None
-
-analysis = {
-    'file': str(btc_file),
-    'range_start': str(start),
-    'range_end': str(end),
-    'count': int(count),
-    'na_count': int(na_count),
-    'min_price': min_price,
-    'max_price': max_price,
-    'median_price': median_price,
-    'mean_price': mean_price,
-    'std_price': std_price,
-    'returns': ret_stats,
-    'log_return': log_stats,
-    'max_drawdown': max_dd,
-    'drawdown_end': str(dd_end),
-    'drawdown_start_peak': str(peak_idx),
-    'drawdown_duration_days': dd_duration,
-    'recent_30d_change_pct': float(recent_change_30d) if recent_change_30d is not None else None
-}
-
-# write JSON
-out_json = PROCESSED_DIR / (btc_file.stem + '_analysis.json')
-with open(out_json, 'w', encoding='utf-8') as f:
-    json.dump(analysis, f, indent=2)
-print('Wrote analysis JSON to', out_json)
-
-# Create Markdown doc
-md = []
-md.append('# Code & Data Analysis — Bitcoin')
-md.append('Generated file: ' + str(out_json))
-md.append('\n## 1) Project code overview')
-md.append('This project contains the following important modules:')
-md.append('\n- `src/fetch_data.py`: helpers to fetch raw JSON from CoinGecko (market_chart, ohlc). Includes `fetch_market_chart_range_chunked` and `fetch_recent_market_chart`. Saves raw JSON in `data/raw/` and metadata in `data/raw/meta/`.')
-md.append('\n- `src/process_data.py`: parse raw JSON to pandas DataFrame, detect timestamp unit (ms vs s), resample to OHLC (via `resample_to_ohlc`), and compute features (pct_change, log_return, MA7, MA30, volatility). Exposes `process_and_save` to save a processed Parquet file in `data/processed/`.')
-md.append('\n- `src/viz.py`: plotting helpers (Plotly and mplfinance). `plot_candlestick_plotly` returns a Plotly Figure.')
-md.append('\n- `src/dashboard.py`: Streamlit dashboard to inspect processed data, compare files, and export CSV/Parquet/PNG. Uses caching to speed loads.')
-md.append('\n- `src/generate_analysis.py`: this analysis generator (loads processed parquet and writes analysis JSON + docs).')
-
-md.append('\n## 2) Data file analyzed')
-md.append(f'- Processed file: `{btc_file.name}`')
-md.append(f'- Date range: **{start.date()}** to **{end.date()}**')
-md.append(f'- Data points: **{count}** (missing close: {na_count})')
-
-md.append('\n## 3) Price statistics')
-md.append(f'- Min price: {min_price:,.2f} USD')
-md.append(f'- Max price: {max_price:,.2f} USD')
-md.append(f'- Median price: {median_price:,.2f} USD')
-md.append(f'- Mean price: {mean_price:,.2f} USD')
-md.append(f'- Std dev (price): {std_price:,.2f} USD')
-
-md.append('\n## 4) Return statistics (daily)')
-md.append(f'- Mean daily % change: {ret_stats["mean_pct"]:.4f}%')
-md.append(f'- Median daily % change: {ret_stats["median_pct"]:.4f}%')
-md.append(f'- Std daily % change: {ret_stats["std_pct"]:.4f}%')
-md.append(f'- Skewness: {ret_stats["skewness"]:.4f}')
-md.append(f'- Kurtosis: {ret_stats["kurtosis"]:.4f}')
-
-md.append('\n## 5) Log-return & volatility')
-md.append(f'- Mean log-return (daily): {log_stats["mean_log"]:.6f}')
-md.append(f'- Std log-return (daily): {log_stats["std_log"]:.6f}')
-md.append(f'- Average 30-day rolling annualized vol (approx): {log_stats["annualized_vol_30d"]:.4f}')
-
-md.append('\n## 6) Drawdown')
-md.append(f'- Max drawdown (fraction): {max_dd:.4f} ({max_dd*100:.2f}%)')
-md.append(f'- Drawdown period: peak at {peak_idx.date()} to trough at {dd_end.date()} ({dd_duration} days)')
-
-md.append('\n## 7) Recent performance')
-md.append(f'- 30-day change: {analysis["recent_30d_change_pct"]:.4f}%')
-
-md.append('\n## 8) Notes and recommendations')
-md.append('- This analysis is computed on the processed OHLC series. If your processed file is daily resampled, the statistics are daily-based.\n- For higher-frequency insights (intraday), keep raw OHLC from the `ohlc` endpoint or fetch exchange data.\n- Check for survivorship / missing data: some days may be dropped during resample.\n- For forecasting or risk models, consider additional features (volume skew, realized vol, ADR, GARCH models).')
-
-md.append('\n---\nGenerated by `src/generate_analysis.py`')
-
-md_path = DOCS_DIR / 'code_and_data_analysis.md'
-with open(md_path, 'w', encoding='utf-8') as f:
-    f.write('\n'.join(md))
-print('Wrote markdown to', md_path)
+ANALYSIS_SRC = [str(Path(__file__).with_name(f)) for f in ('indicators.py', 'store.py', 'stream_stats.py')]
+
+
+def find_processed(coin='bitcoin', processed_dir=PROCESSED_DIR):
+    """First processed parquet whose name contains `coin`, or None."""
+    for p in Path(processed_dir).glob('*.parquet'):
+        if coin in p.name.lower():
+            return p
+    return None
+
+
+def analyze(path):
+    """Summary statistics of a processed series (the dict written as *_analysis.json).
+
+    The series is streamed in record batches through `stream_stats.summarize`, one
+    pass with bounded memory, so tick-level histories larger than RAM work too.
+    Medians come from a quantile sketch (within 0.1% of the exact value).
+    """
+    try:
+        from .store import iter_batches
+        from .stream_stats import summarize
+    except ImportError:  # run as a script from src/
+        from store import iter_batches
+        from stream_stats import summarize
+
+    path = Path(path)
+    try:
+        s = summarize(iter_batches(path, columns=['close']))
+    except ValueError:
+        raise ValueError(f'{path.name} does not contain close prices.') from None
+    if s['count'] == 0:
+        raise ValueError(f'{path.name} is empty.')
+    price, returns, logr, dd = s['price'], s['returns'], s['log_returns'], s['drawdown']
+
+    ret_stats = {
+        'mean_pct': returns.mean * 100,
+        'median_pct': s['returns_q'].median * 100,
+        'std_pct': returns.std * 100,
+        'skewness': returns.skew,
+        'kurtosis': returns.kurt
+    }
+
+    log_stats = {
+        'mean_log': logr.mean,
+        'std_log': logr.std,
+        'annualized_vol_30d': s['vol'].mean
+    }
+
+    # max drawdown (on close prices, same definition as the dashboard), from the
+    # last peak before the trough
+    dd_end, peak_idx = dd.trough_at, dd.peak_before_trough
+    dd_duration = (dd_end - peak_idx).days
+
+    # recent performance
+    recent_30d = s['recent']
+    recent_change_30d = (recent_30d.iloc[-1] / recent_30d.iloc[0] - 1) * 100 if len(recent_30d) >= 2 else None
+
+    analysis = {
+        'file': str(path),
+        'range_start': str(s['start']),
+        'range_end': str(s['end']),
+        'count': int(s['count']),
+        'na_count': int(s['na_count']),
+        'min_price': price.min,
+        'max_price': price.max,
+        'median_price': s['price_q'].median,
+        'mean_price': price.mean,
+        'std_price': price.std,
+        'returns': ret_stats,
+        'log_return': log_stats,
+        'max_drawdown': dd.max_drawdown,
+        'drawdown_end': str(dd_end),
+        'drawdown_start_peak': str(peak_idx),
+        'drawdown_duration_days': dd_duration,
+        'recent_30d_change_pct': float(recent_change_30d) if recent_change_30d is not None else None
+    }
+    return analysis
+
+
+def write_analysis(path, out_json=None):
+    """Analyzes `path` and writes <stem>_analysis.json next to it. Returns (analysis, json path).
+    An up-to-date JSON (same input content and code, see `artifacts`) is read back instead."""
+    path = Path(path)
+    out_json = Path(out_json) if out_json else path.parent / (path.stem + '_analysis.json')
+    art = artifacts.Artifact('analysis', [out_json], [path], code=(__file__, *ANALYSIS_SRC))
+    if art.fresh():
+        with open(out_json, 'r', encoding='utf-8') as f:
+            return json.load(f), out_json
+    analysis = analyze(path)
+    with open(out_json, 'w', encoding='utf-8') as f:
+        json.dump(analysis, f, indent=2)
+    art.record()
+    return analysis, out_json
+
+
+def write_markdown(analysis, out_json, md_path=None):
+    """Writes the Markdown report for an analysis dict to docs/code_and_data_analysis.md."""
+    import pandas as pd
+
+    DOCS_DIR.mkdir(exist_ok=True)
+    md_path = Path(md_path) if md_path else DOCS_DIR / 'code_and_data_analysis.md'
+    start = pd.Timestamp(analysis['range_start'])
+    end = pd.Timestamp(analysis['range_end'])
+    peak_idx = pd.Timestamp(analysis['drawdown_start_peak'])
+    dd_end = pd.Timestamp(analysis['drawdown_end'])
+    count, na_count = analysis['count'], analysis['na_count']
+    ret_stats, log_stats = analysis['returns'], analysis['log_return']
+    max_dd, dd_duration = analysis['max_drawdown'], analysis['drawdown_duration_days']
+    min_price, max_price = analysis['min_price'], analysis['max_price']
+    median_price, mean_price, std_price = analysis['median_price'], analysis['mean_price'], analysis['std_price']
+
+    # Create Markdown doc
+    md = []
+    md.append('# Code & Data Analysis — Bitcoin')
+    md.append('Generated file: ' + str(out_json))
+    md.append('\n## 1) Project code overview')
+    md.append('This project contains the following important modules:')
+    md.append('\n- `src/fetch_data.py`: helpers to fetch raw JSON from CoinGecko (market_chart, ohlc). Includes `fetch_market_chart_range_chunked` and `fetch_recent_market_chart`. Saves raw JSON in `data/raw/` and metadata in `data/raw/meta/`.')
+    md.append('\n- `src/process_data.py`: parse raw JSON to pandas DataFrame, detect timestamp unit (ms vs s), resample to OHLC (via `resample_to_ohlc`), and compute features (pct_change, log_return, MA7, MA30, volatility). Exposes `process_and_save` to save a processed Parquet file in `data/processed/`.')
+    md.append('\n- `src/viz.py`: plotting helpers (Plotly and mplfinance). `plot_candlestick_plotly` returns a Plotly Figure.')
+    md.append('\n- `src/dashboard.py`: Streamlit dashboard to inspect processed data, compare files, and export CSV/Parquet/PNG. Uses caching to speed loads.')
+    md.append('\n- `src/generate_analysis.py`: this analysis generator (loads processed parquet and writes analysis JSON + docs).')
+
+    md.append('\n## 2) Data file analyzed')
+    md.append(f'- Processed file: `{Path(analysis["file"]).name}`')
+    md.append(f'- Date range: **{start.date()}** to **{end.date()}**')
+    md.append(f'- Data points: **{count}** (missing close: {na_count})')
+
+    md.append('\n## 3) Price statistics')
+    md.append(f'- Min price: {min_price:,.2f} USD')
+    md.append(f'- Max price: {max_price:,.2f} USD')
+    md.append(f'- Median price: {median_price:,.2f} USD')
+    md.append(f'- Mean price: {mean_price:,.2f} USD')
+    md.append(f'- Std dev (price): {std_price:,.2f} USD')
+
+    md.append('\n## 4) Return statistics (daily)')
+    md.append(f'- Mean daily % change: {ret_stats["mean_pct"]:.4f}%')
+    md.append(f'- Median daily % change: {ret_stats["median_pct"]:.4f}%')
+    md.append(f'- Std daily % change: {ret_stats["std_pct"]:.4f}%')
+    md.append(f'- Skewness: {ret_stats["skewness"]:.4f}')
+    md.append(f'- Kurtosis: {ret_stats["kurtosis"]:.4f}')
+
+    md.append('\n## 5) Log-return & volatility')
+    md.append(f'- Mean log-return (daily): {log_stats["mean_log"]:.6f}')
+    md.append(f'- Std log-return (daily): {log_stats["std_log"]:.6f}')
+    md.append(f'- Average 30-day rolling annualized vol (approx): {log_stats["annualized_vol_30d"]:.4f}')
+
+    md.append('\n## 6) Drawdown')
+    md.append(f'- Max drawdown (fraction): {max_dd:.4f} ({max_dd*100:.2f}%)')
+    md.append(f'- Drawdown period: peak at {peak_idx.date()} to trough at {dd_end.date()} ({dd_duration} days)')
+
+    md.append('\n## 7) Recent performance')
+    md.append(f'- 30-day change: {analysis["recent_30d_change_pct"]:.4f}%')
+
+    md.append('\n## 8) Notes and recommendations')
+    md.append('- This analysis is computed on the processed OHLC series. If your processed file is daily resampled, the statistics are daily-based.\n- For higher-frequency insights (intraday), keep raw OHLC from the `ohlc` endpoint or fetch exchange data.\n- Check for survivorship / missing data: some days may be dropped during resample.\n- For forecasting or risk models, consider additional features (volume skew, realized vol, ADR, GARCH models).')
+
+    md.append('\n---\nGenerated by `src/generate_analysis.py`')
+
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(md))
+
+    return md_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write the analysis JSON (and Markdown report) of a processed series.')
+    parser.add_argument('--file', help='processed series (default: the first one matching --coin)')
+    parser.add_argument('--coin', default='bitcoin', help='coin to look for in data/processed (default bitcoin)')
+    parser.add_argument('--no-markdown', action='store_true', help='only write the analysis JSON')
+    args = parser.parse_args(argv)
+
+    btc_file = Path(args.file) if args.file else find_processed(args.coin)
+    if btc_file is None:
+        raise SystemExit(f'No {args.coin} parquet found in data/processed. Run processing first.')
+    print('Loading', btc_file)
+    analysis, out_json = write_analysis(btc_file)
+    print('Wrote analysis JSON to', out_json)
+    if not args.no_markdown:
+        md_path = write_markdown(analysis, out_json)
+        print('Wrote markdown to', md_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,54 +1,163 @@
+"""Static charts of processed series for the docs: returns histogram, rolling
+volatility and (optionally) a candlestick chart with MA7/MA30 and volume.
+
+    python src/generate_plots.py [--file PATH ... | --coin bitcoin | --all]
+                                 [--plots hist vol candle] [--out-dir DIR] [--workers N]
+
+Charts are rendered through `render`: up-to-date images are skipped and the
+others are drawn in parallel by warm worker processes. With several series
+(--all, or more than one --file) each gets its own <out-dir>/<series>/ folder.
+matplotlib, plotly, pandas and numpy are only imported where a chart is drawn.
+"""
+import argparse
 from pathlib import Path
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+
+try:
+    from . import render
+    from .generate_analysis import find_processed
+except ImportError:  # run as a script from src/
+    import render
+    from generate_analysis import find_processed
 
 ROOT = Path(__file__).resolve().parents[1]
 PROCESSED_DIR = ROOT / 'data' / 'processed'
 IMG_DIR = ROOT / 'docs' / 'images'
-IMG_DIR.mkdir(parents=True, exist_ok=True)
-
-# find bitcoin parquet
-parquets = list(PROCESSED_DIR.glob('*.parquet'))
-btc_file = None
-for p in parquets:
-    if 'bitcoin' in p.name.lower():
-        btc_file = p
-        break
-if btc_file is None:
-    raise SystemExit('No bitcoin parquet found in data/processed')
-
-print('Loading', btc_file)
-df = pd.read_parquet(btc_file)
-df.index = pd.to_datetime(df.index)
-
-if 'close' not in df.columns:
-    raise SystemExit('No close column')
-
-# returns
-returns = df['close'].pct_change().dropna()
-# histogram
-plt.figure(figsize=(8,4))
-plt.hist(returns, bins=80, color='tab:blue', alpha=0.8)
-plt.title('Histogram of daily returns')
-plt.xlabel('Daily return')
-plt.ylabel('Frequency')
-plt.grid(True)
-hist_path = IMG_DIR / 'returns_histogram.png'
-plt.savefig(hist_path, bbox_inches='tight', dpi=150)
-plt.close()
-print('Saved', hist_path)
-
-# volatility (30-day rolling std of log returns, annualized)
-logr = np.log(df['close'] / df['close'].shift(1)).dropna()
-vol30 = logr.rolling(window=30).std() * np.sqrt(365)
-plt.figure(figsize=(10,4))
-plt.plot(vol30.index, vol30, color='tab:orange')
-plt.title('30-day rolling annualized volatility (approx)')
-plt.xlabel('Date')
-plt.ylabel('Annualized vol')
-plt.grid(True)
-vol_path = IMG_DIR / 'vol30_timeseries.png'
-plt.savefig(vol_path, bbox_inches='tight', dpi=150)
-plt.close()
-print('Saved', vol_path)
+
+HIST_BINS = 80
+VOL_WINDOW = 30
+DPI = 150
+PLOTS = ('hist', 'vol')
+FILENAMES = {'hist': 'returns_histogram.png', 'vol': 'vol30_timeseries.png', 'candle': 'candlestick_sample.png'}
+PARAMS = {
+    'hist': {'bins': HIST_BINS, 'dpi': DPI},
+    'vol': {'window': VOL_WINDOW, 'dpi': DPI},
+    'candle': {},
+}
+# source `draw` depends on besides this file (paths: viz is only imported for candles)
+CODE_DEPS = tuple(str(Path(__file__).with_name(f)) for f in ('render.py', 'store.py', 'viz.py'))
+
+
+def _series(path):
+    return Path(path).name.removesuffix('.parquet')
+
+
+def _load(path, columns=None):
+    try:
+        from .store import read_processed
+    except ImportError:  # run as a script from src/
+        from store import read_processed
+    df = read_processed(path, columns=columns)
+    if 'close' not in df.columns:
+        raise ValueError(f'{Path(path).name} has no close column')
+    return df
+
+
+def plot_returns_histogram(close, out_path, bins=HIST_BINS, dpi=DPI):
+    import matplotlib.pyplot as plt
+
+    # returns
+    returns = close.pct_change().dropna()
+    # histogram
+    plt.figure(figsize=(8,4))
+    plt.hist(returns, bins=bins, color='tab:blue', alpha=0.8)
+    plt.title('Histogram of daily returns')
+    plt.xlabel('Daily return')
+    plt.ylabel('Frequency')
+    plt.grid(True)
+    plt.savefig(out_path, bbox_inches='tight', dpi=dpi)
+    plt.close()
+
+
+def plot_volatility(close, out_path, window=VOL_WINDOW, dpi=DPI):
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    # volatility (30-day rolling std of log returns, annualized)
+    logr = np.log(close / close.shift(1)).dropna()
+    vol30 = logr.rolling(window=window).std() * np.sqrt(365)
+    plt.figure(figsize=(10,4))
+    plt.plot(vol30.index, vol30, color='tab:orange')
+    plt.title('30-day rolling annualized volatility (approx)')
+    plt.xlabel('Date')
+    plt.ylabel('Annualized vol')
+    plt.grid(True)
+    plt.savefig(out_path, bbox_inches='tight', dpi=dpi)
+    plt.close()
+
+
+def draw(path, out_path, plot='hist', **params):
+    """Render job body: draws chart `plot` of the series at `path` into `out_path`."""
+    if plot == 'candle':
+        try:
+            from .viz import plot_candlestick_ma_volume
+        except ImportError:  # run as a script from src/
+            from viz import plot_candlestick_ma_volume
+        return render.write_figure(plot_candlestick_ma_volume(_load(path), **params), out_path)
+    close = _load(path, columns=['close'])['close']
+    if plot == 'hist':
+        plot_returns_histogram(close, out_path, **params)
+    else:
+        plot_volatility(close, out_path, **params)
+    return out_path
+
+
+def plot_jobs(path, img_dir=IMG_DIR, plots=PLOTS):
+    """render.Job for each chart of `path`, written to img_dir/<FILENAMES[plot]>."""
+    img_dir = Path(img_dir)
+    img_dir.mkdir(parents=True, exist_ok=True)
+    jobs = []
+    for plot in plots:
+        params = dict(plot=plot, **PARAMS[plot])
+        if plot == 'candle':
+            params['title'] = f'{_series(path)} Candlestick + MA7/MA30'
+        jobs.append(render.Job(draw, str(img_dir / FILENAMES[plot]), (str(path),), params, CODE_DEPS))
+    return jobs
+
+
+def make_plots(path, img_dir=IMG_DIR, plots=PLOTS, workers=None, force=False):
+    """Saves the selected charts of `path` into `img_dir`; each is skipped when its
+    image is up to date. Returns {plot: image path}."""
+    results = render.render(plot_jobs(path, img_dir, plots), workers=workers, force=force)
+    out = {}
+    for plot, (status, _, written) in zip(plots, results.values()):
+        print('Up to date' if status == 'skipped' else 'Saved' if status == 'ok' else status, written)
+        out[plot] = Path(written) if written else None
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Save the docs charts of processed series.')
+    parser.add_argument('--file', nargs='+', help='processed series (default: the first one matching --coin)')
+    parser.add_argument('--coin', default='bitcoin', help='coin to look for in data/processed (default bitcoin)')
+    parser.add_argument('--all', action='store_true', help='every series in data/processed')
+    parser.add_argument('--plots', nargs='+', choices=tuple(FILENAMES), default=list(PLOTS), help='charts to draw')
+    parser.add_argument('--out-dir', default=str(IMG_DIR), help='output directory (default docs/images)')
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='redraw up-to-date charts too')
+    args = parser.parse_args(argv)
+
+    if args.all:
+        files = sorted(PROCESSED_DIR.glob('*.parquet'))
+    elif args.file:
+        files = [Path(f) for f in args.file]
+    else:
+        btc_file = find_processed(args.coin, PROCESSED_DIR)
+        if btc_file is None:
+            raise SystemExit(f'No {args.coin} parquet found in data/processed')
+        files = [btc_file]
+    if len(files) == 1:
+        make_plots(files[0], args.out_dir, args.plots, workers=args.workers, force=args.force)
+        return
+
+    jobs = [job for f in files for job in plot_jobs(f, Path(args.out_dir) / _series(f), args.plots)]
+    results = render.render(jobs, workers=args.workers, force=args.force)
+    counts = {}
+    for out_path, (status, _, _) in results.items():
+        counts[status.split(':')[0]] = counts.get(status.split(':')[0], 0) + 1
+        if status.startswith('failed'):
+            print(status, out_path)
+    print(f'{len(jobs)} charts:', ', '.join(f'{n} {s}' for s, n in sorted(counts.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Shared CoinGecko HTTP client used by fetch_data and fetch_realtime.
+
+- one pooled `requests.Session` per process (keep-alive, no new TCP+TLS
+  handshake per call);
+- connect/read timeouts on every request;
+- rate limiting (`TokenBucket`) and retry with exponential backoff on 429/5xx;
+- conditional requests (If-None-Match / If-Modified-Since) when the API sent
+  validators, answering 304s from the last body;
+- per-request latency metrics (`metrics_summary`).
+
+The base URL comes from COINGECKO_API_BASE so every fetcher can be pointed at a
+local stub server.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from . import instrument
+except ImportError:  # run from inside src/ (streamlit, scripts)
+    import instrument
+
+API_BASE = os.environ.get("COINGECKO_API_BASE", "https://api.coingecko.com/api/v3")
+# public API budget; lower it if you keep hitting 429s, raise it on a paid plan
+DEFAULT_RATE_PER_MIN = float(os.environ.get("COINGECKO_RATE_PER_MIN", "25"))
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 16
+MAX_VALIDATORS = 256
+MAX_METRICS = 1000
+MAX_RETRY_AFTER = 60.0  # seconds; a longer Retry-After is not worth blocking a worker for
+
+
+class APIError(RuntimeError):
+    """Non-retryable (or retries exhausted) HTTP error from the API."""
+
+    def __init__(self, status, payload, url):
+        super().__init__(f"HTTP {status} from {url}: {payload}")
+        self.status = status
+        self.payload = payload
+        self.url = url
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate_per_min` sustained, bursts up to `capacity`."""
+
+    def __init__(self, rate_per_min=DEFAULT_RATE_PER_MIN, capacity=1):
+        if rate_per_min <= 0:
+            raise ValueError("rate_per_min must be > 0")
+        self.rate = rate_per_min / 60.0
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# ---------------------------------------------------------------------------
+# session, validators, metrics
+# ---------------------------------------------------------------------------
+
+_session = None
+_session_lock = threading.Lock()
+
+_validators = OrderedDict()  # (url, params) -> (etag, last_modified, body)
+_validators_lock = threading.Lock()
+
+_metrics = deque(maxlen=MAX_METRICS)
+_metrics_lock = threading.Lock()
+_local = threading.local()  # bytes of this thread's last get_json body
+
+
+def get_session():
+    """The process-wide pooled session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update({"Accept": "application/json"})
+                _session = s
+    return _session
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _record(path, status, elapsed, nbytes, attempt, not_modified):
+    with _metrics_lock:
+        _metrics.append({
+            "path": path,
+            "status": status,
+            "elapsed": elapsed,
+            "bytes": nbytes,
+            "attempt": attempt,
+            "not_modified": not_modified,
+            "at": time.time(),
+        })
+
+
+def last_bytes():
+    """Body size of the last get_json call made by this thread (0 for a 304 answered
+    from the validators cache)."""
+    return getattr(_local, "nbytes", 0)
+
+
+def recent_requests():
+    """Copy of the most recent request records (newest last)."""
+    with _metrics_lock:
+        return list(_metrics)
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def metrics_summary():
+    """Per-endpoint request count, error count, 304 count, bytes and latency percentiles (s)."""
+    by_path = {}
+    for r in recent_requests():
+        by_path.setdefault(r["path"], []).append(r)
+    out = {}
+    for path, rows in by_path.items():
+        lat = sorted(r["elapsed"] for r in rows)
+        out[path] = {
+            "requests": len(rows),
+            "errors": sum(1 for r in rows if r["status"] is None or r["status"] >= 400),
+            "not_modified": sum(1 for r in rows if r["not_modified"]),
+            "bytes": sum(r["bytes"] for r in rows),
+            "p50": lat[len(lat) // 2],
+            "p95": lat[min(len(lat) - 1, int(len(lat) * 0.95))],
+            "max": lat[-1],
+        }
+    return out
+
+
+def _cache_key(url, params):
+    return url, tuple(sorted((params or {}).items()))
+
+
+def _retry_delay(resp, attempt, backoff):
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), MAX_RETRY_AFTER)
+        except ValueError:
+            pass
+    return backoff * (2 ** attempt)
+
+
+def _payload(resp):
+    try:
+        return resp.json()
+    except ValueError:
+        return resp.text
+
+
+def get_json(path, params=None, limiter=None, retries=5, backoff=1.0, timeout=DEFAULT_TIMEOUT, conditional=False):
+    """GET API_BASE + path on the shared session and return the decoded JSON.
+
+    429 and 5xx responses (and connection errors/timeouts) are retried with
+    exponential backoff, honouring Retry-After (capped at MAX_RETRY_AFTER seconds).
+    Other errors raise APIError.
+    conditional=True sends the ETag/Last-Modified seen last time for the same
+    URL and params; a 304 returns that earlier body (do not mutate it).
+    """
+    url = API_BASE.rstrip("/") + path
+    key = _cache_key(url, params)
+    session = get_session()
+    for attempt in range(retries + 1):
+        headers = {}
+        cached = None
+        if conditional:
+            with _validators_lock:
+                cached = _validators.get(key)
+            if cached is not None:
+                if cached[0]:
+                    headers["If-None-Match"] = cached[0]
+                if cached[1]:
+                    headers["If-Modified-Since"] = cached[1]
+        if limiter is not None:
+            limiter.acquire()
+        t0 = time.perf_counter()
+        try:
+            with instrument.timer("http.get"):
+                resp = session.get(url, params=params, timeout=timeout, headers=headers)
+        except (requests.ConnectionError, requests.Timeout):
+            _record(path, None, time.perf_counter() - t0, 0, attempt, False)
+            if attempt == retries:
+                raise
+            time.sleep(_retry_delay(None, attempt, backoff))
+            continue
+        elapsed = time.perf_counter() - t0
+        _record(path, resp.status_code, elapsed, len(resp.content), attempt, resp.status_code == 304)
+        _local.nbytes = len(resp.content)
+        instrument.count("http.requests")
+        instrument.count("http.bytes", len(resp.content))
+
+        if resp.status_code == 304 and cached is not None:
+            with _validators_lock:
+                # the entry may have been evicted by another thread since it was read
+                if _validators.get(key) is cached:
+                    _validators.move_to_end(key)
+            return cached[2]
+        if resp.status_code in RETRY_STATUSES and attempt < retries:
+            time.sleep(_retry_delay(resp, attempt, backoff))
+            continue
+        if resp.status_code >= 400:
+            raise APIError(resp.status_code, _payload(resp), url)
+        with instrument.timer("http.decode"):
+            body = resp.json()
+        if conditional:
+            etag, last_mod = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+            if etag or last_mod:
+                with _validators_lock:
+                    _validators[key] = (etag, last_mod, body)
+                    _validators.move_to_end(key)
+                    while len(_validators) > MAX_VALIDATORS:
+                        _validators.popitem(last=False)
+        return body
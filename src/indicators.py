@@ -0,0 +1,309 @@
+"""Technical indicators shared by process_data, the dashboard and the analysis scripts.
+
+Two flavours live here:
+
+- batch helpers working on whole pandas Series (vectorized, used when a full
+  history is (re)computed);
+- an incremental engine (`IndicatorEngine`) that keeps rolling state so new bars
+  can be appended in O(1) each, without rescanning history.
+
+Both produce the same numbers for the same inputs (sample std with ddof=1, NaN
+until a window is full), so a series can be warmed up in batch and continued
+incrementally.
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# annualization factor for daily bars (crypto trades every day)
+PERIODS_PER_YEAR = 365
+
+
+# ---------------------------------------------------------------------------
+# batch helpers
+# ---------------------------------------------------------------------------
+
+def moving_average(close, window):
+    return close.rolling(window).mean()
+
+
+def bollinger_bands(close, window=20, k=2):
+    """Returns (mid, upper, lower)."""
+    mid = close.rolling(window).mean()
+    std = close.rolling(window).std()
+    return mid, mid + k * std, mid - k * std
+
+
+def log_returns(close):
+    return np.log(close / close.shift(1))
+
+
+def rolling_volatility(log_return, window=30, periods_per_year=PERIODS_PER_YEAR):
+    """Rolling std of log returns, annualized."""
+    return log_return.rolling(window).std() * np.sqrt(periods_per_year)
+
+
+def drawdown(close):
+    """Fractional distance from the running peak (0 at a new high, negative below it)."""
+    return close / close.cummax() - 1
+
+
+def rsi(close, window=14, method='sma'):
+    """Relative Strength Index.
+
+    method='sma' averages gains/losses with a simple rolling mean (what the
+    dashboard has always shown); method='wilder' uses Wilder's smoothing, seeded
+    with the simple mean of the first `window` changes.
+    """
+    delta = close.diff()
+    up = delta.clip(lower=0)
+    down = -delta.clip(upper=0)
+    if method == 'sma':
+        avg_up = up.rolling(window).mean()
+        avg_down = down.rolling(window).mean()
+    elif method == 'wilder':
+        avg_up = _wilder_smooth(up, window)
+        avg_down = _wilder_smooth(down, window)
+    else:
+        raise ValueError(f"Unknown RSI method: {method}")
+    rs = avg_up / avg_down
+    return 100 - (100 / (1 + rs))
+
+
+def _wilder_smooth(x, window):
+    out = pd.Series(np.nan, index=x.index, dtype=float)
+    if len(x) <= window:
+        return out
+    # x[0] is NaN (diff), so the seed is the mean of x[1..window]
+    seeded = x.iloc[window:].copy()
+    seeded.iloc[0] = x.iloc[1:window + 1].mean()
+    out.iloc[window:] = seeded.ewm(alpha=1.0 / window, adjust=False).mean().to_numpy()
+    return out
+
+
+def add_indicators(df, ma_short=7, ma_long=30, bb_window=20, rsi_window=14, vol_window=30,
+                   rsi_method='sma'):
+    """Adds the dashboard indicator columns to a copy of df (needs a 'close' column)."""
+    df = df.copy()
+    close = df['close']
+    df['MA_short'] = moving_average(close, ma_short)
+    df['MA_long'] = moving_average(close, ma_long)
+    df['BB_mid'], df['BB_upper'], df['BB_lower'] = bollinger_bands(close, bb_window)
+    df['pct_change'] = close.pct_change()
+    df['log_return'] = log_returns(close)
+    df['drawdown'] = drawdown(close)
+    df['rolling_vol_30d'] = rolling_volatility(df['log_return'], vol_window)
+    df['RSI'] = rsi(close, rsi_window, method=rsi_method)
+    return df
+
+
+# ---------------------------------------------------------------------------
+# incremental engine
+# ---------------------------------------------------------------------------
+
+class RollingWindow:
+    """Fixed-size window with O(1) running sum and sum of squares.
+
+    Mirrors pandas `rolling(window)` with the default min_periods: mean/std are
+    NaN until the window is full or while it contains a NaN.
+    """
+
+    # recompute the sums from scratch every N pushes to stop float drift
+    RESYNC_EVERY = 4096
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError('window must be >= 1')
+        self.window = window
+        self._values = deque()
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._nans = 0
+        self._pushes = 0
+
+    def push(self, x):
+        x = float(x)
+        self._values.append(x)
+        if math.isnan(x):
+            self._nans += 1
+        else:
+            self._sum += x
+            self._sumsq += x * x
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if math.isnan(old):
+                self._nans -= 1
+            else:
+                self._sum -= old
+                self._sumsq -= old * old
+        self._pushes += 1
+        if self._pushes % self.RESYNC_EVERY == 0:
+            self._resync()
+
+    def _resync(self):
+        vals = [v for v in self._values if not math.isnan(v)]
+        self._sum = math.fsum(vals)
+        self._sumsq = math.fsum(v * v for v in vals)
+
+    @property
+    def ready(self):
+        return len(self._values) == self.window and self._nans == 0
+
+    def mean(self):
+        if not self.ready:
+            return math.nan
+        return self._sum / self.window
+
+    def std(self):
+        n = self.window
+        if not self.ready or n < 2:
+            return math.nan
+        var = (self._sumsq - self._sum * self._sum / n) / (n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class RSIState:
+    """Incremental RSI over price changes ('sma' or 'wilder' smoothing, see `rsi`).
+
+    With 'wilder', NaN changes are skipped the way the batch ewm path does
+    (ignore_na=False): the averages hold over a gap and the next change is
+    weighted by how many bars the gap spanned.
+    """
+
+    def __init__(self, window=14, method='sma'):
+        if method not in ('sma', 'wilder'):
+            raise ValueError(f"Unknown RSI method: {method}")
+        self.window = window
+        self.method = method
+        self._up = RollingWindow(window)
+        self._down = RollingWindow(window)
+        self._pushes = 0
+        self._seed = [0.0, 0.0, 0]  # sum up, sum down, count of changes 1..window
+        self._avg_up = math.nan
+        self._avg_down = math.nan
+        self._gap = 0  # NaN changes since the last smoothed one
+
+    def push(self, delta):
+        """Feeds one price change (NaN for the first bar) and returns the current RSI."""
+        up = max(delta, 0.0) if not math.isnan(delta) else math.nan
+        down = max(-delta, 0.0) if not math.isnan(delta) else math.nan
+        if self.method == 'sma':
+            self._up.push(up)
+            self._down.push(down)
+            return self._value(self._up.mean(), self._down.mean())
+        return self._value(*self._wilder(up, down))
+
+    def _wilder(self, up, down):
+        i = self._pushes
+        self._pushes += 1
+        if i <= self.window:
+            # seed: simple mean of the valid changes 1..window (change 0 is the first bar's)
+            if i > 0 and not math.isnan(up):
+                self._seed[0] += up
+                self._seed[1] += down
+                self._seed[2] += 1
+            if i < self.window:
+                return math.nan, math.nan
+            n = self._seed[2]
+            self._avg_up, self._avg_down = (self._seed[0] / n, self._seed[1] / n) if n else (math.nan, math.nan)
+        elif math.isnan(up):
+            self._gap += 1
+        elif math.isnan(self._avg_up):
+            self._avg_up, self._avg_down = up, down  # no valid change yet: start from this one
+        else:
+            alpha = 1.0 / self.window
+            decay = (1 - alpha) ** (self._gap + 1)
+            self._avg_up = (decay * self._avg_up + alpha * up) / (decay + alpha)
+            self._avg_down = (decay * self._avg_down + alpha * down) / (decay + alpha)
+            self._gap = 0
+        return self._avg_up, self._avg_down
+
+    @staticmethod
+    def _value(avg_up, avg_down):
+        if math.isnan(avg_up) or math.isnan(avg_down):
+            return math.nan
+        if avg_down == 0:
+            return 100.0 if avg_up > 0 else math.nan
+        return 100 - 100 / (1 + avg_up / avg_down)
+
+
+class IndicatorEngine:
+    """Keeps rolling state for the dashboard indicators and updates it one bar at a time.
+
+    Column names match `add_indicators`. Typical use::
+
+        engine = IndicatorEngine.from_history(df['close'])
+        new_rows = engine.extend(new_bars['close'])
+    """
+
+    def __init__(self, ma_short=7, ma_long=30, bb_window=20, rsi_window=14, vol_window=30,
+                 rsi_method='sma', bb_k=2, periods_per_year=PERIODS_PER_YEAR):
+        self.bb_k = bb_k
+        self.vol_scale = math.sqrt(periods_per_year)
+        self._ma_short = RollingWindow(ma_short)
+        self._ma_long = RollingWindow(ma_long)
+        self._bb = RollingWindow(bb_window)
+        self._vol = RollingWindow(vol_window)
+        self._rsi = RSIState(rsi_window, rsi_method)
+        self._prev_close = math.nan
+        self._peak = math.nan
+
+    @property
+    def lookback(self):
+        """Number of trailing bars needed to warm up every window from scratch."""
+        return max(self._ma_short.window, self._ma_long.window, self._bb.window,
+                   self._vol.window + 1, self._rsi.window + 1)
+
+    @classmethod
+    def from_history(cls, close, **kwargs):
+        """Builds an engine whose state reflects `close` without replaying all of it.
+
+        Only the trailing `lookback` bars are fed through the windows; the drawdown
+        peak comes from one vectorized max over the history. With method='wilder'
+        the RSI is re-seeded from that tail, so it differs slightly from a full replay.
+        """
+        engine = cls(**kwargs)
+        tail = close.iloc[-engine.lookback:]
+        engine.extend(tail)
+        if len(close):
+            engine._peak = float(np.nanmax(close.to_numpy(dtype=float)))
+        return engine
+
+    def update(self, close):
+        """Feeds one close and returns the indicator values for that bar as a dict."""
+        close = float(close)
+        prev = self._prev_close
+        pct = close / prev - 1 if not math.isnan(prev) else math.nan
+        log_ret = math.log(close / prev) if not math.isnan(prev) else math.nan
+        delta = close - prev
+
+        for w in (self._ma_short, self._ma_long, self._bb):
+            w.push(close)
+        self._vol.push(log_ret)
+        rsi_val = self._rsi.push(delta)
+        if math.isnan(self._peak) or close > self._peak:
+            self._peak = close
+        self._prev_close = close
+
+        mid = self._bb.mean()
+        std = self._bb.std()
+        return {
+            'close': close,
+            'MA_short': self._ma_short.mean(),
+            'MA_long': self._ma_long.mean(),
+            'BB_mid': mid,
+            'BB_upper': mid + self.bb_k * std,
+            'BB_lower': mid - self.bb_k * std,
+            'pct_change': pct,
+            'log_return': log_ret,
+            'drawdown': close / self._peak - 1,
+            'rolling_vol_30d': self._vol.std() * self.vol_scale,
+            'RSI': rsi_val,
+        }
+
+    def extend(self, close):
+        """Feeds a Series of closes and returns a DataFrame of indicator rows on its index."""
+        rows = [self.update(c) for c in close.to_numpy(dtype=float)]
+        return pd.DataFrame(rows, index=close.index)
@@ -0,0 +1,230 @@
+"""Low-overhead timing and counters for the hot paths (fetch, processing, dashboard).
+
+    with instrument.timer('process_data.resample'):
+        ...
+
+    @instrument.timer('fetch_data.ohlc')
+    def fetch_ohlc(...):
+        ...
+
+    instrument.count('http.bytes', len(body))
+
+A timer costs two perf_counter calls and one locked append. Every finished
+timer is kept as an event (name, start, duration, thread) in a bounded deque
+and folded into per-name totals. `summary()` returns the totals and counters,
+`dump_json` writes them with the raw events, and `chrome_trace` writes the
+events in Chrome trace format (open in chrome://tracing or ui.perfetto.dev).
+
+`Lap` times consecutive sections of a script without re-indenting them, and
+`Profiler` captures one run with cProfile or, when installed, pyinstrument.
+Set BTC_INSTRUMENT=0 to turn timers and counters into no-ops.
+"""
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+
+ENABLED = os.environ.get('BTC_INSTRUMENT', '1') != '0'
+MAX_EVENTS = 10_000
+
+_events = deque(maxlen=MAX_EVENTS)  # (name, start s, duration s, thread id, args)
+_stats = {}  # name -> [count, total s, max s]
+_counters = {}
+_lock = threading.Lock()
+
+clock = time.perf_counter
+
+
+def _add(name, start, dur, args):
+    with _lock:
+        _events.append((name, start, dur, threading.get_ident(), args))
+        st = _stats.get(name)
+        if st is None:
+            _stats[name] = [1, dur, dur]
+        else:
+            st[0] += 1
+            st[1] += dur
+            st[2] = max(st[2], dur)
+
+
+class Timer(ContextDecorator):
+    """Times a block (`with timer(name):`) or every call of a function (`@timer(name)`)."""
+
+    def __init__(self, name, **args):
+        self.name = name
+        self.args = args or None
+        self._starts = threading.local()
+
+    def __enter__(self):
+        if ENABLED:
+            # a stack per thread: the same decorated function may recurse or run concurrently
+            stack = getattr(self._starts, 'stack', None)
+            if stack is None:
+                stack = self._starts.stack = []
+            stack.append(clock())
+        return self
+
+    def __exit__(self, *exc):
+        if ENABLED:
+            start = self._starts.stack.pop()
+            _add(self.name, start, clock() - start, self.args)
+        return False
+
+
+def timer(name, **args):
+    """A `Timer` recording under `name`; extra keyword args are attached to its events."""
+    return Timer(name, **args)
+
+
+def count(name, n=1):
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+class Lap:
+    """Consecutive sections of a script: lap('b') closes the running section and starts
+    'b'; stop() closes the last one. Section names are prefixed with `prefix.`."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._name = None
+        self._start = None
+
+    def __call__(self, name):
+        self.stop()
+        self._name, self._start = f'{self.prefix}.{name}', clock()
+
+    def stop(self):
+        if self._name is not None and ENABLED:
+            _add(self._name, self._start, clock() - self._start, None)
+        self._name = None
+
+
+def events(since=None, thread=None):
+    """[(name, start, duration, thread id, args)], optionally only those started at or
+    after `since` (a `clock()` value) and/or on one thread."""
+    with _lock:
+        out = list(_events)
+    return [e for e in out if (since is None or e[1] >= since) and (thread is None or e[3] == thread)]
+
+
+def summary(since=None, thread=None):
+    """{'timers': {name: {count, total_ms, mean_ms, max_ms}}, 'counters': {name: value}}.
+    With since/thread the timers are aggregated from the matching kept events only."""
+    if since is None and thread is None:
+        with _lock:
+            stats = {k: list(v) for k, v in _stats.items()}
+            counters = dict(_counters)
+    else:
+        stats = {}
+        for name, _, dur, _, _ in events(since, thread):
+            st = stats.setdefault(name, [0, 0.0, 0.0])
+            st[0] += 1
+            st[1] += dur
+            st[2] = max(st[2], dur)
+        with _lock:
+            counters = dict(_counters)
+    timers = {
+        name: {'count': n, 'total_ms': total * 1e3, 'mean_ms': total / n * 1e3, 'max_ms': mx * 1e3}
+        for name, (n, total, mx) in sorted(stats.items(), key=lambda kv: -kv[1][1])
+    }
+    return {'timers': timers, 'counters': counters}
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _stats.clear()
+        _counters.clear()
+
+
+def chrome_trace(since=None, thread=None):
+    """The kept events as a Chrome trace ({'traceEvents': [...]}, timestamps in µs)."""
+    pid = os.getpid()
+    trace = []
+    last = 0.0
+    for name, start, dur, tid, args in events(since, thread):
+        ev = {'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'ts': start * 1e6, 'dur': dur * 1e6,
+              'pid': pid, 'tid': tid}
+        if args:
+            ev['args'] = {k: str(v) for k, v in args.items()}
+        trace.append(ev)
+        last = max(last, start + dur)
+    with _lock:
+        counters = dict(_counters)
+    if counters:
+        trace.append({'name': 'counters', 'ph': 'C', 'ts': last * 1e6, 'pid': pid, 'args': counters})
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def dump_json(path=None, since=None, thread=None):
+    """Summary plus raw events as JSON; written to `path` when given. Returns the text."""
+    data = summary(since, thread)
+    data['events'] = [{'name': n, 'start': s, 'duration': d, 'thread': t, 'args': a}
+                      for n, s, d, t, a in events(since, thread)]
+    text = json.dumps(data, indent=2, default=str)
+    if path is not None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return text
+
+
+def dump_chrome_trace(path=None, since=None, thread=None):
+    text = json.dumps(chrome_trace(since, thread))
+    if path is not None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return text
+
+
+class Profiler:
+    """Opt-in capture of one run: kind 'cprofile' (stdlib) or 'pyinstrument' (optional).
+
+        prof = Profiler('cprofile').start()
+        ...
+        report = prof.stop()   # text report
+    """
+
+    KINDS = ('cprofile', 'pyinstrument')
+
+    def __init__(self, kind='cprofile', limit=40):
+        if kind not in self.KINDS:
+            raise ValueError(f'unknown profiler {kind!r}; expected one of {self.KINDS}')
+        self.kind = kind
+        self.limit = limit
+        self._prof = None
+
+    @staticmethod
+    def available(kind):
+        if kind == 'pyinstrument':
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                return False
+        return kind in Profiler.KINDS
+
+    def start(self):
+        if self.kind == 'pyinstrument':
+            from pyinstrument import Profiler as _Pyinstrument
+            self._prof = _Pyinstrument()
+            self._prof.start()
+        else:
+            import cProfile
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        return self
+
+    def stop(self):
+        """Stops the capture and returns its text report."""
+        if self.kind == 'pyinstrument':
+            self._prof.stop()
+            return self._prof.output_text(unicode=True, color=False)
+        import pstats
+        self._prof.disable()
+        out = io.StringIO()
+        pstats.Stats(self._prof, stream=out).sort_stats('cumulative').print_stats(self.limit)
+        return out.getvalue()
@@ -0,0 +1,159 @@
+"""Live streaming for the dashboard.
+
+A `LiveFeed` runs a background thread that polls a tick source, pushes every
+new tick through an `IndicatorEngine` (O(1) per tick, no recomputation of the
+history) and appends the resulting row to a preallocated `RingBuffer`, so the
+feed's memory is fixed by its capacity however long it runs. Every row gets a
+sequence number, so a reader asks `since(seq)` for exactly the rows appended
+after the last one it saw and only has to extend its charts with those.
+
+Sources have one method, `poll(since_ms)`, returning new (timestamp ms, price,
+volume) ticks newer than `since_ms`:
+
+- `ApiSource` asks CoinGecko market_chart/range for the recent window;
+- `ReplaySource` replays a raw market_chart dump from data/raw (JSON or .npz)
+  a few points per poll, for tests and offline demos.
+"""
+import threading
+import time
+
+import pandas as pd
+
+try:
+    from . import http_client, raw_io
+    from .indicators import IndicatorEngine
+    from .ringbuffer import RingBuffer
+except ImportError:  # run from inside src/ (streamlit)
+    import http_client, raw_io
+    from indicators import IndicatorEngine
+    from ringbuffer import RingBuffer
+
+DEFAULT_CAPACITY = 10_000
+# IndicatorEngine.update keys, plus the tick volume
+COLUMNS = ('close', 'MA_short', 'MA_long', 'BB_mid', 'BB_upper', 'BB_lower', 'pct_change',
+           'log_return', 'drawdown', 'rolling_vol_30d', 'RSI', 'volume')
+
+
+def _ticks(prices, volumes, since_ms=None):
+    """[(ts_ms, price, volume)] from market_chart [ts, value] rows, newer than since_ms."""
+    vol = {int(t): float(v) for t, v in volumes}
+    out = [(int(t), float(p), vol.get(int(t), float('nan'))) for t, p in prices]
+    return [t for t in out if since_ms is None or t[0] > since_ms]
+
+
+class ApiSource:
+    """Recent CoinGecko market_chart points (the first poll returns `lookback_minutes`)."""
+
+    def __init__(self, coin='bitcoin', currency='usd', lookback_minutes=60, interval=30.0):
+        self.coin, self.currency = coin, currency
+        self.lookback_minutes = lookback_minutes
+        self.interval = interval
+
+    def poll(self, since_ms=None):
+        now = int(time.time())
+        start = now - self.lookback_minutes * 60 if since_ms is None else since_ms // 1000
+        data = http_client.get_json(f'/coins/{self.coin}/market_chart/range',
+                                    params={'vs_currency': self.currency, 'from': start, 'to': now})
+        if 'prices' not in data:
+            raise ValueError(f'API error: {data}')
+        return _ticks(data['prices'], data.get('total_volumes', []), since_ms)
+
+
+class ReplaySource:
+    """Replays a raw market_chart file, `batch` points per poll (then nothing, or from
+    the start again with loop=True, shifted so timestamps keep increasing)."""
+
+    def __init__(self, path, batch=1, interval=1.0, loop=False):
+        arrays = raw_io.read_market_chart(str(path))
+        self.ticks = _ticks(arrays['prices'], arrays['total_volumes'])
+        self.batch = batch
+        self.interval = interval
+        self.loop = loop
+        self._pos = 0
+        self._offset = 0
+
+    def poll(self, since_ms=None):
+        if self._pos >= len(self.ticks):
+            if not self.loop or not self.ticks:
+                return []
+            self._offset += self.ticks[-1][0] - self.ticks[0][0] + 1
+            self._pos = 0
+        chunk = self.ticks[self._pos:self._pos + self.batch]
+        self._pos += len(chunk)
+        return [(t + self._offset, p, v) for t, p, v in chunk if since_ms is None or t + self._offset > since_ms]
+
+
+class LiveFeed:
+    """Background ingestion of a source into a bounded buffer of indicator rows."""
+
+    def __init__(self, source, capacity=DEFAULT_CAPACITY, interval=None, **indicator_kwargs):
+        self.source = source
+        self.interval = interval if interval is not None else getattr(source, 'interval', 5.0)
+        self.engine = IndicatorEngine(**indicator_kwargs)
+        self.buffer = RingBuffer(capacity, columns=COLUMNS)
+        self._last_ms = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.error = None
+        self.polls = 0
+
+    @property
+    def seq(self):
+        """Sequence number of the last row appended (0 before the first)."""
+        return self.buffer.total
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+                self.error = None
+            except Exception as e:  # keep polling; the dashboard shows the last error
+                self.error = e
+            self._stop.wait(self.interval)
+
+    def step(self):
+        """Polls the source once and appends its new ticks. Returns how many were added."""
+        ticks = self.source.poll(self._last_ms)
+        self.polls += 1
+        added = 0
+        for ts, price, volume in ticks:
+            if self._last_ms is not None and ts <= self._last_ms:
+                continue
+            row = self.engine.update(price)
+            with self._lock:
+                self.buffer.append(ts * 1_000_000, volume=volume, **row)
+            self._last_ms = ts
+            added += 1
+        return added
+
+    def since(self, seq=0):
+        """(DataFrame of the rows appended after `seq`, latest seq). Rows that already
+        fell out of the buffer are gone; the frame then starts at the oldest kept row."""
+        with self._lock:
+            latest = self.buffer.total
+            # the newest rows are one contiguous slice: O(new rows), not O(buffer)
+            n_new = min(latest - seq, len(self.buffer))
+            if n_new <= 0:
+                return pd.DataFrame(), latest
+            return self.buffer.to_frame(n=n_new, tz='UTC'), latest
+
+    def frame(self):
+        """Everything still in the buffer."""
+        return self.since(0)[0]
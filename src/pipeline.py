@@ -0,0 +1,212 @@
+"""Batch pipeline: fetch -> process -> analysis for many (coin, currency) pairs.
+
+    python src/pipeline.py bitcoin:usd ethereum:usd solana:eur --days 365 --rule 1D
+
+- fetch: incremental market_chart downloads (I/O bound) in a thread pool of
+  --fetch-workers threads sharing one rate limiter;
+- process and analysis: CPU bound, in a pool of --workers processes. A pair is
+  processed as soon as its own fetch is done, and analyzed as soon as it is
+  processed, so slow pairs never hold up the others;
+- a stage is skipped when its input signature (size/mtime of the raw file or
+  processed dataset, plus the stage parameters) matches the one recorded at its
+  last successful run in data/pipeline_state.json and its output still exists.
+  Fetches are skipped when the last one is younger than --max-age seconds.
+  A stage whose input was rewritten with the same content still runs, but returns
+  at once: process_and_save and write_analysis skip unchanged artifacts themselves
+  (content hashes, see `artifacts`).
+
+A failing pair is reported in the summary and does not stop the others.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+try:
+    from . import fetch_data, generate_analysis, http_client, process_data, store
+except ImportError:  # run as a script from src/
+    import fetch_data, generate_analysis, http_client, process_data, store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_PATH = os.path.join(ROOT, 'data', 'pipeline_state.json')
+STAGES = ('fetch', 'process', 'analysis')
+
+
+def parse_pair(text):
+    """'bitcoin:usd' -> ('bitcoin', 'usd'); the currency defaults to usd."""
+    coin, _, currency = text.partition(':')
+    return coin.strip().lower(), (currency.strip() or 'usd').lower()
+
+
+def raw_name(coin, currency, days):
+    return f"coingecko_{coin}_{currency}_market_chart_last{days}d.json"
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def input_signature(path, **params):
+    """Signature of a stage input: the file/dataset signature plus the stage parameters."""
+    payload = json.dumps({'input': store.signature(path), 'params': params}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+# -- stage jobs (module level so the process pool can pickle them) -------------
+
+def fetch_job(coin, currency, days, limiter):
+    return fetch_data.fetch_recent_market_chart(coin, currency, days=days, incremental=True, limiter=limiter,
+                                                out_fname=raw_name(coin, currency, days))
+
+
+def process_job(raw_path, rule, pyramid):
+    if pyramid:
+        written = process_data.process_pyramid(raw_path)
+        if not written:
+            raise ValueError(f'process_pyramid wrote no level for {os.path.basename(raw_path)} (empty raw data?)')
+        return written.get(rule) or list(written.values())[-1]
+    return process_data.process_and_save(raw_path, resample_rule=rule)
+
+
+def analysis_job(processed_path):
+    _, out_json = generate_analysis.write_analysis(processed_path)
+    return str(out_json)
+
+
+# -- driver -------------------------------------------------------------------
+
+class _Run:
+    def __init__(self, pairs, days, rule, pyramid, force, max_age, state, io_pool, cpu_pool, limiter,
+                 state_path=STATE_PATH):
+        self.pairs = pairs
+        self.days, self.rule, self.pyramid = days, rule, pyramid
+        self.force, self.max_age = force, max_age
+        self.state, self.state_path = state, state_path
+        self.io_pool, self.cpu_pool = io_pool, cpu_pool
+        self.limiter = limiter
+        self.pending = {}  # future -> (stage, pair, input signature, started)
+        self.results = {pair: {} for pair in pairs}
+
+    def _fresh(self, key, sig):
+        entry = self.state.get(key)
+        return (not self.force and entry is not None and entry.get('input') == sig
+                and os.path.exists(entry.get('output', '')))
+
+    def _skip(self, stage, pair, output):
+        self.results[pair][stage] = ('skipped', 0.0)
+        self.advance(stage, pair, output)
+
+    def start(self, pair):
+        coin, currency = pair
+        key = f'fetch/{coin}/{currency}'
+        entry = self.state.get(key)
+        if (not self.force and entry is not None and os.path.exists(entry.get('output', ''))
+                and time.time() - entry.get('at', 0) < self.max_age):
+            self._skip('fetch', pair, entry['output'])
+            return
+        fut = self.io_pool.submit(fetch_job, coin, currency, self.days, self.limiter)
+        self.pending[fut] = ('fetch', pair, None, time.perf_counter())
+
+    def advance(self, stage, pair, output):
+        """Queues (or skips) the stage after `stage` for `pair`."""
+        coin, currency = pair
+        if stage == 'fetch':
+            sig = input_signature(output, rule=self.rule, pyramid=self.pyramid)
+            if self._fresh(f'process/{coin}/{currency}', sig):
+                return self._skip('process', pair, self.state[f'process/{coin}/{currency}']['output'])
+            fut = self.cpu_pool.submit(process_job, output, self.rule, self.pyramid)
+            self.pending[fut] = ('process', pair, sig, time.perf_counter())
+        elif stage == 'process':
+            sig = input_signature(output)
+            if self._fresh(f'analysis/{coin}/{currency}', sig):
+                return self._skip('analysis', pair, self.state[f'analysis/{coin}/{currency}']['output'])
+            fut = self.cpu_pool.submit(analysis_job, output)
+            self.pending[fut] = ('analysis', pair, sig, time.perf_counter())
+
+    def run(self):
+        for pair in self.pairs:
+            self.start(pair)
+        while self.pending:
+            done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, pair, sig, started = self.pending.pop(fut)
+                elapsed = time.perf_counter() - started
+                try:
+                    output = str(fut.result())
+                except Exception as e:  # one pair failing must not stop the batch
+                    self.results[pair][stage] = (f'failed: {e}', elapsed)
+                    continue
+                self.results[pair][stage] = ('ok', elapsed)
+                self.state[f'{stage}/{pair[0]}/{pair[1]}'] = {'input': sig, 'output': output, 'at': time.time()}
+                save_state(self.state, self.state_path)
+                self.advance(stage, pair, output)
+        return self.results
+
+
+def run(pairs, days=365, rule='1D', pyramid=False, fetch_workers=4, workers=None, force=False,
+        max_age=0, rate_per_min=None, state_path=STATE_PATH):
+    """Runs the pipeline for `pairs` [(coin, currency), ...].
+    Returns {pair: {stage: (status, seconds)}} with status 'ok', 'skipped' or 'failed: ...'."""
+    state = load_state(state_path)
+    limiter = http_client.TokenBucket(rate_per_min or http_client.DEFAULT_RATE_PER_MIN)
+    with ThreadPoolExecutor(max_workers=fetch_workers) as io_pool, \
+            ProcessPoolExecutor(max_workers=workers) as cpu_pool:
+        results = _Run(list(pairs), days, rule, pyramid, force, max_age, state, io_pool, cpu_pool, limiter,
+                       state_path).run()
+    save_state(state, state_path)
+    return results
+
+
+def print_summary(results):
+    print(f"{'pair':<24}" + ''.join(f'{s:>20}' for s in STAGES))
+    for (coin, currency), stages in results.items():
+        cells = []
+        for s in STAGES:
+            status, secs = stages.get(s, ('-', 0.0))
+            cells.append(f'{status[:12]} {secs:6.1f}s' if status in ('ok', 'skipped') else status[:19])
+        print(f'{coin + ":" + currency:<24}' + ''.join(f'{c:>20}' for c in cells))
+    failed = [(p, s, st[0]) for p, stages in results.items() for s, st in stages.items() if st[0].startswith('failed')]
+    for (coin, currency), stage, status in failed:
+        print(f'{coin}:{currency} {stage} {status}')
+    return not failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch, process and analyze many (coin, currency) pairs.')
+    parser.add_argument('pairs', nargs='+', help='coin:currency, e.g. bitcoin:usd (currency defaults to usd)')
+    parser.add_argument('--days', type=int, default=365, help='market_chart window in days (default 365)')
+    parser.add_argument('--rule', default='1D', help="resample rule of the processed series (default 1D)")
+    parser.add_argument('--pyramid', action='store_true', help='write every pyramid level (process_pyramid)')
+    parser.add_argument('--fetch-workers', type=int, default=4, help='concurrent fetches (default 4)')
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (default: CPU count)')
+    parser.add_argument('--rate-per-min', type=float, default=None, help='shared API rate limit')
+    parser.add_argument('--max-age', type=float, default=0, help='skip fetches younger than this many seconds')
+    parser.add_argument('--skip-fetch', action='store_true', help='reuse the last fetched raw files')
+    parser.add_argument('--force', action='store_true', help='rerun every stage')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    results = run([parse_pair(p) for p in args.pairs], days=args.days, rule=args.rule, pyramid=args.pyramid,
+                  fetch_workers=args.fetch_workers, workers=args.workers, force=args.force,
+                  max_age=float('inf') if args.skip_fetch else args.max_age, rate_per_min=args.rate_per_min)
+    ok = print_summary(results)
+    print(f'Done in {time.perf_counter() - t0:.1f}s')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,49 +1,73 @@
-import json
 import os
+import re
 import pandas as pd
 import numpy as np
 
+try:
+    from . import artifacts, indicators, instrument, raw_io, store
+    from .indicators import log_returns, moving_average, rolling_volatility
+except ImportError:  # run from inside src/ (streamlit, scripts)
+    import artifacts, indicators, instrument, raw_io, store
+    from indicators import log_returns, moving_average, rolling_volatility
+
 ROOT = os.path.dirname(os.path.dirname(__file__))
 RAW_DIR = os.path.join(ROOT, 'data', 'raw')
 PROCESSED_DIR = os.path.join(ROOT, 'data', 'processed')
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
+# bars of history add_features needs before the first new bar (vol_30d: 30 log returns)
+FEATURE_LOOKBACK = 31
+
+# OHLCV levels built by process_pyramid, finest first; each is saved as <base>_<rule>.parquet
+PYRAMID_RULES = ('1min', '5min', '15min', '1h', '4h', '6h', '12h', '1D')
+
+# source the processed outputs depend on (a change here invalidates cached artifacts)
+CODE_DEPS = (__file__, indicators, raw_io, store)
+
 def detect_ts_unit(series):
     # simple heuristic: values > 1e12 are ms
     if series.max() > 1e12:
         return 'ms'
     return 's'
 
-def load_market_chart_json(path):
-    with open(path, 'r', encoding='utf-8') as f:
-        j = json.load(f)
-    prices = pd.DataFrame(j.get('prices', []), columns=['timestamp','price'])
-    if prices.empty:
+def _to_datetime_index(ts):
+    unit = detect_ts_unit(ts)
+    return pd.DatetimeIndex(pd.to_datetime(ts.astype(np.int64), unit=unit, utc=True), name='datetime')
+
+def _ts_cutoff(ts, since):
+    return since.value // (10**6 if detect_ts_unit(ts) == 'ms' else 10**9)
+
+@instrument.timer('process_data.load_market_chart_json')
+def load_market_chart_json(path, since=None):
+    """Parse a market_chart JSON into a price/volume DataFrame.
+    since: optional UTC Timestamp; points before it are dropped before any datetime conversion.
+    The file is streamed straight into NumPy arrays (see raw_io), never into Python lists.
+    """
+    arrays = raw_io.read_market_chart(path)
+    prices, vols = arrays['prices'], arrays['total_volumes']
+    if since is not None and len(prices):
+        prices = prices[prices[:, 0] >= _ts_cutoff(prices[:, 0], since)]
+        if len(vols):
+            vols = vols[vols[:, 0] >= _ts_cutoff(vols[:, 0], since)]
+    if len(prices) == 0:
         return pd.DataFrame()
-    unit = detect_ts_unit(prices['timestamp'])
-    prices['datetime'] = pd.to_datetime(prices['timestamp'], unit=('ms' if unit=='ms' else 's'), utc=True)
-    prices.set_index('datetime', inplace=True)
-    prices = prices.drop(columns=['timestamp'])
-    vols = pd.DataFrame(j.get('total_volumes', []), columns=['timestamp','volume'])
-    if not vols.empty:
-        vunit = detect_ts_unit(vols['timestamp'])
-        vols['datetime'] = pd.to_datetime(vols['timestamp'], unit=('ms' if vunit=='ms' else 's'), utc=True)
-        vols.set_index('datetime', inplace=True)
-        vols = vols.drop(columns=['timestamp'])
-        df = prices.join(vols, how='left')
-    else:
-        df = prices
+    df = pd.DataFrame({'price': prices[:, 1]}, index=_to_datetime_index(prices[:, 0]))
+    if len(vols):
+        if np.array_equal(vols[:, 0], prices[:, 0]):
+            # same timestamps as prices (the usual CoinGecko layout): no join needed
+            df['volume'] = vols[:, 1]
+        else:
+            vol_df = pd.DataFrame({'volume': vols[:, 1]}, index=_to_datetime_index(vols[:, 0]))
+            df = df.join(vol_df, how='left')
     return df.sort_index()
 
+@instrument.timer('process_data.load_ohlc_json')
 def load_ohlc_json(path):
-    with open(path,'r',encoding='utf-8') as f:
-        arr = json.load(f)
-    df = pd.DataFrame(arr, columns=['timestamp','open','high','low','close'])
-    unit = detect_ts_unit(df['timestamp'])
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit=('ms' if unit=='ms' else 's'), utc=True)
-    df.set_index('datetime', inplace=True)
-    return df[['open','high','low','close']].sort_index()
+    arr = raw_io.read_ohlc(path)
+    df = pd.DataFrame(arr[:, 1:], columns=['open','high','low','close'], index=_to_datetime_index(arr[:, 0]))
+    return df.sort_index()
 
+@instrument.timer('process_data.resample_to_ohlc')
 def resample_to_ohlc(df, rule='1D'):
     # df expected to have 'price' and optional 'volume'
     if 'price' not in df.columns:
@@ -56,33 +80,170 @@ def resample_to_ohlc(df, rule='1D'):
     agg.dropna(inplace=True)
     return agg
 
+def rule_delta(rule):
+    """Bar length of a resample rule such as '5min', '4h' or '1D'."""
+    return pd.Timedelta(rule.lower())
+
+@instrument.timer('process_data.resample_ohlc')
+def resample_ohlc(df, rule):
+    """Aggregate an OHLC(V) frame to a coarser rule (first/max/min/last, summed volume)."""
+    agg = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'}
+    if 'volume' in df.columns:
+        agg['volume'] = 'sum'
+    out = df.resample(rule).agg(agg)
+    out.dropna(inplace=True)
+    return out
+
+@instrument.timer('process_data.build_pyramid')
+def build_pyramid(df, rules=PYRAMID_RULES):
+    """OHLCV frames for every rule, finest first, from a price/volume frame (or an OHLC one).
+
+    Levels finer than the data's own spacing are skipped. Each level is aggregated from
+    the coarsest level already built whose bar length divides its own, so the raw
+    points are resampled only once; bins are aligned to midnight, which keeps the
+    cascade exact.
+    """
+    if len(df) > 1:
+        spacing = df.index.to_series().diff().median()
+    else:
+        spacing = pd.Timedelta(0)
+    levels = {}
+    for rule in sorted(rules, key=rule_delta):
+        delta = rule_delta(rule)
+        if delta < spacing * 0.9:  # CoinGecko spacing jitters by a few seconds
+            continue
+        src = None
+        for built in levels:
+            if delta % rule_delta(built) == pd.Timedelta(0):
+                src = built
+        if src is not None:
+            levels[rule] = resample_ohlc(levels[src], rule)
+        elif 'price' in df.columns:
+            levels[rule] = resample_to_ohlc(df, rule=rule)
+        else:
+            levels[rule] = resample_ohlc(df, rule)
+    return levels
+
+def pyramid_level(path, rule):
+    """(level rule, path) of the coarsest pyramid level next to `path` whose bars evenly
+    make up `rule`, or None when there is none. `path` is any <base>_<rule>.parquet."""
+    m = re.match(r'(.+)_(\d+[A-Za-z]+)\.parquet$', os.path.basename(str(path)))
+    if m is None:
+        return None
+    base, target = m.group(1), rule_delta(rule)
+    best = None
+    for level in PYRAMID_RULES:
+        candidate = os.path.join(os.path.dirname(str(path)), f"{base}_{level}.parquet")
+        if rule_delta(level) <= target and target % rule_delta(level) == pd.Timedelta(0) and os.path.exists(candidate):
+            best = (level, candidate)
+    return best
+
+@instrument.timer('process_data.add_features')
 def add_features(df):
     df = df.copy()
     df['pct_change'] = df['close'].pct_change() * 100
-    df['log_return'] = np.log(df['close'] / df['close'].shift(1))
-    df['MA7'] = df['close'].rolling(window=7).mean()
-    df['MA30'] = df['close'].rolling(window=30).mean()
+    df['log_return'] = log_returns(df['close'])
+    df['MA7'] = moving_average(df['close'], 7)
+    df['MA30'] = moving_average(df['close'], 30)
     # annualized vol: sqrt(365) for daily returns
-    df['vol_30d'] = df['log_return'].rolling(window=30).std() * np.sqrt(365)
+    df['vol_30d'] = rolling_volatility(df['log_return'], 30)
     return df
 
-def process_and_save(input_path, out_name=None, resample_rule='1D'):
-    # detect whether file is market_chart or ohlc by opening and inspecting
-    with open(input_path,'r',encoding='utf-8') as f:
-        data = json.load(f)
-    if isinstance(data, dict) and 'prices' in data:
-        df = load_market_chart_json(input_path)
+@instrument.timer('process_data.process_and_save')
+def process_and_save(input_path, out_name=None, resample_rule='1D', append=False):
+    """Parse, resample and add features, then save to data/processed.
+
+    append=False rewrites the whole output as a month-partitioned dataset (see
+    `store`). append=True appends to that dataset instead: only raw points from the
+    last stored bar on are resampled, features are recomputed with FEATURE_LOOKBACK
+    bars of context, and the result is written as new parts (the last stored bar
+    is upserted).
+
+    Skipped when the output's lineage (see `artifacts`) shows it was built from
+    the same raw content with the same rule.
+    """
+    if out_name is None:
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        out_name = f"{base}_{resample_rule}.parquet"
+    out_path = os.path.join(PROCESSED_DIR, out_name)
+    art = artifacts.Artifact('process_and_save', [out_path], [input_path],
+                             params={'resample_rule': resample_rule}, code=CODE_DEPS)
+    if art.fresh():
+        return out_path
+    _process(input_path, out_path, resample_rule, append)
+    art.record()
+    return out_path
+
+def _process(input_path, out_path, resample_rule, append):
+    since = store.last_timestamp(out_path) if append and os.path.exists(out_path) else None
+
+    # detect whether file is market_chart or ohlc from its first byte, then parse it once
+    if raw_io.sniff_format(input_path) == 'market_chart':
+        df = load_market_chart_json(input_path, since=since)
+        if df.empty and since is not None:
+            return out_path
         df_ohlc = resample_to_ohlc(df, rule=resample_rule)
     else:
         # assume ohlc list
         df_ohlc = load_ohlc_json(input_path)
-    df_feat = add_features(df_ohlc)
-    if out_name is None:
-        base = os.path.basename(input_path).replace('.json','')
-        out_name = f"{base}_{resample_rule}.parquet"
-    out_path = os.path.join(PROCESSED_DIR, out_name)
-    df_feat.to_parquet(out_path)
+
+    return _save_features(out_path, df_ohlc, since, append)
+
+def _save_features(out_path, df_ohlc, since, append):
+    if since is None:
+        df_feat = add_features(df_ohlc)
+        if append:
+            store.append_part(out_path, df_feat)
+        else:
+            store.write_processed(out_path, df_feat)
+        return out_path
+
+    df_ohlc = df_ohlc[df_ohlc.index >= since]
+    if df_ohlc.empty:
+        return out_path
+    context = store.tail(out_path, FEATURE_LOOKBACK + 1)
+    context = context.loc[context.index < df_ohlc.index[0], df_ohlc.columns.intersection(context.columns)]
+    df_feat = add_features(pd.concat([context, df_ohlc])).loc[df_ohlc.index]
+    store.append_part(out_path, df_feat, replace_from=df_ohlc.index[0])
     return out_path
 
+@instrument.timer('process_data.process_pyramid')
+def process_pyramid(input_path, rules=PYRAMID_RULES, append=False):
+    """Like process_and_save for every rule of the pyramid at once: the raw file is
+    parsed once and each level is saved as data/processed/<base>_<rule>.parquet.
+    Returns {rule: path} for the levels written (finer-than-data levels are skipped)."""
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    out_paths = {rule: os.path.join(PROCESSED_DIR, f"{base}_{rule}.parquet") for rule in rules}
+    art = artifacts.Artifact('process_pyramid', [], [input_path], params={'rules': list(rules)},
+                             code=CODE_DEPS, name=f'{base}_pyramid')
+    if art.fresh():
+        recorded = {os.path.abspath(p) for p in art.recorded_outputs()}
+        return {rule: p for rule, p in out_paths.items() if os.path.abspath(p) in recorded}
+    written = _process_pyramid(input_path, out_paths, append)
+    if written:
+        art.record(outputs=written.values())
+    return written
+
+def _process_pyramid(input_path, out_paths, append):
+    rules = list(out_paths)
+    sinces = {rule: store.last_timestamp(p) if append and os.path.exists(p) else None
+              for rule, p in out_paths.items()}
+    # every level needs raw points from its own last stored bar on
+    since = None if any(v is None for v in sinces.values()) else min(sinces.values())
+
+    if raw_io.sniff_format(input_path) == 'market_chart':
+        df = load_market_chart_json(input_path, since=since)
+        if df.empty:
+            return {}
+    else:
+        df = load_ohlc_json(input_path)
+        if since is not None:
+            df = df[df.index >= since]
+
+    written = {}
+    for rule, df_ohlc in build_pyramid(df, rules).items():
+        written[rule] = _save_features(out_paths[rule], df_ohlc, sinces[rule], append)
+    return written
+
 if __name__ == '__main__':
     print('process_data module loaded')
@@ -0,0 +1,180 @@
+"""Readers and writers for raw CoinGecko dumps in data/raw.
+
+Two on-disk formats are supported and read transparently by `read_market_chart`
+and `read_ohlc`:
+
+- `.json`: the API response as returned. It is streamed in fixed-size chunks and
+  the numeric arrays are poured straight into NumPy, without ever materializing
+  the document as Python lists. Peak memory is the output arrays plus one chunk,
+  instead of several times the file size with `json.load`. Only the shapes
+  CoinGecko returns are supported: an object whose values of interest are arrays
+  of numeric rows (market_chart), or a top-level array of numeric rows (ohlc).
+  `null` entries become NaN.
+- `.npz`: a lossless compressed NumPy archive of the same data (see `write_npz`).
+  Timestamps are stored as int64 deltas, values as float64, so a minute-resolution
+  year is a fraction of the JSON size and loads without any text parsing.
+"""
+import os
+import re
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 22  # 4 MiB
+
+MARKET_CHART_KEYS = ('prices', 'market_caps', 'total_volumes')
+
+_WHITESPACE = b' \t\r\n'
+_KEY_RE = re.compile(rb'"([A-Za-z_]+)":\[')
+_TO_SPACES = bytes.maketrans(b'[],', b'   ')
+_ROOT = '_root'
+
+RAW_FORMATS = ('json', 'npz')
+
+
+def raw_format(path):
+    return 'npz' if path.endswith('.npz') else 'json'
+
+
+def sniff_format(path):
+    """'market_chart' for a JSON object, 'ohlc' for a top-level JSON array."""
+    if raw_format(path) == 'npz':
+        with np.load(path) as z:
+            return str(z['kind'])
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(4096)
+            if not chunk:
+                raise ValueError(f'Empty raw file: {path}')
+            stripped = chunk.lstrip(_WHITESPACE)
+            if stripped:
+                break
+    if stripped[:1] == b'{':
+        return 'market_chart'
+    if stripped[:1] == b'[':
+        return 'ohlc'
+    raise ValueError(f'Unrecognized raw file format: {path}')
+
+
+def _parse_rows(body):
+    if not body:
+        return np.empty(0)
+    return np.fromstring(body.replace(b'null', b'nan').translate(_TO_SPACES), dtype=np.float64, sep=' ')
+
+
+def _scan(path, wanted, root_array=False, chunk_size=CHUNK_SIZE):
+    """Collects flat float64 arrays of every numeric value inside the wanted arrays."""
+    parts = {k: [] for k in wanted}
+    state = None  # None while looking for a key, else the key whose array we are inside
+    buf = b''
+    started = not root_array
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buf += chunk.translate(None, _WHITESPACE)
+            if not started and buf:
+                if buf[:1] != b'[':
+                    raise ValueError(f'Expected a top-level JSON array in {path}')
+                state, buf, started = _ROOT, buf[1:], True
+            while True:
+                if state is None:
+                    m = _KEY_RE.search(buf)
+                    if m is None:
+                        buf = buf[-64:]  # a key may straddle the chunk boundary
+                        break
+                    state = m.group(1).decode('ascii')
+                    buf = buf[m.end():]
+                    continue
+                if buf[:1] == b']':  # empty array
+                    state, buf = None, buf[1:]
+                    continue
+                end = buf.find(b']]')
+                if end != -1:
+                    if state in parts:
+                        parts[state].append(_parse_rows(buf[:end + 1]))
+                    state, buf = None, buf[end + 2:]
+                    continue
+                cut = buf.rfind(b'],')
+                if cut != -1:
+                    if state in parts:
+                        parts[state].append(_parse_rows(buf[:cut + 1]))
+                    buf = buf[cut + 2:]
+                break
+            if not chunk:
+                break
+    if state is not None:
+        raise ValueError(f'Truncated raw file: {path}')
+    return {k: (np.concatenate(v) if v else np.empty(0)) for k, v in parts.items()}
+
+
+def _rows(flat, width, key, path):
+    if flat.size % width:
+        raise ValueError(f"Malformed '{key}' array in {path}: expected rows of {width} values")
+    return flat.reshape(-1, width)
+
+
+def read_market_chart(path, keys=('prices', 'total_volumes')):
+    """Returns {key: float64 array of shape (n, 2)} with [timestamp, value] rows.
+
+    Missing keys come back as empty (0, 2) arrays.
+    """
+    if raw_format(path) == 'npz':
+        with np.load(path) as z:
+            return {k: _npz_rows(z, k, 2) for k in keys}
+    flat = _scan(path, keys)
+    return {k: _rows(v, 2, k, path) for k, v in flat.items()}
+
+
+def read_ohlc(path):
+    """Returns a float64 array of shape (n, 5) with [timestamp, open, high, low, close] rows."""
+    if raw_format(path) == 'npz':
+        with np.load(path) as z:
+            return _npz_rows(z, 'ohlc', 5)
+    flat = _scan(path, (_ROOT,), root_array=True)[_ROOT]
+    return _rows(flat, 5, 'ohlc', path)
+
+
+# ---------------------------------------------------------------------------
+# npz backend
+# ---------------------------------------------------------------------------
+
+def _npz_rows(z, key, width):
+    if f'{key}_ts' not in z.files:
+        return np.empty((0, width))
+    ts = np.cumsum(z[f'{key}_ts'])
+    out = np.empty((len(ts), width))
+    out[:, 0] = ts
+    out[:, 1:] = z[key].reshape(len(ts), width - 1)
+    return out
+
+
+def _pack(arrays, key, rows):
+    rows = np.asarray(rows, dtype=np.float64)
+    if rows.size == 0:
+        return
+    ts = rows[:, 0].astype(np.int64)
+    arrays[f'{key}_ts'] = np.diff(ts, prepend=0)  # first delta is the absolute timestamp
+    arrays[key] = rows[:, 1] if rows.shape[1] == 2 else rows[:, 1:]
+
+
+def write_npz(path, obj):
+    """Saves a market_chart dict or an ohlc list as a compressed .npz archive.
+
+    Rows may be lists (an API response) or arrays (see `read_market_chart`).
+    """
+    arrays = {}
+    if isinstance(obj, dict):
+        arrays['kind'] = np.array('market_chart')
+        for key in MARKET_CHART_KEYS:
+            if key in obj:
+                _pack(arrays, key, obj[key])
+    else:
+        arrays['kind'] = np.array('ohlc')
+        _pack(arrays, 'ohlc', obj)
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def npz_name(fname):
+    return os.path.splitext(fname)[0] + '.npz'
@@ -0,0 +1,112 @@
+"""Chart rendering service: fans chart jobs out to a pool of warm worker processes.
+
+A `Job` names a module-level draw function, its input files, the image it
+writes, its parameters and the other source files the drawing depends on
+(`code`: modules or paths; the module of `func` is always included); the
+function is called as `func(*inputs, out_path, **params)` and returns the path
+it actually wrote.
+`render(jobs)`:
+
+- skips jobs whose image is up to date: same input contents, parameters and
+  draw code as when it was last rendered (lineage in data/processed/meta, see
+  `artifacts`);
+- runs the others in a ProcessPoolExecutor. Each worker is set up once
+  (`_init_worker`): matplotlib on the Agg backend and, when kaleido is
+  installed, one warm kaleido renderer that every Plotly export of that worker
+  reuses instead of starting a new browser per image.
+
+`write_figure` exports a Plotly figure and falls back to HTML when kaleido is
+missing or fails.
+"""
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    from . import artifacts
+except ImportError:  # run from inside src/ (scripts)
+    import artifacts
+
+Job = namedtuple('Job', 'func out_path inputs params code', defaults=((), None, ()))
+
+def _init_worker():
+    """Per-process setup, run once when a worker (or the inline renderer) starts."""
+    import matplotlib
+    matplotlib.use('Agg')
+    try:
+        import kaleido
+    except ImportError:
+        return
+    try:
+        if hasattr(kaleido, 'start_sync_server'):
+            # kaleido >= 1.1: one persistent browser for every write_image of this process
+            kaleido.start_sync_server(silence_warnings=True)
+        else:
+            # kaleido 0.2: the renderer subprocess lives on after the first export
+            import plotly.graph_objects as go
+            go.Figure().to_image(format='png')
+    except Exception:
+        pass  # write_figure still tries write_image, then falls back to HTML
+
+
+def write_figure(fig, out_path):
+    """Writes a Plotly figure as an image; as HTML next to it when that fails.
+    Returns the path written."""
+    out_path = str(out_path)
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    try:
+        fig.write_image(out_path)
+        return out_path
+    except Exception as e:
+        print('Failed to write image (kaleido might be missing):', e)
+        out_html = os.path.splitext(out_path)[0] + '.html'
+        fig.write_html(out_html)
+        return out_html
+
+
+def _run(job):
+    t0 = time.perf_counter()
+    written = job.func(*job.inputs, job.out_path, **(job.params or {}))
+    return str(written or job.out_path), time.perf_counter() - t0
+
+
+def _artifact(job):
+    kind = 'render:' + job.func.__qualname__
+    return artifacts.Artifact(kind, [job.out_path], job.inputs, params=job.params, code=(job.func, *job.code))
+
+
+def render(jobs, workers=None, force=False):
+    """Renders `jobs` and returns {out_path: (status, seconds, written path)} with
+    status 'ok', 'skipped' or 'failed: ...'. workers=1 (or a single job to render) draws in
+    this process; otherwise a pool of `workers` processes (default: CPU count)."""
+    jobs = list(jobs)
+    results, todo = {}, []
+    for job in jobs:
+        art = _artifact(job)
+        if not force and art.fresh():
+            results[str(job.out_path)] = ('skipped', 0.0, (art.recorded_outputs() or [str(job.out_path)])[0])
+        else:
+            todo.append((job, art))
+
+    def done(job, art, outcome):
+        try:
+            written, secs = outcome()
+        except Exception as e:  # one broken chart must not stop the report
+            results[str(job.out_path)] = (f'failed: {e}', 0.0, None)
+            return
+        art.record(outputs=[written])
+        results[str(job.out_path)] = ('ok', secs, written)
+
+    if workers == 1 or len(todo) <= 1:
+        if todo:
+            _init_worker()
+        for job, art in todo:
+            done(job, art, lambda: _run(job))
+    else:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(_run, job): (job, art) for job, art in todo}
+            for fut in as_completed(futures):
+                done(*futures[fut], fut.result)
+    return {str(job.out_path): results[str(job.out_path)] for job in jobs}
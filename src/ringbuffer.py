@@ -0,0 +1,129 @@
+"""Fixed-capacity, preallocated ring buffer of timestamped columns (NumPy).
+
+Memory is allocated once: an int64 timestamp array and one array per column,
+each of length 2 * capacity. Every row is written twice, at slot i and at
+i + capacity, so the last n rows (n <= capacity) are always one contiguous
+slice of the arrays:
+
+- `append` is O(1), `extend` O(rows) with no reallocation;
+- `view` / `window` return zero-copy NumPy views of the latest rows (valid
+  until the next write overwrites those slots);
+- `to_frame` copies out into a pandas DataFrame only when asked.
+
+Timestamps (ns since the epoch, or anything pandas can turn into that) must be
+non-decreasing, which keeps `window` a binary search.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _ns(ts):
+    """Timestamps as int64 ns: accepts ints (already ns), datetime64 arrays and pandas objects."""
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    if isinstance(ts, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(ts).as_unit('ns').value
+    if isinstance(ts, pd.DatetimeIndex):
+        return ts.as_unit('ns').asi8
+    arr = np.asarray(ts)
+    if arr.dtype.kind == 'M':
+        return arr.astype('datetime64[ns]').astype(np.int64)
+    return arr.astype(np.int64)
+
+
+class RingBuffer:
+    def __init__(self, capacity, columns=('price', 'volume'), dtype=np.float64):
+        if capacity < 1:
+            raise ValueError('capacity must be >= 1')
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._cols = {c: np.full(2 * capacity, np.nan, dtype=dtype) for c in self.columns}
+        self._head = 0     # slot of the next write, in [0, capacity)
+        self._size = 0
+        self.total = 0     # rows ever appended (a sequence number for readers)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._ts.nbytes + sum(a.nbytes for a in self._cols.values())
+
+    @property
+    def last_ts(self):
+        """Latest timestamp (int ns) or None when empty."""
+        return int(self._ts[self._head + self.capacity - 1]) if self._size else None
+
+    @property
+    def first_ts(self):
+        return int(self._ts[self._head + self.capacity - self._size]) if self._size else None
+
+    def clear(self):
+        self._head = self._size = 0
+
+    def append(self, ts, **values):
+        """Adds one row; columns not given are NaN."""
+        ts = _ns(ts)
+        if self._size and ts < self.last_ts:
+            raise ValueError('timestamps must be non-decreasing')
+        i, j = self._head, self._head + self.capacity
+        self._ts[i] = self._ts[j] = ts
+        for c, arr in self._cols.items():
+            arr[i] = arr[j] = values.get(c, np.nan)
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total += 1
+
+    def extend(self, ts, **values):
+        """Adds many rows (arrays of equal length); only the last `capacity` are kept."""
+        ts = np.atleast_1d(_ns(ts))
+        n = len(ts)
+        if n == 0:
+            return
+        if np.any(np.diff(ts) < 0) or (self._size and ts[0] < self.last_ts):
+            raise ValueError('timestamps must be non-decreasing')
+        self.total += n
+        skip = max(0, n - self.capacity)
+        self._head = (self._head + skip) % self.capacity
+        ts = ts[skip:]
+        cols = {c: np.asarray(values[c], dtype=self._cols[c].dtype)[skip:] if c in values else None
+                for c in self.columns}
+        start = 0
+        while start < len(ts):
+            # contiguous run up to the physical end of the first half
+            k = min(len(ts) - start, self.capacity - self._head)
+            i = self._head
+            for lo in (i, i + self.capacity):
+                self._ts[lo:lo + k] = ts[start:start + k]
+                for c, arr in self._cols.items():
+                    arr[lo:lo + k] = np.nan if cols[c] is None else cols[c][start:start + k]
+            self._head = (self._head + k) % self.capacity
+            start += k
+        self._size = min(self._size + n, self.capacity)
+
+    def _bounds(self, n=None):
+        n = self._size if n is None else max(0, min(n, self._size))
+        end = self._head + self.capacity
+        return end - n, end
+
+    def view(self, n=None):
+        """(timestamps, {column: values}) of the last n rows (all by default), zero-copy."""
+        lo, hi = self._bounds(n)
+        return self._ts[lo:hi], {c: arr[lo:hi] for c, arr in self._cols.items()}
+
+    def window(self, start=None, end=None):
+        """Like `view`, limited to start <= t < end (timestamps or anything `_ns` takes)."""
+        lo, hi = self._bounds()
+        ts = self._ts[lo:hi]
+        a = 0 if start is None else int(np.searchsorted(ts, _ns(start), side='left'))
+        b = len(ts) if end is None else int(np.searchsorted(ts, _ns(end), side='left'))
+        return ts[a:b], {c: arr[lo + a:lo + b] for c, arr in self._cols.items()}
+
+    def to_frame(self, n=None, start=None, end=None, tz=None, index_name='timestamp'):
+        """Copies the last n rows (or the start/end window) into a DataFrame."""
+        ts, cols = self.window(start, end) if n is None else self.view(n)
+        index = pd.DatetimeIndex(ts.astype('datetime64[ns]'), name=index_name)
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        return pd.DataFrame({c: v.copy() for c, v in cols.items()}, index=index)
@@ -0,0 +1,147 @@
+"""Time-indexed segment store for price windows fetched from the API.
+
+Each (coin, currency, granularity) keeps a sorted list of non-overlapping
+segments `[start, end]` (unix seconds) with the points fetched for them. A new
+window is answered by slicing what is already held and fetching only the
+uncovered edges, so sliding a custom range by a day costs one small request
+instead of a full refetch.
+
+CoinGecko picks the point spacing from the requested span (see
+`coverage.api_granularity`), so an edge request is padded to the minimum span
+that still returns the granularity of the segment it extends.
+"""
+import threading
+import time
+
+import pandas as pd
+
+try:
+    from .coverage import DAY, api_granularity
+except ImportError:  # run from inside src/ (streamlit)
+    from coverage import DAY, api_granularity
+
+# smallest request span that CoinGecko answers at each granularity
+MIN_SPAN = {'5min': 0, 'hourly': DAY + 1, 'daily': 90 * DAY + 1}
+
+
+class _Segment:
+    __slots__ = ('start', 'end', 'df', 'used_at')
+
+    def __init__(self, start, end, df):
+        self.start, self.end, self.df = start, end, df
+        self.used_at = time.time()
+
+
+def _to_ts(unix):
+    return pd.Timestamp(unix, unit='s')
+
+
+class SegmentStore:
+    def __init__(self, max_points=500_000):
+        self.max_points = max_points
+        self._segments = {}  # key -> [_Segment] sorted by start
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.points_fetched = 0
+        self.points_served = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def gaps(self, key, start, end, live_slack=0):
+        """Uncovered parts of [start, end]. When the window is partly held, a trailing
+        gap shorter than live_slack is ignored (tolerated staleness at the live edge)."""
+        out = []
+        cursor = start
+        for seg in self._segments.get(key, []):
+            if seg.end < cursor:
+                continue
+            if seg.start > end:
+                break
+            if seg.start > cursor:
+                out.append((cursor, seg.start - 1))
+            cursor = max(cursor, seg.end + 1)
+            if cursor > end:
+                break
+        if cursor <= end and not (cursor > start and end - cursor < live_slack):
+            out.append((cursor, end))
+        return out
+
+    def _insert(self, key, start, end, df):
+        """Adds a fetched window, merging it with every segment it overlaps or touches
+        (fresh points win on duplicate timestamps)."""
+        with self._lock:
+            segs = self._segments.get(key, [])
+            merged = [s for s in segs if s.end + 1 >= start and s.start - 1 <= end]
+            keep = [s for s in segs if s not in merged]
+            if merged:
+                df = pd.concat([s.df for s in merged] + [df])
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+                start = min(start, merged[0].start)
+                end = max(end, merged[-1].end)
+            keep.append(_Segment(start, end, df))
+            keep.sort(key=lambda s: s.start)
+            self._segments[key] = keep
+
+    def _evict(self, protect):
+        """Drops least recently used segments until at most max_points are held.
+        Keys with a request in flight are left alone."""
+        with self._lock:
+            all_segs = [(k, s) for k, segs in self._segments.items() for s in segs]
+            total = sum(len(s.df) for _, s in all_segs)
+            for k, s in sorted(all_segs, key=lambda ks: ks[1].used_at):
+                if total <= self.max_points:
+                    break
+                if s is protect or not self._locks[k].acquire(blocking=False):
+                    continue
+                try:
+                    self._segments[k] = [x for x in self._segments[k] if x is not s]
+                finally:
+                    self._locks[k].release()
+                total -= len(s.df)
+
+    def get(self, coin, currency, start, end, fetch, live_slack=0):
+        """Points in [start, end] (unix seconds), fetching only uncovered edges.
+
+        fetch(a, b) must return a DataFrame indexed by naive UTC timestamps for the
+        API window [a, b]. live_slack (seconds) tolerates that much staleness at the
+        live edge before refetching it. Raises ValueError when the window is empty
+        once `end` is clipped to now (start in the future, or start > end).
+        """
+        now = int(time.time())
+        end = min(end, now)
+        if start > end:
+            raise ValueError(f'empty window: start {start} is after end {end} (end is clipped to now)')
+        gran = api_granularity(start, end, now=now)
+        key = (coin, currency, gran)
+        with self._key_lock(key):
+            for a, b in self.gaps(key, start, end, live_slack):
+                pad = MIN_SPAN[gran] - (b - a)
+                if pad > 0 and api_granularity(a, b, now=now) != gran:
+                    # widen a short edge request towards data we already hold so
+                    # the API answers at the same spacing as the segment it extends
+                    if b >= now - DAY:
+                        a -= pad
+                    else:
+                        b = min(b + pad, now)
+                df = fetch(a, b)
+                self.points_fetched += len(df)
+                self._insert(key, a, b, df)
+            # the segment holding `start` now reaches `end` (or end - live_slack)
+            seg = next(s for s in self._segments[key] if s.start <= start <= s.end)
+            seg.used_at = time.time()
+            out = seg.df.loc[_to_ts(start):_to_ts(end)]
+            self.points_served += len(out)
+        self._evict(seg)
+        return out
+
+    def stats(self):
+        with self._lock:
+            segs = [s for v in self._segments.values() for s in v]
+        return {
+            'segments': len(segs),
+            'points_held': sum(len(s.df) for s in segs),
+            'points_fetched': self.points_fetched,
+            'points_served': self.points_served,
+        }
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+BUY = "Buy"
+SELL = "Sell"
+HOLD = "Hold"
+
+
+def compute_signals(df, rsi_low=30, rsi_high=70):
+    """Vectorized Buy/Sell/Hold signals from MA crossover, RSI and Bollinger bands.
+
+    df must contain MA_short, MA_long, RSI, close, BB_upper and BB_lower.
+    Precedence per row: Bollinger beats RSI, RSI beats MA crossover. The first
+    row is always Hold. NaN comparisons are False, so warm-up rows fall through
+    to the next rule exactly like the original row-by-row loop.
+    Returns a pandas Series aligned on df.index.
+    """
+    ma_s = df['MA_short'].to_numpy(dtype=float)
+    ma_l = df['MA_long'].to_numpy(dtype=float)
+    rsi = df['RSI'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    bb_up = df['BB_upper'].to_numpy(dtype=float)
+    bb_lo = df['BB_lower'].to_numpy(dtype=float)
+
+    prev_s = np.roll(ma_s, 1)
+    prev_l = np.roll(ma_l, 1)
+    with np.errstate(invalid='ignore'):
+        conditions = [
+            close < bb_lo,
+            close > bb_up,
+            rsi < rsi_low,
+            rsi > rsi_high,
+            (ma_s > ma_l) & (prev_s <= prev_l),
+            (ma_s < ma_l) & (prev_s >= prev_l),
+        ]
+    choices = [BUY, SELL, BUY, SELL, BUY, SELL]
+    out = np.select(conditions, choices, default=HOLD).astype(object)
+    if len(out):
+        out[0] = HOLD
+    return pd.Series(out, index=df.index, name='Signal')
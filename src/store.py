@@ -0,0 +1,331 @@
+"""Processed-data storage.
+
+A processed series lives at `<name>.parquet`, which is one of:
+
+- a single Parquet file (what `process_and_save` wrote before datasets);
+- a flat append-only dataset: `part-00000.parquet`, `part-00001.parquet`, ...;
+- a time-partitioned dataset (what is written now): one hive directory per UTC
+  month, `year=YYYY/month=MM/part-NNNNN.parquet`, each file sorted by time and
+  split into row groups of ROW_GROUP_ROWS rows, so the Parquet footers carry
+  min/max statistics of the timestamp for every row group.
+
+Each append writes one new part per month it touches; only the last part is ever
+rewritten (to upsert the bar that was still open at the previous run). Older
+layouts are migrated to the partitioned one on the first append.
+
+`read_processed(path, start, end)` pushes the time range down to pyarrow: whole
+months are pruned by partition and the rest by row-group statistics, so a small
+window of a long series reads only a few row groups (older layouts get the
+row-group pruning only).
+"""
+import hashlib
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+_PART_RE = re.compile(r'^part-(\d+)\.parquet$')
+_YEAR_RE = re.compile(r'^year=(\d+)$')
+_MONTH_RE = re.compile(r'^month=(\d+)$')
+
+PARTITION_COLS = ('year', 'month')
+PARTITIONING = ds.partitioning(pa.schema([('year', pa.int16()), ('month', pa.int8())]), flavor='hive')
+# ~5.7 days of minute bars per row group: a one-week read touches two or three
+ROW_GROUP_ROWS = 8192
+
+
+def is_dataset(path):
+    return os.path.isdir(path)
+
+
+def is_partitioned(path):
+    return is_dataset(path) and any(_YEAR_RE.match(n) for n in os.listdir(path))
+
+
+def _numbered(path, regex):
+    out = []
+    for name in os.listdir(path):
+        m = regex.match(name)
+        if m:
+            out.append((int(m.group(1)), os.path.join(path, name)))
+    return [p for _, p in sorted(out)]
+
+
+def list_parts(path):
+    """Part files of a series in time/write order (a plain file is its own single part)."""
+    if not is_dataset(path):
+        return [path] if os.path.exists(path) else []
+    if not is_partitioned(path):
+        return _numbered(path, _PART_RE)
+    parts = []
+    for year_dir in _numbered(path, _YEAR_RE):
+        for month_dir in _numbered(year_dir, _MONTH_RE):
+            parts.extend(_numbered(month_dir, _PART_RE))
+    return parts
+
+
+def signature(path):
+    """Hash of the (relative path, size, mtime) of every part of the series at `path`;
+    changes whenever a part is written, rewritten or removed."""
+    h = hashlib.sha1()
+    for part in list_parts(str(path)):
+        st = os.stat(part)
+        h.update(f'{os.path.relpath(part, str(path))}|{st.st_size}|{st.st_mtime_ns};'.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def _index_name(schema):
+    """Name of the column holding the DataFrame index in a pandas-written schema."""
+    meta = schema.pandas_metadata or {}
+    cols = [c for c in meta.get('index_columns', []) if isinstance(c, str)]
+    return cols[0] if cols else None
+
+
+def _scalar(ts, typ):
+    """pyarrow scalar of `ts` matching the timestamp column type (tz-aware or naive)."""
+    ts = pd.Timestamp(ts)
+    if typ.tz is not None:
+        ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    elif ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return pa.scalar(ts, type=typ)
+
+
+def _utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+def _range_filter(dataset, start, end, partitioned):
+    year, month = ds.field('year'), ds.field('month')
+    index = _index_name(dataset.schema)
+    typ = dataset.schema.field(index).type if index else None
+    conds = []
+    if start is not None:
+        s = _utc(start)
+        if partitioned:
+            conds.append((year > s.year) | ((year == s.year) & (month >= s.month)))
+        if typ is not None:
+            conds.append(ds.field(index) >= _scalar(start, typ))
+    if end is not None:
+        e = _utc(end)
+        if partitioned:
+            conds.append((year < e.year) | ((year == e.year) & (month <= e.month)))
+        if typ is not None:
+            conds.append(ds.field(index) < _scalar(end, typ))
+    filt = None
+    for cond in conds:
+        filt = cond if filt is None else filt & cond
+    return filt
+
+
+def read_processed(path, start=None, end=None, columns=None):
+    """Series at `path` with a sorted DatetimeIndex, limited to start <= t < end.
+
+    The range is pushed down to pyarrow (partition pruning for partitioned
+    datasets, row-group statistics for every layout). `columns` may name columns
+    the series does not have; they are ignored.
+    """
+    partitioned = is_partitioned(path)
+    dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING if partitioned else None)
+    index = _index_name(dataset.schema)
+    names = [n for n in dataset.schema.names if not (partitioned and n in PARTITION_COLS)]
+    if columns is not None:
+        names = [n for n in names if n in columns or n == index]
+    df = dataset.to_table(columns=names, filter=_range_filter(dataset, start, end, partitioned)).to_pandas()
+    df.index = pd.to_datetime(df.index)
+    df = df.sort_index()
+    if start is not None or end is not None:
+        # exact bounds for series without an index column in their metadata
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= df.index >= _match_tz(start, df.index)
+        if end is not None:
+            mask &= df.index < _match_tz(end, df.index)
+        df = df[mask]
+    return df
+
+
+def _match_tz(ts, index):
+    ts = pd.Timestamp(ts)
+    if index.tz is not None:
+        return ts.tz_localize(index.tz) if ts.tzinfo is None else ts.tz_convert(index.tz)
+    return ts.tz_convert('UTC').tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def time_bounds(path):
+    """(first, last) timestamp of a series from the Parquet footers only, or None if empty.
+    Falls back to reading the index when a file has no statistics."""
+    parts = list_parts(path)
+    if not parts:
+        return None
+    first = _footer_bound(parts[0], 'min')
+    last = _footer_bound(parts[-1], 'max')
+    if first is None or last is None:
+        df = read_processed(path, columns=[])
+        if df.empty:
+            return None
+        return df.index[0], df.index[-1]
+    return first, last
+
+
+def _footer_bound(part, which):
+    pf = pq.ParquetFile(part)
+    index = _index_name(pf.schema_arrow)
+    if index is None or pf.metadata.num_row_groups == 0:
+        return None
+    col = pf.schema_arrow.get_field_index(index)
+    values = []
+    for rg in range(pf.metadata.num_row_groups):
+        stats = pf.metadata.row_group(rg).column(col).statistics
+        if stats is None or not stats.has_min_max:
+            return None
+        values.append(getattr(stats, which))
+    return pd.Timestamp(min(values) if which == 'min' else max(values))
+
+
+def tail(path, n):
+    """Last `n` rows, reading row groups from the end instead of the whole series."""
+    frames = []
+    remaining = n
+    for part in reversed(list_parts(path)):
+        pf = pq.ParquetFile(part)
+        for rg in reversed(range(pf.num_row_groups)):
+            chunk = pf.read_row_group(rg).to_pandas()
+            frames.append(chunk)
+            remaining -= len(chunk)
+            if remaining <= 0:
+                break
+        if remaining <= 0:
+            break
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames[::-1])
+    df.index = pd.to_datetime(df.index)
+    return df.sort_index().iloc[-n:]
+
+
+def iter_batches(path, columns=None, batch_rows=8 * ROW_GROUP_ROWS):
+    """The whole series as DataFrames of at most `batch_rows` rows, in time order.
+
+    Parts are streamed one record batch at a time, so memory stays bounded by a
+    batch however long the series is. `columns` may name missing columns.
+    """
+    for part in list_parts(path):
+        pf = pq.ParquetFile(part)
+        index = _index_name(pf.schema_arrow)
+        names = None
+        if columns is not None:
+            names = [n for n in pf.schema_arrow.names if n in columns or n == index]
+        for batch in pf.iter_batches(batch_size=batch_rows, columns=names):
+            df = pa.Table.from_batches([batch]).to_pandas()
+            if not isinstance(df.index, pd.DatetimeIndex):
+                df.index = pd.to_datetime(df.index)
+            yield df
+
+
+def last_timestamp(path):
+    last = tail(path, 1)
+    return None if last.empty else last.index[-1]
+
+
+def _write_atomic(df, path):
+    if df.index.name is None:
+        df = df.rename_axis('datetime')
+    tmp = path + '.tmp'
+    pq.write_table(pa.Table.from_pandas(df), tmp, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp, path)
+
+
+def _months(df):
+    """(year, month, rows) for each UTC month of a time-sorted frame."""
+    idx = pd.DatetimeIndex(df.index)
+    if idx.tz is not None:
+        idx = idx.tz_convert('UTC')
+    keys = np.asarray(idx.year * 100 + idx.month)
+    _, starts = np.unique(keys, return_index=True)
+    bounds = list(starts) + [len(df)]
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        yield int(keys[a] // 100), int(keys[a] % 100), df.iloc[a:b]
+
+
+def _month_dir(path, year, month):
+    return os.path.join(path, f'year={year}', f'month={month:02d}')
+
+
+def _next_part(directory):
+    parts = _numbered(directory, _PART_RE) if os.path.isdir(directory) else []
+    next_id = int(_PART_RE.match(os.path.basename(parts[-1])).group(1)) + 1 if parts else 0
+    return os.path.join(directory, f'part-{next_id:05d}.parquet')
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def write_processed(path, df):
+    """Writes `df` as a fresh partitioned dataset at `path`, replacing whatever is there."""
+    df = df.sort_index()
+    tmp = path + '.writing'
+    _remove(tmp)
+    os.makedirs(tmp)
+    if df.empty:
+        _write_atomic(df, os.path.join(tmp, 'part-00000.parquet'))
+    for year, month, rows in _months(df):
+        month_dir = _month_dir(tmp, year, month)
+        os.makedirs(month_dir)
+        _write_atomic(rows, os.path.join(month_dir, 'part-00000.parquet'))
+    old = path + '.old'
+    _remove(old)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    _remove(old)
+    return path
+
+
+def _ensure_dataset(path):
+    """Makes `path` a partitioned dataset, rewriting a single file or flat dataset once."""
+    if is_partitioned(path):
+        return
+    if list_parts(path):
+        existing = read_processed(path)
+        if not existing.empty:
+            write_processed(path, existing)
+            return
+        _remove(path)
+    os.makedirs(path, exist_ok=True)
+
+
+def append_part(path, df, replace_from=None):
+    """Appends `df` to the dataset at `path` as one new part per month it covers.
+
+    Rows of the current last part with index >= `replace_from` are dropped first
+    (upsert of a bar that is recomputed in `df`). Returns the new part paths.
+    """
+    _ensure_dataset(path)
+    parts = list_parts(path)
+    if replace_from is not None and parts:
+        last_part = parts[-1]
+        old = pd.read_parquet(last_part)
+        keep = old[pd.to_datetime(old.index) < replace_from]
+        if len(keep) != len(old):
+            if keep.empty:
+                os.remove(last_part)
+            else:
+                _write_atomic(keep, last_part)
+    written = []
+    for year, month, rows in _months(df.sort_index()):
+        out = _next_part(_month_dir(path, year, month))
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        _write_atomic(rows, out)
+        written.append(out)
+    return written
@@ -0,0 +1,285 @@
+"""One-pass, mergeable statistics for series that do not fit in memory.
+
+Each accumulator consumes NumPy arrays batch by batch (`update`) and can be
+combined with another one built over a different slice (`merge`), so a long
+series can be summarized in one streaming pass, or in parallel per file:
+
+- `Moments`: count, min, max, mean and the 2nd-4th central moments, updated
+  with the Welford/Pébay pairwise formulas (stable, no sum-of-powers
+  cancellation). std, skew and kurt use pandas' sample estimators.
+- `QuantileSketch`: a DDSketch-style log-bucket histogram. Every quantile is
+  within `rel_error` (relative) of an exact one, and the size only grows with
+  the log of the value range.
+- `DrawdownTracker`: running peak, maximum drawdown and when it happened.
+
+`summarize(batches)` combines them into the statistics written by
+generate_analysis, reading the close column of each batch once.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .indicators import rolling_volatility
+except ImportError:  # run from inside src/ (streamlit, scripts)
+    from indicators import rolling_volatility
+
+
+class Moments:
+    """Count, extrema and central moments of the non-NaN values seen so far."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_ = 0.0
+        self.m2 = self.m3 = self.m4 = 0.0
+        self.lo = math.inf
+        self.hi = -math.inf
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        if len(x) == 0:
+            return self
+        other = Moments()
+        other.n = len(x)
+        other.mean_ = float(x.mean())
+        d = x - other.mean_
+        d2 = d * d
+        other.m2 = float(d2.sum())
+        other.m3 = float((d2 * d).sum())
+        other.m4 = float((d2 * d2).sum())
+        other.lo, other.hi = float(x.min()), float(x.max())
+        return self.merge(other)
+
+    def merge(self, other):
+        """Combines `other` into self (Pébay's pairwise update of M2..M4)."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean_ - self.mean_
+        d_n = delta / n
+        m2 = self.m2 + other.m2 + delta * d_n * na * nb
+        m3 = (self.m3 + other.m3 + delta * d_n * d_n * na * nb * (na - nb)
+              + 3 * d_n * (na * other.m2 - nb * self.m2))
+        m4 = (self.m4 + other.m4 + delta * d_n ** 3 * na * nb * (na * na - na * nb + nb * nb)
+              + 6 * d_n * d_n * (na * na * other.m2 + nb * nb * self.m2)
+              + 4 * d_n * (na * other.m3 - nb * self.m3))
+        self.n = n
+        self.mean_ += d_n * nb
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.lo, self.hi = min(self.lo, other.lo), max(self.hi, other.hi)
+        return self
+
+    @property
+    def min(self):
+        return self.lo if self.n else math.nan
+
+    @property
+    def max(self):
+        return self.hi if self.n else math.nan
+
+    @property
+    def mean(self):
+        return self.mean_ if self.n else math.nan
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.var) if self.n > 1 else math.nan
+
+    @property
+    def skew(self):
+        """Adjusted Fisher-Pearson skewness, as pandas Series.skew."""
+        n = self.n
+        if n < 3:
+            return math.nan
+        if self.m2 == 0:
+            return 0.0
+        m2, m3 = self.m2 / n, self.m3 / n
+        return math.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5
+
+    @property
+    def kurt(self):
+        """Unbiased excess kurtosis, as pandas Series.kurt."""
+        n = self.n
+        if n < 4:
+            return math.nan
+        if self.m2 == 0:
+            return 0.0
+        num = n * (n + 1) * (n - 1) * self.m4
+        den = (n - 2) * (n - 3) * self.m2 ** 2
+        return num / den - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy `rel_error` (DDSketch).
+
+    Positive values land in bucket ceil(log_gamma(x)), negative ones mirrored in a
+    second store, values with |x| < MIN_ABS count as zero. A bucket is reported
+    as the point whose relative distance to both bucket ends is `rel_error`.
+    """
+
+    MIN_ABS = 1e-12
+
+    def __init__(self, rel_error=0.001):
+        self.rel_error = rel_error
+        self.gamma = (1 + rel_error) / (1 - rel_error)
+        self._log_gamma = math.log(self.gamma)
+        self.pos = {}
+        self.neg = {}
+        self.zeros = 0
+        self.n = 0
+
+    def _add(self, store, values):
+        keys, counts = np.unique(np.ceil(np.log(values) / self._log_gamma).astype(np.int64), return_counts=True)
+        for k, c in zip(keys.tolist(), counts.tolist()):
+            store[k] = store.get(k, 0) + c
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        if len(x) == 0:
+            return self
+        small = np.abs(x) < self.MIN_ABS
+        self.zeros += int(small.sum())
+        self._add(self.pos, x[(x > 0) & ~small])
+        self._add(self.neg, -x[(x < 0) & ~small])
+        self.n += len(x)
+        return self
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError('cannot merge sketches with different rel_error')
+        for mine, theirs in ((self.pos, other.pos), (self.neg, other.neg)):
+            for k, c in theirs.items():
+                mine[k] = mine.get(k, 0) + c
+        self.zeros += other.zeros
+        self.n += other.n
+        return self
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        """Value at quantile q in [0, 1] (NaN when empty); q=0.5 is the median.
+        Like pandas, the two middle ranks are averaged when they fall apart."""
+        if self.n == 0:
+            return math.nan
+        rank = q * (self.n - 1)
+        lo, hi = math.floor(rank), math.ceil(rank)
+        a, b = self._at_rank(lo), self._at_rank(hi)
+        return a + (b - a) * (rank - lo)
+
+    def _at_rank(self, rank):
+        seen = 0
+        for k in sorted(self.neg, reverse=True):
+            seen += self.neg[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.pos):
+            seen += self.pos[k]
+            if seen > rank:
+                return self._value(k)
+        return self._value(max(self.pos)) if self.pos else 0.0
+
+    @property
+    def median(self):
+        return self.quantile(0.5)
+
+
+class DrawdownTracker:
+    """Running peak and the deepest drawdown (close / running peak - 1) so far.
+
+    Ties resolve to the earliest timestamp, as pandas idxmin/idxmax do."""
+
+    def __init__(self):
+        self.peak = math.nan
+        self.peak_at = None
+        self.max_drawdown = math.nan
+        self.trough_at = None
+        self.peak_before_trough = None
+
+    def update(self, index, close):
+        c = np.asarray(close, dtype=np.float64)
+        if len(c) == 0 or np.isnan(c).all():
+            return self
+        start = c[0] if math.isnan(self.peak) else self.peak
+        running = np.fmax.accumulate(np.concatenate([[start], c]))[1:]
+        dd = c / running - 1
+        i = int(np.nanargmin(dd))
+        if math.isnan(self.max_drawdown) or dd[i] < self.max_drawdown:
+            self.max_drawdown = float(dd[i])
+            self.trough_at = index[i]
+            if not math.isnan(self.peak) and running[i] == self.peak:
+                self.peak_before_trough = self.peak_at
+            else:
+                self.peak_before_trough = index[int(np.nanargmax(c[:i + 1]))]
+        j = int(np.nanargmax(c))
+        if math.isnan(self.peak) or c[j] > self.peak:
+            self.peak, self.peak_at = float(c[j]), index[j]
+        return self
+
+
+def summarize(batches, vol_window=30, recent=30, rel_error=0.001):
+    """Statistics of the close prices in `batches` (DataFrames with a close column
+    and a DatetimeIndex, in time order), in one pass with bounded memory.
+
+    Returns a dict: start, end, count, na_count, price (Moments), price_q and
+    returns_q (QuantileSketch), returns (Moments of pct changes), log_returns
+    (Moments of log returns), vol (Moments of the annualized rolling volatility),
+    drawdown (DrawdownTracker) and recent (the last `recent` closes)."""
+    price, returns, logr, vol = Moments(), Moments(), Moments(), Moments()
+    price_q, returns_q = QuantileSketch(rel_error), QuantileSketch(rel_error)
+    dd = DrawdownTracker()
+    start = end = None
+    count = na_count = 0
+    prev = math.nan
+    vol_carry = np.empty(0)
+    tail = pd.Series(dtype=np.float64)
+
+    for df in batches:
+        if 'close' not in df.columns:
+            raise ValueError('series does not contain close prices.')
+        if df.empty:
+            continue
+        close = df['close'].to_numpy(dtype=np.float64)
+        start = df.index[0] if start is None else min(start, df.index[0])
+        end = df.index[-1] if end is None else max(end, df.index[-1])
+        count += len(close)
+        na_count += int(np.isnan(close).sum())
+
+        price.update(close)
+        price_q.update(close)
+        dd.update(df.index, close)
+
+        shifted = np.concatenate([[prev], close[:-1]])
+        pct = close / shifted - 1
+        returns.update(pct)
+        returns_q.update(pct)
+        lr = np.log(close / shifted)
+        logr.update(lr)
+        prev = close[-1]
+
+        # rolling volatility of the non-NaN log returns, continued across batches
+        lr = np.concatenate([vol_carry, lr[~np.isnan(lr)]])
+        vol.update(rolling_volatility(pd.Series(lr), vol_window).to_numpy()[len(vol_carry):])
+        vol_carry = lr[-(vol_window - 1):] if vol_window > 1 else np.empty(0)
+
+        tail = pd.concat([tail, df['close']]).iloc[-recent:] if len(tail) else df['close'].iloc[-recent:]
+
+    return {
+        'start': start, 'end': end, 'count': count, 'na_count': na_count,
+        'price': price, 'price_q': price_q, 'returns': returns, 'returns_q': returns_q,
+        'log_returns': logr, 'vol': vol, 'drawdown': dd, 'recent': tail,
+    }
@@ -36,3 +36,24 @@ def plot_candlestick_plotly(df, title='Candlestick'):
     )])
     fig.update_layout(title=title, xaxis_rangeslider_visible=False)
     return fig
+
+def plot_candlestick_ma_volume(df, title='Candlestick + MA7/MA30', width=1200, height=700):
+    from plotly.subplots import make_subplots
+
+    df = df.copy()
+    # Ensure MA columns exist
+    for w in (7, 30):
+        col = f'MA{w}'
+        if col not in df.columns:
+            df[col] = df['close'].rolling(w).mean()
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.75, 0.25], vertical_spacing=0.03)
+    fig.add_trace(go.Candlestick(x=df.index, open=df['open'], high=df['high'], low=df['low'], close=df['close'], name='OHLC'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=df.index, y=df['MA7'], mode='lines', name='MA7', line=dict(color='blue')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=df.index, y=df['MA30'], mode='lines', name='MA30', line=dict(color='orange')), row=1, col=1)
+    # volume
+    if 'volume' in df.columns:
+        fig.add_trace(go.Bar(x=df.index, y=df['volume'], name='Volume', marker=dict(color='lightgray')), row=2, col=1)
+
+    fig.update_layout(title=title, xaxis_rangeslider_visible=False, width=width, height=height)
+    return fig
@@ -0,0 +1,126 @@
+"""Shared fixtures: a local CoinGecko-shaped HTTP stub and a fake clock."""
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src import coverage, http_client  # noqa: E402
+
+
+class FakeClock:
+    """Replaces time.time; starts at `now` and only moves when told to."""
+
+    def __init__(self, now=1_750_000_000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class StubAPI:
+    """CoinGecko market_chart(/range) answers built from a deterministic price curve.
+
+    Points are spaced like the real API (5 min / hourly / daily by window) and never
+    newer than `clock()`; prices are scaled by `rates[vs_currency]`. `fail` is a list of status codes answered (in order) before
+    the real responses, None for a real response in between; every request is logged
+    as (path, params, headers).
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.fail = []
+        self.retry_after = '0'
+        self.requests = []
+        self.etags = True
+        self.rates = {'usd': 1.0}
+
+    def rows(self, frm, to, rate=1.0):
+        now = self.clock()
+        step = coverage.GRANULARITY_SECONDS[coverage.api_granularity(frm, to, now=now)]
+        first = (frm // step + (frm % step > 0)) * step
+        return [[t * 1000, rate * (100.0 + (t // step) % 97)] for t in range(first, int(min(to, now)) + 1, step)]
+
+    def answer(self, path, params, headers):
+        self.requests.append((path, params, headers))
+        if self.fail:
+            status = self.fail.pop(0)
+            if status is not None:
+                return status, None
+        rate = self.rates.get(params.get('vs_currency'), 1.0)
+        if path.endswith('/market_chart/range'):
+            rows = self.rows(int(params['from']), int(params['to']), rate)
+        elif path.endswith('/market_chart'):
+            to = int(self.clock())
+            rows = self.rows(to - int(float(params.get('days', 1)) * 86400), to, rate)
+        else:
+            return 404, {'error': 'not found'}
+        return 200, {'prices': rows, 'market_caps': rows, 'total_volumes': rows}
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            params = dict(urllib.parse.parse_qsl(url.query))
+            status, body = api.answer(url.path, params, dict(self.headers))
+            data = json.dumps(body if body is not None else {'error': status}).encode()
+            etag = '"%08x"' % (hash(data) & 0xffffffff)
+            if status == 200 and api.etags and self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            if status == 429:
+                self.send_header('Retry-After', api.retry_after)
+            if status == 200 and api.etags:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    """A running StubAPI; http_client points at it for the test."""
+    api = StubAPI(clock=lambda: time.time())
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(api))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(http_client, 'API_BASE', f'http://127.0.0.1:{server.server_address[1]}/api/v3')
+    yield api
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def raw_dirs(tmp_path, monkeypatch):
+    """fetch_data writes its raw files and sidecars under tmp_path."""
+    from src import fetch_data
+    monkeypatch.setattr(fetch_data, 'DATA_DIR', str(tmp_path / 'raw'))
+    monkeypatch.setattr(fetch_data, 'METADATA_DIR', str(tmp_path / 'raw' / 'meta'))
+    return tmp_path / 'raw'
@@ -0,0 +1,57 @@
+import os
+import time
+
+import pandas as pd
+
+from src.cache import TTLCache
+
+
+def frame(n, tag=0):
+    df = pd.DataFrame({'price': [float(tag + i) for i in range(n)]},
+                      index=pd.date_range('2025-01-01', periods=n, freq='5min', name='timestamp'))
+    df.attrs['fetch'] = {'requests': 1, 'points_used': n}
+    return df
+
+
+def test_disk_tier_round_trips_frames_as_parquet(tmp_path):
+    TTLCache(disk_dir=str(tmp_path)).set(('bitcoin', 'usd', 60), frame(10))
+    assert [p.suffix for p in tmp_path.iterdir()] == ['.parquet']
+    hit, value = TTLCache(disk_dir=str(tmp_path)).get(('bitcoin', 'usd', 60))
+    assert hit
+    pd.testing.assert_frame_equal(value, frame(10), check_freq=False)
+    assert value.attrs['fetch'] == {'requests': 1, 'points_used': 10}
+
+
+def test_disk_tier_is_pruned_least_recently_used_first(tmp_path):
+    TTLCache(disk_dir=str(tmp_path / 'probe')).set('probe', frame(1000))
+    limit = int(2.5 * next((tmp_path / 'probe').iterdir()).stat().st_size)
+    cache_dir = tmp_path / 'cache'
+    cache = TTLCache(disk_dir=str(cache_dir), disk_max_bytes=limit)
+    cache.set('a', frame(1000, 1))
+    cache.set('b', frame(1000, 2))
+    past = time.time() - 100
+    for p in cache_dir.iterdir():  # 'a' and 'b' last used a while ago ...
+        os.utime(p, (past, os.stat(p).st_mtime))
+    assert TTLCache(disk_dir=str(cache_dir)).get('a')[0]  # ... then 'a' is read again
+    cache.set('c', frame(1000, 3))
+    fresh = TTLCache(disk_dir=str(cache_dir), disk_max_bytes=limit)
+    assert [fresh.get(k)[0] for k in 'abc'] == [True, False, True]
+    assert sum(p.stat().st_size for p in cache_dir.iterdir()) <= limit
+
+
+def test_disk_tier_drops_expired_files_and_old_pickles(tmp_path):
+    (tmp_path / 'old.pkl').write_bytes(b'x')
+    cache = TTLCache(ttl=60, disk_dir=str(tmp_path))
+    cache.set('a', frame(5))
+    path = next(tmp_path.glob('*.parquet'))
+    os.utime(path, (time.time(), time.time() - 120))
+    TTLCache(ttl=60, disk_dir=str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_other_values_stay_in_memory(tmp_path):
+    cache = TTLCache(disk_dir=str(tmp_path))
+    cache.set('k', {'not': 'a frame'})
+    assert cache.get('k') == (True, {'not': 'a frame'})
+    assert list(tmp_path.iterdir()) == []
+
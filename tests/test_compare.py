@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from src.compare import align, compare, correlation
+
+
+def walk(seed, n=200):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range('2024-01-01', periods=n, freq='D', name='timestamp')
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), index=idx)
+
+
+def test_series_that_stops_early_is_not_carried_flat():
+    a = walk(0)
+    b = 2 * a.iloc[:120]  # same moves as a, but its history ends earlier
+    corr = correlation(align({'a': a, 'b': b}, fill=False))
+    assert np.isclose(corr.loc['a', 'b'], 1.0)
+
+
+def test_compare_correlates_unfilled_returns():
+    a, c = walk(0), walk(1)
+    closes = {'a': pd.DataFrame({'close': a}), 'b': pd.DataFrame({'close': 2 * a.iloc[:120]}),
+              'c': pd.DataFrame({'price': c.iloc[::2]})}
+    out = compare(list(closes), loader=closes.get)
+    assert np.isclose(out['correlation'].loc['a', 'b'], 1.0)
+    assert out['prices']['b'].iloc[-1] == 2 * a.iloc[119]  # prices are still filled for plotting
+    assert list(out['correlation'].columns) == ['a', 'b', 'c']
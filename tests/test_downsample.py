@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.downsample import histogram, lttb, minmax_ohlc
+
+
+def price_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range('2024-01-01', periods=n, freq='min')
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.002, n))), index=idx)
+
+
+def ohlc(n, seed=0):
+    close = price_series(n, seed)
+    rng = np.random.default_rng(seed + 1)
+    spread = rng.uniform(0, 0.5, n)
+    return pd.DataFrame({'open': close.shift(1).fillna(close.iloc[0]), 'high': close + spread,
+                         'low': close - spread, 'close': close, 'volume': rng.uniform(1, 5, n)})
+
+
+@pytest.mark.parametrize('n,budget', [(10_000, 500), (1001, 1000), (50, 3), (50, 2), (50, 1), (7, 4)])
+def test_lttb_respects_the_budget_and_keeps_the_ends(n, budget):
+    s = price_series(n)
+    out = lttb(s, budget)
+    assert len(out) <= budget
+    assert out.index.is_monotonic_increasing and out.index.isin(s.index).all()
+    assert (out == s.loc[out.index]).all()
+    if budget >= 2:
+        assert out.index[0] == s.index[0] and out.index[-1] == s.index[-1]
+
+
+def test_lttb_keeps_an_isolated_spike():
+    s = price_series(5000)
+    s.iloc[2345] = s.max() * 3
+    assert s.index[2345] in lttb(s, 200).index
+
+
+@pytest.mark.parametrize('budget', [100, 101])
+def test_lttb_short_input_is_returned_unchanged(budget):
+    s = price_series(100)
+    s.iloc[[3, 40]] = np.nan
+    pd.testing.assert_series_equal(lttb(s, budget), s.dropna())
+
+
+@pytest.mark.parametrize('n,bins', [(10_000, 300), (1001, 1000), (97, 10)])
+def test_minmax_ohlc_keeps_budget_extremes_and_totals(n, bins):
+    df = ohlc(n)
+    out = minmax_ohlc(df, bins)
+    assert len(out) <= bins
+    assert out['high'].max() == df['high'].max() and out['low'].min() == df['low'].min()
+    assert out['open'].iloc[0] == df['open'].iloc[0] and out['close'].iloc[-1] == df['close'].iloc[-1]
+    assert out.index[0] == df.index[0]
+    assert np.isclose(out['volume'].sum(), df['volume'].sum())
+
+
+def test_minmax_ohlc_short_input_is_returned_unchanged():
+    df = ohlc(40)
+    assert minmax_ohlc(df, 40) is df
+    assert minmax_ohlc(df[['open', 'high', 'low', 'close']].iloc[:5], 100).shape == (5, 4)
+
+
+def test_histogram_counts_every_finite_value():
+    s = pd.Series([1.0, 2.0, np.nan, np.inf, 3.0, 4.0])
+    centers, counts, width = histogram(s, nbins=3)
+    assert len(centers) == 3 and counts.sum() == 4 and np.isclose(width, 1.0)
+    assert histogram(pd.Series([np.nan]))[1].size == 0
@@ -0,0 +1,76 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src import fetch_data, http_client, raw_io
+
+FROM, TO = datetime(2025, 1, 1), datetime(2025, 5, 1)  # 4 chunks of 30 days, all before the fake now
+
+
+def unix(dt):
+    return int(pd.Timestamp(dt).timestamp())
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff/Retry-After waits are recorded instead of slept (the rate limiter is
+    not under test here and lets every request through)."""
+    waited = []
+    monkeypatch.setattr(time, 'sleep', waited.append)
+    monkeypatch.setattr(http_client.TokenBucket, 'acquire', lambda self: None)
+    return waited
+
+
+def fetch(**kwargs):
+    args = dict(from_dt=FROM, to_dt=TO, chunk_days=30, pause_sec=0, rate_per_min=6000, max_workers=1)
+    args.update(kwargs)
+    return fetch_data.fetch_market_chart_range_chunked('bitcoin', 'usd', **args)
+
+
+def range_requests(api):
+    return sorted((int(p['from']), int(p['to'])) for path, p, _ in api.requests if path.endswith('/range'))
+
+
+def test_range_is_split_into_contiguous_chunks(clock, stub_api, raw_dirs, sleeps):
+    saved = fetch(max_workers=3)
+    windows = range_requests(stub_api)
+    assert len(windows) == 4 and len(saved) == 5  # 4 chunks + the merged file
+    assert windows[0][0] == unix(FROM) and windows[-1][1] == unix(TO) - 1
+    assert all(b - a < 30 * 86400 for a, b in windows)
+    assert all(nxt[0] == prev[1] + 1 for prev, nxt in zip(windows, windows[1:]))
+
+    merged = raw_io.read_market_chart(saved[-1])['prices']
+    ts = merged[:, 0]
+    assert (ts[1:] > ts[:-1]).all()  # sorted, no duplicates at chunk borders
+    chunks = sum(len(raw_io.read_market_chart(p)['prices']) for p in saved[:-1])
+    assert len(ts) == chunks
+    assert not any(n.endswith('.checkpoint.json') for n in os.listdir(raw_dirs / 'meta'))
+
+
+def test_429_and_5xx_are_retried(clock, stub_api, raw_dirs, sleeps):
+    stub_api.fail = [429, 503, 500]
+    stub_api.retry_after = '7'
+    fetch()
+    assert len(stub_api.requests) == 4 + 3
+    assert sleeps == [7.0, 2.0, 4.0]  # Retry-After, then exponential backoff (attempts 1 and 2)
+
+
+def test_failed_run_resumes_from_its_checkpoint(clock, stub_api, raw_dirs, sleeps):
+    stub_api.fail = [None, None, 404]  # the third chunk fails for good
+    with pytest.raises(RuntimeError, match='call again to resume'):
+        fetch()
+    ckpt = [n for n in os.listdir(raw_dirs / 'meta') if n.endswith('.checkpoint.json')]
+    with open(raw_dirs / 'meta' / ckpt[0], encoding='utf-8') as f:
+        done = {tuple(map(int, k.split('_'))) for k in json.load(f)['done']}
+    assert 2 <= len(done) < 4
+
+    stub_api.requests.clear()
+    saved = fetch()
+    assert len(saved) == 5
+    resumed = range_requests(stub_api)
+    assert len(resumed) == 4 - len(done) and not set(resumed) & done
+    assert not any(n.endswith('.checkpoint.json') for n in os.listdir(raw_dirs / 'meta'))
@@ -0,0 +1,77 @@
+import json
+import os
+
+from src import fetch_data, raw_io
+
+HOUR, DAY = 3600, 86400
+
+
+def _newest(path):
+    return int(raw_io.read_market_chart(path, keys=('prices',))['prices'][:, 0].max() // 1000)
+
+
+def _meta(path):
+    with open(os.path.join(fetch_data.METADATA_DIR, os.path.basename(path) + '.meta.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _run(days):
+    return fetch_data.fetch_recent_market_chart('bitcoin', 'usd', days=days, incremental=True)
+
+
+def test_daily_runs_keep_up_with_the_live_edge(stub_api, clock, raw_dirs):
+    for run in range(5):
+        before = len(stub_api.requests)
+        path = _run(365)
+        assert len(stub_api.requests) > before, f'run {run} sent no request'
+        # the first run gets daily points; after that the trailing gap is fetched at
+        # hourly (or finer) spacing, so the newest point never falls behind
+        age = clock() - _newest(path)
+        assert age < (DAY if run == 0 else HOUR), f'run {run}: newest point {age} s old'
+        clock.advance(DAY)
+
+
+def test_half_hourly_polls_fetch_new_points(stub_api, clock, raw_dirs):
+    newest = []
+    for run in range(6):
+        before = len(stub_api.requests)
+        path = _run(30)
+        assert len(stub_api.requests) > before, f'run {run} sent no request'
+        newest.append(_newest(path))
+        clock.advance(30 * 60)
+    assert all(b > a for a, b in zip(newest, newest[1:]))
+    assert newest[-1] >= clock() - 30 * 60 - HOUR
+
+
+def test_nothing_new_leaves_the_file_alone(stub_api, clock, raw_dirs):
+    _run(30)
+    path = _run(30)  # picks up the 5-minute points after the last hourly one
+    files = sorted(os.listdir(raw_dirs))
+    meta, mtime = _meta(path), os.path.getmtime(path)
+    clock.advance(60)  # the next 5-minute point is not there yet
+    before = len(stub_api.requests)
+    assert _run(30) == path
+    assert len(stub_api.requests) == before + 1  # the live edge is still asked for
+    assert _meta(path) == meta
+    assert os.path.getmtime(path) == mtime
+    # the empty gap response is not kept as a "covered" raw file
+    assert sorted(os.listdir(raw_dirs)) == files
+
+
+def test_currencies_of_one_coin_keep_separate_files(stub_api, clock, raw_dirs):
+    stub_api.rates['eur'] = 0.5
+    paths = {}
+    for currency in ('usd', 'eur'):
+        paths[currency] = fetch_data.fetch_recent_market_chart('bitcoin', currency, days=30, incremental=True)
+    clock.advance(3 * HOUR)
+    for currency in ('usd', 'eur'):  # the second round merges each currency's own gap files
+        paths[currency] = fetch_data.fetch_recent_market_chart('bitcoin', currency, days=30, incremental=True)
+
+    assert paths['usd'] != paths['eur']
+    usd, eur = (raw_io.read_market_chart(paths[c], keys=('prices',))['prices'] for c in ('usd', 'eur'))
+    assert (usd[:, 0] == eur[:, 0]).all() and (eur[:, 1] == 0.5 * usd[:, 1]).all()
+    for name in os.listdir(raw_dirs):
+        if name.endswith('.json'):
+            currency = _meta(name)['vs_currency']
+            assert f'_{currency}_' in name
+            assert _meta(paths[currency])['vs_currency'] == currency
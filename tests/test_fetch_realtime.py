@@ -0,0 +1,31 @@
+import threading
+from collections import OrderedDict
+
+import pytest
+
+from src import fetch_realtime, http_client
+from src.cache import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(fetch_realtime, '_RINGS', {})
+    monkeypatch.setattr(fetch_realtime, '_RINGS_LOCK', threading.Lock())
+    monkeypatch.setattr(fetch_realtime, '_CACHE', TTLCache(ttl=3600))
+    monkeypatch.setattr(http_client, '_validators', OrderedDict())
+
+
+def test_ring_frame_has_only_the_price_column(clock, stub_api):
+    df = fetch_realtime.fetch_realtime_data(minutes=60, cache_seconds=0)
+    assert list(df.columns) == ['price']
+    assert len(df) == len(df.dropna()) >= 12
+
+
+def test_refresh_fetches_only_the_new_edge(clock, stub_api):
+    first = fetch_realtime.fetch_realtime_data(minutes=60, cache_seconds=0)
+    clock.advance(900)
+    again = fetch_realtime.fetch_realtime_data(minutes=60, cache_seconds=0)
+    (_, p1, _), (_, p2, _) = stub_api.requests
+    assert int(p2['from']) == first.index[-1].timestamp() + 1 and int(p2['to']) == clock()
+    assert again.index[-1] > first.index[-1]
+    assert again.attrs['fetch']['points_fetched'] == 3
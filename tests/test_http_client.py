@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+
+import pytest
+
+from src import fetch_realtime, http_client
+
+RANGE = '/coins/bitcoin/market_chart/range'
+
+
+@pytest.fixture(autouse=True)
+def fresh_client(monkeypatch):
+    monkeypatch.setattr(http_client, '_validators', OrderedDict())
+    http_client.reset_metrics()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waited = []
+    monkeypatch.setattr(time, 'sleep', waited.append)
+    return waited
+
+
+def params(clock, minutes=60):
+    return {'vs_currency': 'usd', 'from': int(clock()) - minutes * 60, 'to': int(clock())}
+
+
+def test_conditional_request_is_answered_from_the_last_body(clock, stub_api):
+    first = http_client.get_json(RANGE, params=params(clock), conditional=True)
+    assert http_client.last_bytes() > 0
+    again = http_client.get_json(RANGE, params=params(clock), conditional=True)
+    assert again is first
+    assert http_client.last_bytes() == 0
+    assert 'If-None-Match' not in stub_api.requests[0][2]
+    assert stub_api.requests[1][2]['If-None-Match']
+    assert http_client.metrics_summary()[RANGE]['not_modified'] == 1
+
+
+def test_changed_data_is_downloaded_again(clock, stub_api):
+    first = http_client.get_json(RANGE, params=params(clock), conditional=True)
+    stub_api.etags = False  # the server no longer matches the validator
+    again = http_client.get_json(RANGE, params=params(clock), conditional=True)
+    assert again == first and again is not first
+    assert http_client.last_bytes() > 0
+
+
+def test_plain_requests_send_no_validators(clock, stub_api):
+    http_client.get_json(RANGE, params=params(clock))
+    http_client.get_json(RANGE, params=params(clock))
+    assert all('If-None-Match' not in headers for _, _, headers in stub_api.requests)
+
+
+def test_304_after_the_validator_was_evicted(clock, stub_api, monkeypatch):
+    first = http_client.get_json(RANGE, params=params(clock), conditional=True)
+    real_get = http_client.get_session().get
+
+    def get_then_evict(*args, **kwargs):
+        resp = real_get(*args, **kwargs)
+        http_client._validators.clear()  # another thread evicted the entry meanwhile
+        return resp
+    monkeypatch.setattr(http_client.get_session(), 'get', get_then_evict)
+    assert http_client.get_json(RANGE, params=params(clock), conditional=True) is first
+
+
+def test_realtime_refetches_are_conditional(clock, stub_api):
+    fetch = fetch_realtime._range_fetcher('bitcoin', 'usd')
+    a, b = params(clock)['from'], params(clock)['to']
+    fetch(a, b)
+    fetch(a, b)
+    assert stub_api.requests[1][2].get('If-None-Match')
+    assert http_client.metrics_summary()[RANGE]['not_modified'] == 1
+
+
+def test_long_retry_after_is_capped(clock, stub_api, sleeps):
+    stub_api.fail = [429, 429]
+    stub_api.retry_after = '86400'
+    http_client.get_json(RANGE, params=params(clock))
+    assert sleeps == [http_client.MAX_RETRY_AFTER] * 2
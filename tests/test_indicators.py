@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators import IndicatorEngine, RSIState, add_indicators, rsi
+
+
+def closes_with_gaps(seed, n=400):
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))),
+                      index=pd.date_range('2024-01-01', periods=n, freq='h'))
+    close[rng.random(n) < 0.08] = np.nan
+    close.iloc[100:107] = np.nan  # a longer gap
+    if seed % 2:
+        close.iloc[3:9] = np.nan  # gaps inside the seed window too
+    return close
+
+
+@pytest.mark.parametrize('method', ['sma', 'wilder'])
+@pytest.mark.parametrize('seed', range(6))
+def test_incremental_rsi_matches_batch_with_nan_gaps(method, seed):
+    close = closes_with_gaps(seed)
+    state = RSIState(14, method)
+    incremental = [state.push(d) for d in close.diff().to_numpy()]
+    np.testing.assert_allclose(incremental, rsi(close, 14, method).to_numpy(), rtol=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_engine_matches_add_indicators_with_wilder_rsi(seed):
+    close = closes_with_gaps(seed)
+    rows = IndicatorEngine(rsi_method='wilder').extend(close)
+    batch = add_indicators(pd.DataFrame({'close': close}), rsi_method='wilder')
+    np.testing.assert_allclose(rows['RSI'].to_numpy(), batch['RSI'].to_numpy(), rtol=1e-9)
@@ -0,0 +1,75 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.live import LiveFeed, ReplaySource
+
+N = 100
+T0 = 1_700_000_000_000  # ms
+
+
+@pytest.fixture
+def replay_file(tmp_path):
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, N)))
+    ts = [T0 + i * 300_000 for i in range(N)]
+    raw = {'prices': [[t, float(p)] for t, p in zip(ts, prices)],
+           # one point without volume: it must come through as NaN, not shift the others
+           'total_volumes': [[t, float(i)] for i, t in enumerate(ts) if i != 10]}
+    path = tmp_path / 'coingecko_test_market_chart_replay.json'
+    path.write_text(json.dumps(raw), encoding='utf-8')
+    return path, raw
+
+
+def test_since_returns_exactly_the_new_rows(replay_file):
+    path, raw = replay_file
+    feed = LiveFeed(ReplaySource(path, batch=7))
+    seq, parts = 0, []
+    while feed.step():
+        new, seq = feed.since(seq)
+        assert 0 < len(new) <= 7
+        parts.append(new)
+    assert feed.since(seq)[0].empty
+    df = pd.concat(parts)
+    assert seq == len(df) == N
+    assert (df.index == pd.to_datetime([t for t, _ in raw['prices']], unit='ms', utc=True)).all()
+    assert np.allclose(df['close'], [p for _, p in raw['prices']])
+    assert np.isnan(df['volume'].iloc[10]) and df['volume'].iloc[11] == 11.0
+    assert np.allclose(df['MA_short'], df['close'].rolling(7).mean(), equal_nan=True)
+
+
+def test_buffer_keeps_only_the_newest_rows(replay_file):
+    path, raw = replay_file
+    feed = LiveFeed(ReplaySource(path, batch=9), capacity=30)
+    while feed.step():
+        pass
+    df = feed.frame()
+    assert feed.seq == N and len(df) == 30
+    assert np.allclose(df['close'], [p for _, p in raw['prices'][-30:]])
+    new, _ = feed.since(N - 5)
+    assert len(new) == 5
+
+
+def test_looping_replay_keeps_timestamps_increasing(replay_file):
+    path, _ = replay_file
+    feed = LiveFeed(ReplaySource(path, batch=40, loop=True))
+    for _ in range(6):
+        assert feed.step() > 0
+    idx = feed.frame().index
+    assert len(idx) == 2 * N and idx.is_monotonic_increasing and idx.is_unique
+
+
+def test_background_thread_ingests_the_whole_file(replay_file):
+    path, _ = replay_file
+    feed = LiveFeed(ReplaySource(path, batch=25), interval=0.01).start()
+    try:
+        deadline = time.monotonic() + 10
+        while feed.seq < N and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        feed.stop()
+    assert not feed.running and feed.error is None
+    assert feed.seq == N
@@ -0,0 +1,96 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import pipeline
+
+PAIRS = [('bitcoin', 'usd'), ('ethereum', 'usd')]
+
+
+class Stages:
+    """Stand-ins for the fetch/process/analysis jobs: each writes a small file under
+    tmp_path, logs its call, and fails when the pair is listed in `failing`."""
+
+    def __init__(self, tmp_path):
+        self.dir = tmp_path
+        self.calls = []
+        self.failing = {}  # stage -> set of coins
+
+    def _run(self, stage, coin, out_name, content):
+        self.calls.append((stage, coin))
+        if coin in self.failing.get(stage, ()):
+            raise RuntimeError(f'{stage} of {coin} failed')
+        out = self.dir / out_name
+        out.write_text(content, encoding='utf-8')
+        return str(out)
+
+    def fetch(self, coin, currency, days, limiter):
+        return self._run('fetch', coin, pipeline.raw_name(coin, currency, days), f'{coin} {days}')
+
+    def process(self, raw_path, rule, pyramid):
+        coin = raw_path.split('coingecko_')[1].split('_')[0]
+        return self._run('process', coin, f'{coin}_{rule}.parquet', rule)
+
+    def analysis(self, processed_path):
+        coin = processed_path.rsplit('/', 1)[1].split('_')[0]
+        return self._run('analysis', coin, f'{coin}_analysis.json', '{}')
+
+
+@pytest.fixture
+def stages(tmp_path, monkeypatch):
+    st = Stages(tmp_path)
+    monkeypatch.setattr(pipeline, 'fetch_job', st.fetch)
+    monkeypatch.setattr(pipeline, 'process_job', st.process)
+    monkeypatch.setattr(pipeline, 'analysis_job', st.analysis)
+    # the stubs live in this process: run the CPU stages in threads
+    monkeypatch.setattr(pipeline, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    return st
+
+
+def status(results):
+    return {(pair[0], stage): s[0].split(':')[0] for pair, stages in results.items() for stage, s in stages.items()}
+
+
+def test_failed_run_resumes_where_it_stopped(tmp_path, stages):
+    state_path = str(tmp_path / 'state' / 'pipeline_state.json')
+    stages.failing = {'process': {'ethereum'}}
+    first = pipeline.run(PAIRS, days=30, rule='1D', state_path=state_path, rate_per_min=6000)
+    assert status(first) == {
+        ('bitcoin', 'fetch'): 'ok', ('bitcoin', 'process'): 'ok', ('bitcoin', 'analysis'): 'ok',
+        ('ethereum', 'fetch'): 'ok', ('ethereum', 'process'): 'failed',
+    }
+    with open(state_path, encoding='utf-8') as f:
+        state = json.load(f)
+    assert 'process/ethereum/usd' not in state and 'analysis/bitcoin/usd' in state
+
+    stages.failing = {}
+    stages.calls.clear()
+    second = pipeline.run(PAIRS, days=30, rule='1D', state_path=state_path, max_age=3600, rate_per_min=6000)
+    assert sorted(stages.calls) == [('analysis', 'ethereum'), ('process', 'ethereum')]
+    assert status(second) == {
+        ('bitcoin', 'fetch'): 'skipped', ('bitcoin', 'process'): 'skipped', ('bitcoin', 'analysis'): 'skipped',
+        ('ethereum', 'fetch'): 'skipped', ('ethereum', 'process'): 'ok', ('ethereum', 'analysis'): 'ok',
+    }
+
+    # a changed stage parameter reruns that stage and everything after it
+    stages.calls.clear()
+    pipeline.run(PAIRS, days=30, rule='6h', state_path=state_path, max_age=3600, rate_per_min=6000)
+    assert sorted(stages.calls) == [('analysis', 'bitcoin'), ('analysis', 'ethereum'),
+                                    ('process', 'bitcoin'), ('process', 'ethereum')]
+
+
+def test_missing_output_is_rebuilt(tmp_path, stages):
+    state_path = str(tmp_path / 'state.json')
+    pipeline.run(PAIRS[:1], state_path=state_path, rate_per_min=6000)
+    (tmp_path / 'bitcoin_analysis.json').unlink()
+    stages.calls.clear()
+    pipeline.run(PAIRS[:1], state_path=state_path, max_age=3600, rate_per_min=6000)
+    assert stages.calls == [('analysis', 'bitcoin')]
+
+
+def test_days_is_parsed_as_an_int(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(pipeline, 'run', lambda pairs, **kw: seen.update(kw) or {})
+    assert pipeline.main(['bitcoin', '--days', '30']) == 0
+    assert seen['days'] == 30 and isinstance(seen['days'], int)
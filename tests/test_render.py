@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from src import artifacts, render
+
+
+def draw_text(path, out_path, label='chart'):
+    """Stub draw function: 'renders' the input file into a text image, and fails on
+    inputs containing 'broken'."""
+    with open(path, encoding='utf-8') as f:
+        data = f.read()
+    if 'broken' in data:
+        raise ValueError('cannot draw this')
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(f'{label}: {data} (pid {os.getpid()})')
+    return out_path
+
+
+def draw_figure(path, out_path, title='chart'):
+    """Stub figure factory: a small Plotly figure exported through write_figure."""
+    import plotly.graph_objects as go
+    with open(path, encoding='utf-8') as f:
+        ys = [float(v) for v in f.read().split()]
+    fig = go.Figure(go.Scatter(y=ys))
+    fig.update_layout(title=title)
+    return render.write_figure(fig, out_path)
+
+
+@pytest.fixture
+def meta_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, 'META_DIR', str(tmp_path / 'meta'))
+
+
+def inputs(tmp_path, **contents):
+    paths = {}
+    for name, text in contents.items():
+        paths[name] = tmp_path / f'{name}.txt'
+        paths[name].write_text(text, encoding='utf-8')
+    return paths
+
+
+def statuses(results):
+    return {os.path.basename(out): status.split(':')[0] for out, (status, _, _) in results.items()}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_up_to_date_images_are_skipped(tmp_path, meta_dir, workers):
+    src = inputs(tmp_path, a='1 2 3', b='4 5 6')
+    jobs = [render.Job(draw_text, str(tmp_path / 'a.png'), (str(src['a']),), {'label': 'A'}),
+            render.Job(draw_text, str(tmp_path / 'b.png'), (str(src['b']),), {'label': 'B'})]
+
+    assert statuses(render.render(jobs, workers=workers)) == {'a.png': 'ok', 'b.png': 'ok'}
+    assert (tmp_path / 'a.png').read_text(encoding='utf-8').startswith('A: 1 2 3')
+    mtimes = {p: os.stat(tmp_path / p).st_mtime_ns for p in ('a.png', 'b.png')}
+
+    assert statuses(render.render(jobs, workers=workers)) == {'a.png': 'skipped', 'b.png': 'skipped'}
+    assert mtimes == {p: os.stat(tmp_path / p).st_mtime_ns for p in ('a.png', 'b.png')}
+
+    # new input content for a, new parameters for b: both redrawn
+    src['a'].write_text('7 8 9', encoding='utf-8')
+    jobs[1] = jobs[1]._replace(params={'label': 'B2'})
+    assert statuses(render.render(jobs, workers=workers)) == {'a.png': 'ok', 'b.png': 'ok'}
+    assert (tmp_path / 'b.png').read_text(encoding='utf-8').startswith('B2: 4 5 6')
+    assert statuses(render.render(jobs, workers=workers, force=True)) == {'a.png': 'ok', 'b.png': 'ok'}
+
+
+def test_jobs_fan_out_to_worker_processes(tmp_path, meta_dir):
+    src = inputs(tmp_path, **{f's{i}': str(i) for i in range(4)})
+    jobs = [render.Job(draw_text, str(tmp_path / f's{i}.png'), (str(src[f's{i}']),)) for i in range(4)]
+    results = render.render(jobs, workers=2)
+    assert set(statuses(results).values()) == {'ok'}
+    pids = {(tmp_path / f's{i}.png').read_text(encoding='utf-8').rsplit('pid ', 1)[1] for i in range(4)}
+    assert str(os.getpid()) + ')' not in pids
+
+
+def test_a_failing_job_does_not_stop_the_others(tmp_path, meta_dir):
+    src = inputs(tmp_path, good='1', bad='broken')
+    jobs = [render.Job(draw_text, str(tmp_path / 'bad.png'), (str(src['bad']),)),
+            render.Job(draw_text, str(tmp_path / 'good.png'), (str(src['good']),))]
+    results = render.render(jobs, workers=2)
+    assert results[str(tmp_path / 'bad.png')][0] == 'failed: cannot draw this'
+    assert results[str(tmp_path / 'good.png')][0] == 'ok'
+    # the failure is not recorded: the job is tried again next time
+    assert statuses(render.render(jobs, workers=2)) == {'bad.png': 'failed', 'good.png': 'skipped'}
+
+
+def test_figures_fall_back_to_html_without_kaleido(tmp_path, meta_dir, monkeypatch):
+    import plotly.graph_objects as go
+
+    def no_kaleido(self, *args, **kwargs):
+        raise ValueError('Image export requires the kaleido package')
+    monkeypatch.setattr(go.Figure, 'write_image', no_kaleido)
+
+    src = inputs(tmp_path, a='1 3 2', b='2 2 5')
+    jobs = [render.Job(draw_figure, str(tmp_path / f'{n}.png'), (str(src[n]),), {'title': n}) for n in 'ab']
+    first = render.render(jobs, workers=1)
+    for n in 'ab':
+        status, _, written = first[str(tmp_path / f'{n}.png')]
+        assert status == 'ok' and written == str(tmp_path / f'{n}.html')
+        assert not (tmp_path / f'{n}.png').exists()
+    # skipped on the next run, reporting the HTML file that was actually written
+    second = render.render(jobs, workers=1)
+    assert {k: (v[0], v[2]) for k, v in second.items()} == {k: ('skipped', v[2]) for k, v in first.items()}
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from src.segments import SegmentStore
+
+NOW = 1_750_000_000
+
+
+@pytest.fixture
+def store(clock):
+    clock.now = NOW
+    return SegmentStore()
+
+
+def fake_fetch(calls):
+    def fetch(a, b):
+        calls.append((a, b))
+        ts = pd.to_datetime(list(range(a - a % 300 + 300, b + 1, 300)), unit='s')
+        return pd.DataFrame({'price': range(len(ts))}, index=ts, dtype=float)
+    return fetch
+
+
+def test_window_in_the_future_is_a_clear_error(store):
+    calls = []
+    with pytest.raises(ValueError, match='empty window'):
+        store.get('bitcoin', 'usd', NOW + 600, NOW + 1200, fake_fetch(calls))
+    assert calls == []
+
+
+def test_reversed_window_is_a_clear_error(store):
+    with pytest.raises(ValueError, match='empty window'):
+        store.get('bitcoin', 'usd', NOW - 600, NOW - 1200, fake_fetch([]))
+
+
+def test_held_window_is_served_without_fetching(store):
+    calls = []
+    first = store.get('bitcoin', 'usd', NOW - 3600, NOW, fake_fetch(calls))
+    again = store.get('bitcoin', 'usd', NOW - 1800, NOW - 600, fake_fetch(calls))
+    assert len(calls) == 1
+    assert again.index[0] >= pd.Timestamp(NOW - 1800, unit='s')
+    assert again.index.isin(first.index).all()
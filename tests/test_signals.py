@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators import add_indicators
+from src.signals import compute_signals
+
+
+def loop_signals(df_work):
+    """The row-by-row loop dashboard.py used before compute_signals (reference)."""
+    signals = []
+    for i in range(len(df_work)):
+        sig = "Hold"
+        if i > 0:
+            if df_work['MA_short'].iloc[i] > df_work['MA_long'].iloc[i] and df_work['MA_short'].iloc[i-1] <= df_work['MA_long'].iloc[i-1]:
+                sig = "Buy"
+            elif df_work['MA_short'].iloc[i] < df_work['MA_long'].iloc[i] and df_work['MA_short'].iloc[i-1] >= df_work['MA_long'].iloc[i-1]:
+                sig = "Sell"
+            if df_work['RSI'].iloc[i] < 30:
+                sig = "Buy"
+            elif df_work['RSI'].iloc[i] > 70:
+                sig = "Sell"
+            if df_work['close'].iloc[i] < df_work['BB_lower'].iloc[i]:
+                sig = "Buy"
+            elif df_work['close'].iloc[i] > df_work['BB_upper'].iloc[i]:
+                sig = "Sell"
+        signals.append(sig)
+    return signals
+
+
+def random_frame(seed, n=600, nan_frac=0.05):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    df = pd.DataFrame({'close': close}, index=pd.date_range('2024-01-01', periods=n, freq='D'))
+    df = add_indicators(df)
+    # NaN gaps anywhere, independently per column (including runs of several rows)
+    for col in ['close', 'MA_short', 'MA_long', 'RSI', 'BB_upper', 'BB_lower']:
+        mask = rng.random(n) < nan_frac
+        start = rng.integers(0, n - 10)
+        mask[start:start + 10] = True
+        df.loc[mask, col] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_matches_the_loop_on_random_series_with_nan_gaps(seed):
+    df = random_frame(seed)
+    assert compute_signals(df).tolist() == loop_signals(df)
+
+
+def test_matches_the_loop_on_indicator_warm_up():
+    df = add_indicators(pd.DataFrame({'close': np.linspace(100, 50, 40) + np.sin(np.arange(40)) * 5}))
+    assert compute_signals(df).tolist() == loop_signals(df)
+
+
+@pytest.mark.parametrize('n', [0, 1, 2])
+def test_tiny_frames(n):
+    df = random_frame(0).iloc[:n]
+    assert compute_signals(df).tolist() == loop_signals(df)
+    assert compute_signals(df).index.equals(df.index)
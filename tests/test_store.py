@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import artifacts, process_data, store
+
+
+@pytest.fixture
+def processed_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(process_data, 'PROCESSED_DIR', str(tmp_path / 'processed'))
+    monkeypatch.setattr(artifacts, 'META_DIR', str(tmp_path / 'processed' / 'meta'))
+    return tmp_path / 'processed'
+
+
+def market_chart(start, end, seed=0):
+    """Hourly market_chart points in [start, end] (a raw CoinGecko-shaped dict)."""
+    idx = pd.date_range(start, end, freq='h', tz='UTC')
+    rng = np.random.default_rng(seed)
+    ms = idx.as_unit('ms').asi8.tolist()
+    price = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(idx))))).tolist()
+    volume = rng.uniform(1, 10, len(idx)).tolist()
+    return {'prices': [list(r) for r in zip(ms, price)],
+            'market_caps': [list(r) for r in zip(ms, price)],
+            'total_volumes': [list(r) for r in zip(ms, volume)]}
+
+
+def write_raw(path, raw, upto=None):
+    if upto is not None:
+        cut = pd.Timestamp(upto, tz='UTC').value // 10**6
+        raw = {k: [r for r in rows if r[0] <= cut] for k, rows in raw.items()}
+    path.write_text(json.dumps(raw), encoding='utf-8')
+    return str(path)
+
+
+# the first run ends inside a bar that the second run completes (upsert of the last
+# bar); the splits sit before, on and after the January/February boundary
+@pytest.mark.parametrize('split', ['2025-01-25 06:00', '2025-01-31 12:00', '2025-02-01 12:00'])
+@pytest.mark.parametrize('rule', ['1D', '6h'])
+def test_two_appends_equal_one_full_rebuild(tmp_path, processed_dir, split, rule):
+    raw = market_chart('2025-01-10', '2025-02-12 23:00')
+    full_raw = write_raw(tmp_path / 'full.json', raw)
+    part_raw = write_raw(tmp_path / 'part.json', raw, upto=split)
+
+    full = process_data.process_and_save(full_raw, out_name='full.parquet', resample_rule=rule)
+    inc = process_data.process_and_save(part_raw, out_name='inc.parquet', resample_rule=rule, append=True)
+    first = store.read_processed(inc)
+    process_data.process_and_save(full_raw, out_name='inc.parquet', resample_rule=rule, append=True)
+
+    expected = store.read_processed(full)
+    pd.testing.assert_frame_equal(store.read_processed(inc), expected)
+    assert store.is_partitioned(inc)
+    # the bar that was still open after the first run was rewritten, not duplicated
+    last = first.index[-1]
+    assert first.loc[last, 'close'] != expected.loc[last, 'close']
+
+
+def test_append_part_replaces_from_a_timestamp(tmp_path):
+    idx = pd.date_range('2025-01-29', periods=6, freq='D', tz='UTC', name='timestamp')
+    df = pd.DataFrame({'close': np.arange(6, dtype=float)}, index=idx)
+    path = str(tmp_path / 's.parquet')
+    store.write_processed(path, df.iloc[:4])
+    update = df.iloc[3:] + 10  # bar 3 changed, bars 4-5 new (in February)
+    store.append_part(path, update, replace_from=update.index[0])
+    pd.testing.assert_frame_equal(store.read_processed(path), pd.concat([df.iloc[:3], update]), check_freq=False)
+
+
+def utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize('UTC') if ts.tz is None else ts
+
+
+@pytest.fixture
+def long_series(tmp_path):
+    idx = pd.date_range('2024-11-01', '2025-03-10', freq='h', tz='UTC', name='timestamp')
+    df = pd.DataFrame({'close': np.arange(len(idx), dtype=float), 'volume': 1.0}, index=idx)
+    path = str(tmp_path / 'long.parquet')
+    store.write_processed(path, df.iloc[:1500])
+    store.append_part(path, df.iloc[1500:])
+    return path, df
+
+
+@pytest.mark.parametrize('start,end', [
+    (None, None),
+    ('2025-01-31 20:00', '2025-02-01 03:00'),  # across a month boundary
+    ('2024-12-15', None),
+    (None, '2024-11-02'),
+    (pd.Timestamp('2025-03-01', tz='UTC'), pd.Timestamp('2025-04-01', tz='UTC')),
+    ('2026-01-01', None),  # nothing there
+])
+def test_read_processed_filter_matches_slicing(long_series, start, end):
+    path, df = long_series
+    got = store.read_processed(path, start, end, columns=['close'])
+    want = df[['close']]
+    if start is not None:
+        want = want[want.index >= utc(start)]
+    if end is not None:
+        want = want[want.index < utc(end)]  # end is exclusive
+    assert list(got.columns) == ['close']
+    np.testing.assert_array_equal(got['close'].to_numpy(), want['close'].to_numpy())
+    assert got.index.equals(want.index)
+
+
+@pytest.mark.parametrize('n', [1, 31, 1000, 10**6])
+def test_tail_reads_the_last_rows(long_series, n):
+    path, df = long_series
+    got = store.tail(path, n)
+    np.testing.assert_array_equal(got['close'].to_numpy(), df['close'].iloc[-n:].to_numpy())
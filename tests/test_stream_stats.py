@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.indicators import rolling_volatility
+from src.stream_stats import DrawdownTracker, Moments, QuantileSketch, summarize
+
+N = 500
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, N)))
+    close[rng.random(N) < 0.05] = np.nan
+    close[200:204] = np.nan
+    return pd.DataFrame({'close': close}, index=pd.date_range('2022-01-01', periods=N, freq='D'))
+
+
+def batches(df, cuts):
+    """df split at `cuts` (row positions), with an empty batch thrown in."""
+    bounds = [0, *cuts, len(df)]
+    parts = [df.iloc[a:b] for a, b in zip(bounds, bounds[1:])]
+    return parts[:1] + [df.iloc[:0]] + parts[1:]
+
+
+SPLITS = [[], [1], [N - 1], [137, 138, 300], list(range(50, N, 50)), [200, 202]]
+
+
+@pytest.mark.parametrize('cuts', SPLITS)
+def test_summarize_matches_pandas_for_any_batch_split(df, cuts):
+    s = summarize(batches(df, cuts))
+    close = df['close']
+    pct = close / close.shift(1) - 1
+    logr = np.log(close / close.shift(1))
+
+    assert (s['start'], s['end'], s['count']) == (df.index[0], df.index[-1], N)
+    assert s['na_count'] == close.isna().sum()
+    price, returns, lr = s['price'], s['returns'], s['log_returns']
+    assert (price.min, price.max) == (close.min(), close.max())
+    assert np.allclose([price.mean, price.std, price.skew, price.kurt],
+                       [close.mean(), close.std(), close.skew(), close.kurt()], rtol=1e-9)
+    assert np.allclose([returns.mean, returns.std, returns.skew, returns.kurt],
+                       [pct.mean(), pct.std(), pct.skew(), pct.kurt()], rtol=1e-9)
+    assert np.allclose([lr.mean, lr.std], [logr.mean(), logr.std()], rtol=1e-9)
+    assert np.isclose(s['vol'].mean, rolling_volatility(logr.dropna(), 30).mean(), rtol=1e-9)
+
+    drawdown = close / close.cummax() - 1
+    trough = drawdown.idxmin()
+    dd = s['drawdown']
+    assert np.isclose(dd.max_drawdown, drawdown.min())
+    assert dd.trough_at == trough
+    assert dd.peak_before_trough == close[:trough].idxmax()
+    assert (dd.peak, dd.peak_at) == (close.max(), close.idxmax())
+
+    pd.testing.assert_series_equal(s['recent'], close.iloc[-30:])
+
+
+def median_bound(values, rel_error):
+    """Largest error a sketched median may have: each of the two middle ranks it
+    interpolates is within rel_error of its exact value."""
+    v = np.sort(values.dropna().to_numpy())
+    mid = (len(v) - 1) / 2
+    return rel_error * max(abs(v[int(np.floor(mid))]), abs(v[int(np.ceil(mid))]))
+
+
+@pytest.mark.parametrize('cuts', SPLITS)
+def test_sketched_medians_are_within_rel_error(df, cuts):
+    s = summarize(batches(df, cuts), rel_error=0.001)
+    close = df['close']
+    pct = close / close.shift(1) - 1
+    assert abs(s['price_q'].median - close.median()) <= median_bound(close, 0.001)
+    assert abs(s['returns_q'].median - pct.median()) <= median_bound(pct, 0.001)
+
+
+def test_moments_merge_equals_one_pass():
+    rng = np.random.default_rng(1)
+    x = rng.lognormal(0, 1, 1000)
+    whole = Moments().update(x)
+    merged = Moments()
+    for part in np.split(x, [1, 2, 500, 997]):
+        merged.merge(Moments().update(part))
+    for attr in ('n', 'mean', 'var', 'skew', 'kurt', 'min', 'max'):
+        assert np.isclose(getattr(merged, attr), getattr(whole, attr), rtol=1e-9), attr
+    empty = Moments()
+    assert empty.merge(Moments()).n == 0 and np.isnan(empty.mean)
+
+
+def test_quantile_sketch_bounds_and_merge():
+    rng = np.random.default_rng(2)
+    x = np.concatenate([rng.normal(0, 5, 2000), [0.0] * 10])
+    a, b = QuantileSketch(0.01).update(x[:777]), QuantileSketch(0.01).update(x[777:])
+    merged = a.merge(b)
+    for q in (0.05, 0.25, 0.75, 0.95):
+        exact = np.quantile(x, q, method='lower')
+        assert abs(merged._at_rank(int(q * (len(x) - 1))) - exact) <= 0.01 * abs(exact) + 1e-12
+    with pytest.raises(ValueError):
+        a.merge(QuantileSketch(0.02))
+    assert np.isnan(QuantileSketch().median)
+
+
+def test_drawdown_peak_in_an_earlier_batch():
+    idx = pd.date_range('2024-01-01', periods=6, freq='D')
+    close = np.array([10.0, 12.0, 11.0, 13.0, 6.0, 7.0])
+    dd = DrawdownTracker().update(idx[:2], close[:2]).update(idx[2:4], close[2:4]).update(idx[4:], close[4:])
+    assert np.isclose(dd.max_drawdown, 6 / 13 - 1)
+    assert (dd.trough_at, dd.peak_before_trough, dd.peak_at) == (idx[4], idx[3], idx[3])
+    dd = DrawdownTracker().update(idx[:4], close[:4]).update(idx[4:], close[4:])
+    assert dd.peak_before_trough == idx[3]
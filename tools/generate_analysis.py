@@ -1,28 +1,29 @@
 import pandas as pd
 import json
-import numpy as np
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+from indicators import drawdown, log_returns, rolling_volatility
+from store import read_processed
+
 PROCESSED = Path(__file__).resolve().parents[1] / 'data' / 'processed'
 P = PROCESSED / 'coingecko_bitcoin_market_chart_last365d_1D.parquet'
 
 def main():
-    df = pd.read_parquet(P)
-    df.index = pd.to_datetime(df.index)
+    df = read_processed(P)
     start = str(df.index.min())
     end = str(df.index.max())
     n = len(df)
     desc = df['close'].describe().to_dict()
     df['pct_change'] = df['close'].pct_change() * 100
-    df['log_return'] = np.log(df['close'] / df['close'].shift(1))
+    df['log_return'] = log_returns(df['close'])
     mean_return = float(df['pct_change'].mean())
     median_return = float(df['pct_change'].median())
     std_return = float(df['pct_change'].std())
-    vol_30d = df['log_return'].rolling(window=30).std().iloc[-1] * np.sqrt(365)
+    vol_30d = rolling_volatility(df['log_return'], 30).iloc[-1]
     vol_30d = None if pd.isna(vol_30d) else float(vol_30d)
-    cummax = df['close'].cummax()
-    drawdown = (df['close'] / cummax) - 1
-    max_dd = float(drawdown.min())
+    max_dd = float(drawdown(df['close']).min())
     top_up = df['pct_change'].nlargest(5).tolist()
     top_down = df['pct_change'].nsmallest(5).tolist()
     res = {